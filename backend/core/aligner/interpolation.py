@@ -1,13 +1,13 @@
 """
 Interpolation utilities for time alignment.
 Supports:
-    - linear interpolation
-    - forward fill
+    - linear interpolation (single series, or a whole T × N matrix at once)
+    - forward fill / nearest (step semantics, optional max gap)
     - combined sync + interpolate
 """
 
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
 
 # ---------------------------------------------------------
@@ -32,47 +32,312 @@ def linear_interp_series(x: List[float], y: List[float], xi: List[float]) -> np.
     return np.interp(xi, x[valid], y[valid], left=np.nan, right=np.nan)
 
 
+# ---------------------------------------------------------
+# Valid-sample index propagation
+# ---------------------------------------------------------
+def prev_valid_index(valid: np.ndarray) -> np.ndarray:
+    """
+    valid (n, N) → int32 (n, N): row of the last valid sample at or before
+    each row, per channel (-1 if none yet).
+    """
+    rows = np.arange(valid.shape[0], dtype=np.int32).reshape(-1, *([1] * (valid.ndim - 1)))
+    return np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+
+
+def next_valid_index(valid: np.ndarray) -> np.ndarray:
+    """
+    Mirror of prev_valid_index: first valid row at or after (n if none).
+    """
+    n = valid.shape[0]
+    rows = np.arange(n, dtype=np.int32).reshape(-1, *([1] * (valid.ndim - 1)))
+    return np.minimum.accumulate(np.where(valid, rows, n)[::-1], axis=0)[::-1]
+
+
 # ---------------------------------------------------------
 # Forward fill (useful for temperature)
 # ---------------------------------------------------------
-def forward_fill(series: List[float]) -> List[float]:
-    out = []
-    last = None
-    for v in series:
-        if v is not None and not np.isnan(v):
-            last = v
-        out.append(last)
+def forward_fill(values) -> np.ndarray:
+    """
+    Vectorized forward fill along axis 0, for a series (n,) or a matrix
+    (n, N); leading NaNs stay NaN.
+    """
+    arr = np.asarray(values, dtype=float)
+    if arr.size == 0:
+        return arr
+    idx = prev_valid_index(~np.isnan(arr))
+    filled = np.take_along_axis(arr, np.maximum(idx, 0), axis=0)
+    filled[idx < 0] = np.nan
+    return filled
+
+
+# ---------------------------------------------------------
+# Batched linear interpolation (all channels of one file)
+# ---------------------------------------------------------
+def _matrix_inputs(x, y, xi):
+    """
+    float64 times, 2-D float values, source sorted by time.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    xi = np.asarray(xi, dtype=np.float64)
+    y = np.asarray(y)
+    if y.ndim == 1:
+        y = y[:, None]
+    if not np.issubdtype(y.dtype, np.floating):
+        y = y.astype(np.float64)
+
+    if np.any(x[1:] < x[:-1]):
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+    return x, y, xi
+
+
+def _result(out: Optional[np.ndarray], n_rows: int, n_ch: int, dtype) -> np.ndarray:
+    if out is None:
+        return np.full((n_rows, n_ch), np.nan, dtype=dtype)
+    if out.shape != (n_rows, n_ch):
+        raise ValueError(f"out has shape {out.shape}, expected {(n_rows, n_ch)}")
+    out[...] = np.nan
+    return out
+
+
+def _fill_gaps(x: np.ndarray, y: np.ndarray, max_gap: Optional[float]):
+    """
+    Linearly fill, in place, every NaN sample of ``y`` (n, N) that lies
+    between two valid samples of its channel (leading / trailing NaN stay).
+
+    A filled sample lies on the line between its valid neighbours, so a
+    linear interpolation over the filled rows equals np.interp over the
+    channel's own valid points. Returns (n, N) int8 or None: with
+    ``max_gap``, the rows k whose interval [k, k+1] lies in a hole wider
+    than that (not to be bridged): 2 where sample k itself was filled,
+    1 where it is the valid sample before the hole (still exact on it).
+    """
+    n, n_ch = y.shape
+    r, c = np.divmod(np.flatnonzero(np.isnan(y)), n_ch)
+    if len(r) == 0:
+        return None
+
+    # runs of consecutive NaN rows per channel: the valid neighbours of
+    # every sample of a run are the rows just before / after it
+    order = np.lexsort((r, c))
+    r, c = r[order], c[order]
+    new_run = np.ones(len(r), dtype=bool)
+    new_run[1:] = (c[1:] != c[:-1]) | (r[1:] != r[:-1] + 1)
+    starts = np.flatnonzero(new_run)
+    ends = np.append(starts[1:], len(r)) - 1
+    run = np.cumsum(new_run) - 1
+    a = r[starts][run] - 1
+    b = r[ends][run] + 1
+    inside = (a >= 0) & (b < n)
+    r, c, a, b = r[inside], c[inside], a[inside], b[inside]
+
+    span = x[b] - x[a]
+    w = np.divide(x[r] - x[a], span, out=np.zeros_like(span), where=span > 0)
+    y_a = y[a, c]
+    y[r, c] = y_a + (y[b, c] - y_a) * w.astype(y.dtype)
+
+    if max_gap is None:
+        return None
+    long = span > max_gap
+    if not long.any():
+        return None
+    # a NaN at row r: both intervals around it span (a, b)
+    too_long = np.zeros(y.shape, dtype=np.int8)
+    too_long[r[long] - 1, c[long]] = 1         # r > a >= 0
+    too_long[r[long], c[long]] = 2
+    return too_long
+
+
+def interp_matrix(
+    x: np.ndarray,
+    y: np.ndarray,
+    xi: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    max_gap: Optional[float] = None,
+) -> np.ndarray:
+    """
+    x : (n,)     source timestamps, shared by every channel
+    y : (n, N)   source values, NaN = missing
+    xi: (G,)     target timestamps (ascending)
+
+    Returns (G, N), same values as np.interp over each channel's valid
+    points (NaN outside its range, all NaN below 2 valid samples).
+    ``out`` may be a (G, N) view into a larger tensor; it is written in place.
+    With ``max_gap`` a grid point between two samples further apart than
+    that stays NaN (a hole in the data is not bridged).
+
+    One searchsorted of the grid against x and one set of weights are
+    applied to the whole matrix. NaN samples are first filled on the
+    source rows from their channel's valid neighbours (_fill_gaps), so
+    sporadic gaps cost a gather over the missing samples, not a pass per
+    channel.
+    """
+    x, y, xi = _matrix_inputs(x, y, xi)
+
+    n, n_ch = y.shape
+    out = _result(out, len(xi), n_ch, y.dtype)
+    if n < 2 or len(xi) == 0 or n_ch == 0:
+        return out
+
+    # --- channels with gaps: fill their NaN samples on the source rows ---
+    valid_count = (~np.isnan(y)).sum(axis=0)
+    too_long = None
+    if (valid_count < n).any():
+        y = y.copy()
+        too_long = _fill_gaps(x, y, max_gap)
+
+    # --- shared neighbours / weights for every channel ---
+    right = np.searchsorted(x, xi, side="right")   # first sample with x > xi
+    left = right - 1                               # last sample with x <= xi
+
+    rows = np.flatnonzero((left >= 0) & (right < n))
+    lo, hi = left[rows], right[rows]
+    span = x[hi] - x[lo]
+    w = np.divide(xi[rows] - x[lo], span, out=np.zeros_like(span), where=span > 0)
+
+    y_lo = y[lo]
+    block = y[hi]
+    block -= y_lo
+    block *= w.astype(block.dtype)[:, None]
+    block += y_lo
+    exact = xi[rows] == x[lo]
+    block[exact] = y_lo[exact]                     # on a sample (its right neighbour may be NaN)
+    if max_gap is not None:
+        block[(span > max_gap) & ~exact] = np.nan
+        if too_long is not None:
+            # holes inside a channel: valid neighbours too far apart
+            hole = too_long[lo]
+            block[(hole == 2) | ((hole == 1) & ~exact[:, None])] = np.nan
+    out[rows] = block
+    out[(right == n) & (xi == x[-1])] = y[-1]      # exactly on the last sample
+
+    out[:, valid_count < 2] = np.nan
     return out
 
 
 # ---------------------------------------------------------
-# Sync time & interpolate
+# Step (ffill) / nearest resampling onto the grid
 # ---------------------------------------------------------
-def sync_and_interp(
-    time_src: List,
-    values: Dict[str, List[float]],
-    time_grid: List,
-    mode="linear",
-) -> Dict[str, List]:
+def _valid_neighbours(x: np.ndarray, y: np.ndarray, xi: np.ndarray):
+    """
+    Per grid point and channel: last valid sample at-or-before (lo, -1 if
+    none) and first valid sample after (hi, n if none). Shapes are (G, 1)
+    when every sample is valid, (G, N) otherwise.
+    """
+    n = len(x)
+    right = np.searchsorted(x, xi, side="right")
+    left = right - 1
+
+    valid = ~np.isnan(y)
+    if valid.all():
+        return left[:, None], right[:, None]
+
+    lo = np.where(left[:, None] >= 0, prev_valid_index(valid)[np.clip(left, 0, n - 1)], -1)
+    hi = np.where(right[:, None] < n, next_valid_index(valid)[np.clip(right, 0, n - 1)], n)
+    return lo, hi
+
+
+def _gather(y: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    n, n_ch = y.shape
+    idx = np.clip(idx, 0, n - 1)
+    if idx.shape[1] == 1:
+        return y[idx[:, 0]]                   # whole-row gather
+    return y[idx, np.arange(n_ch)]
+
 
-    # convert timestamps to seconds
-    t0_src = np.array([t.timestamp() for t in time_src], dtype=float)
-    t0_grid = np.array([t.timestamp() for t in time_grid], dtype=float)
+def resample_matrix(
+    x: np.ndarray,
+    y: np.ndarray,
+    xi: np.ndarray,
+    mode: str = "ffill",
+    max_gap: Optional[float] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Step-wise resampling of (n, N) samples onto the grid xi, per channel:
+
+        ffill   : last valid sample at or before xi   (sample-and-hold)
+        nearest : closest valid sample on either side
 
-    out = {}
+    A grid point whose chosen sample is more than ``max_gap`` seconds away
+    stays NaN, so a dead sensor is not carried across a long outage.
+    """
+    x, y, xi = _matrix_inputs(x, y, xi)
 
-    for key, arr in values.items():
-        arr = np.array(arr, dtype=float)
+    n, n_ch = y.shape
+    if n == 0 or len(xi) == 0 or n_ch == 0:
+        return _result(out, len(xi), n_ch, y.dtype)
 
-        if mode == "linear":
-            res = linear_interp_series(t0_src, arr, t0_grid)
-        else:  # ffill
-            arr_ff = forward_fill(arr.tolist())
-            # re-map onto grid (nearest)
-            res = linear_interp_series(
-                t0_src, np.array(arr_ff, float), t0_grid
-            )
+    lo, hi = _valid_neighbours(x, y, xi)
+    d_lo = np.where(lo >= 0, xi[:, None] - x[np.clip(lo, 0, n - 1)], np.inf)
 
-        out[key] = res.tolist()
+    if mode in ("ffill", "step"):
+        pick, dist = lo, d_lo
+    elif mode == "nearest":
+        d_hi = np.where(hi < n, x[np.clip(hi, 0, n - 1)] - xi[:, None], np.inf)
+        closer_hi = d_hi < d_lo
+        pick = np.where(closer_hi, hi, lo)
+        dist = np.where(closer_hi, d_hi, d_lo)
+    else:
+        raise ValueError(f"unknown resample mode: {mode}")
 
+    if out is None:
+        out = _gather(y, pick)
+    else:
+        out[...] = _gather(y, pick)
+    bad = ~np.isfinite(dist)
+    if max_gap is not None:
+        bad |= dist > max_gap
+    out[np.broadcast_to(bad, out.shape)] = np.nan
     return out
+
+
+def values_matrix(values: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+    """
+    {"V1": arr, ...} → (n_rows, N) matrix in dict order (one copy).
+    """
+    if not values:
+        return np.empty((n_rows, 0), dtype=np.float64)
+    cols = [np.asarray(v) for v in values.values()]
+    dtype = np.result_type(*cols, np.float32)
+    return np.column_stack(cols).astype(dtype, copy=False)
+
+
+# ---------------------------------------------------------
+# Sync time & interpolate
+# ---------------------------------------------------------
+def sync_and_interp_matrix(
+    time_src: np.ndarray,
+    matrix: np.ndarray,
+    time_grid: np.ndarray,
+    mode="linear",
+    max_gap: Optional[float] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Matrix form of sync_and_interp: (n, N) source → (G, N) on the grid.
+
+    mode: "linear" | "ffill" (step) | "nearest"; max_gap (seconds) is the
+    longest hole bridged / carried. With ``out`` the result is written in place.
+    """
+    if mode == "linear":
+        return interp_matrix(time_src, matrix, time_grid, out=out, max_gap=max_gap)
+    return resample_matrix(time_src, matrix, time_grid, mode=mode, max_gap=max_gap, out=out)
+
+
+def sync_and_interp(
+    time_src: np.ndarray,
+    values: Dict[str, List[float]],
+    time_grid: np.ndarray,
+    mode="linear",
+    max_gap: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    time_src / time_grid: int64 epoch seconds (as produced by the parsers)
+    Returns {key: column view} of one (G, N) result matrix.
+    """
+    keys = list(values.keys())
+    matrix = values_matrix(values, len(time_src))
+    res = sync_and_interp_matrix(time_src, matrix, time_grid, mode, max_gap)
+
+    return {key: res[:, j] for j, key in enumerate(keys)}
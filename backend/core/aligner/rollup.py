@@ -0,0 +1,110 @@
+"""
+Rollup pyramid, built right after alignment:
+
+    5 s DayFrame ──reduceat──▶ 1 min ──reduceat──▶ 15 min ──reduceat──▶ 1 h
+
+Only the first level touches the full-resolution tensors (one reduceat per
+statistic over all racks at once); every coarser level is reduced from the
+previous one. Buckets are epoch aligned, so rollups of different jobs and
+of the blocks of one streamed job line up.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..model.dayframe import DayFrame
+from ..model.rollup import RollupLevel, RollupStats, bucket_starts
+from ..parsers.columnar import views_matrix
+
+
+def rollup_levels(levels: Sequence[int], step_sec: int) -> List[int]:
+    """
+    Sorted bucket sizes that can form a pyramid on a ``step_sec`` grid:
+    coarser than the grid, each a multiple of the previous one.
+    """
+    out = []
+    for sec in sorted({int(s) for s in levels or ()}):
+        if sec <= step_sec or sec % step_sec:
+            continue
+        if out and sec % out[-1]:
+            continue
+        out.append(sec)
+    return out
+
+
+def _channels(channels: Dict[str, np.ndarray]) -> np.ndarray:
+    matrix = views_matrix(channels)
+    return matrix if matrix is not None else np.column_stack(list(channels.values()))
+
+
+def build_rollups(frame: DayFrame, levels: Sequence[int]) -> Dict[int, RollupLevel]:
+    """
+    {bucket_sec: RollupLevel} for every level, finest first.
+    """
+    if not levels or not frame.n_time:
+        return {}
+
+    starts, time = bucket_starts(frame.time, levels[0])
+
+    # (R, T, C) → (T, R, C) views: buckets along axis 0 for every tensor
+    first = RollupLevel(
+        bucket_sec=levels[0],
+        time=time,
+        rack_ids=frame.rack_ids,
+        cell_columns=frame.cell_columns,
+        temp_columns=frame.temp_columns,
+        voltage=RollupStats.of_samples(frame.voltage.transpose(1, 0, 2)).reduce(starts),
+        temp=RollupStats.of_samples(frame.temp.transpose(1, 0, 2)).reduce(starts),
+        has_voltage=frame.has_voltage.copy(),
+        has_temp=frame.has_temp.copy(),
+        summary={
+            owner: RollupStats.of_samples(_channels(channels)).reduce(starts)
+            for owner, channels in frame.summary.items()
+        },
+        summary_columns={owner: list(channels) for owner, channels in frame.summary.items()},
+    )
+
+    pyramid = {first.bucket_sec: first}
+    for sec in levels[1:]:
+        first = first.coarsen(sec)
+        pyramid[sec] = first
+    return pyramid
+
+
+class RollupAccumulator:
+    """
+    Rollups of a streamed job. Window blocks do not end on bucket
+    boundaries, so the last (possibly partial) bucket of every level is
+    held back and merged with the next block. Complete buckets are held
+    too, until they span ``flush_sec``, so a long job is written in a few
+    day-sized tables instead of one small table per window.
+    """
+
+    def __init__(self, flush_sec: int = 86400):
+        self.flush_sec = flush_sec
+        self.pending: Dict[int, RollupLevel] = {}
+
+    def push(self, rollups: Dict[int, RollupLevel]) -> Dict[int, RollupLevel]:
+        """
+        Add one block's rollups; returns the levels that are due for writing.
+        """
+        due = {}
+        for sec, level in rollups.items():
+            if sec in self.pending:
+                level = self.pending[sec].merge(level)
+            self.pending[sec] = level
+            if level.n_buckets > 1 and level.time[-1] - level.time[0] >= self.flush_sec:
+                due[sec] = level.take(slice(0, -1))
+                self.pending[sec] = level.take(slice(-1, None))
+        return due
+
+    def flush(self, due: Optional[Dict[int, RollupLevel]] = None) -> Dict[int, RollupLevel]:
+        """
+        Everything still held, appended to ``due`` (the last push) if given.
+        """
+        pending, self.pending = self.pending, {}
+        out = dict(due or {})
+        for sec, level in pending.items():
+            out[sec] = out[sec].merge(level) if sec in out else level
+        return out
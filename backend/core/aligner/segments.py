@@ -0,0 +1,136 @@
+"""
+Gap-aware segmented timelines.
+
+Instead of one dense grid from the global min to the global max, the
+aligner grids only the time that some source actually covers:
+
+    source timestamps ──split at holes > gap_sec──▶ covered intervals
+    intervals of all sources ──merge──▶ segments [start, end]
+    each segment ──np.arange on the global anchor──▶ grid points
+
+The grid is still one sorted int64 array (anchored at the first sample,
+so a gap-free job gets exactly the dense grid). ``segments`` holds the
+row bounds of every segment in it; a per-rack coverage mask says which
+segments each rack has data in, so empty ones can be skipped cheaply.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def covered_intervals(ts: np.ndarray, gap_sec: float) -> np.ndarray:
+    """
+    (k, 2) [first, last] timestamps of the runs of ``ts`` with no hole
+    longer than ``gap_sec``.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if ts.size == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    if np.any(ts[1:] < ts[:-1]):
+        ts = np.sort(ts)
+
+    breaks = np.flatnonzero(np.diff(ts) > gap_sec)
+    starts = np.concatenate([ts[:1], ts[breaks + 1]])
+    ends = np.concatenate([ts[breaks], ts[-1:]])
+    return np.column_stack([starts, ends])
+
+
+def merge_intervals(intervals: np.ndarray, gap_sec: float) -> np.ndarray:
+    """
+    Union of (k, 2) intervals; pieces closer than ``gap_sec`` are joined.
+    """
+    if len(intervals) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    iv = intervals[np.argsort(intervals[:, 0], kind="stable")]
+    run_end = np.maximum.accumulate(iv[:, 1])
+    new = np.concatenate([[True], iv[1:, 0] - run_end[:-1] > gap_sec])
+
+    first = np.flatnonzero(new)
+    last = np.concatenate([first[1:] - 1, [len(iv) - 1]])
+    return np.column_stack([iv[first, 0], run_end[last]])
+
+
+def build_segmented_grid(
+    time_lists: List[np.ndarray],
+    step_sec: int,
+    gap_sec: float,
+    anchor: Optional[int] = None,
+    bounds: Optional[Tuple[int, int]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (grid, segments, intervals):
+        grid      int64 (T,)   grid points inside covered time only
+        segments  int64 (S, 2) row bounds [start, stop) of each segment
+        intervals int64 (S, 2) covered [first, last] time of each segment
+
+    ``anchor`` fixes the grid phase (default: first sample); ``bounds``
+    = [lo, hi) clips the coverage, e.g. to one streaming window.
+    """
+    parts = [covered_intervals(ts, gap_sec) for ts in time_lists]
+    return grid_from_intervals(parts, step_sec, gap_sec, anchor, bounds)
+
+
+def grid_from_intervals(
+    parts: List[np.ndarray],
+    step_sec: int,
+    gap_sec: float,
+    anchor: Optional[int] = None,
+    bounds: Optional[Tuple[int, int]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    build_segmented_grid from the covered intervals of every source, so a
+    job can be planned without its timestamps (e.g. from parse results).
+    """
+    intervals = merge_intervals(np.concatenate(parts) if parts else np.empty((0, 2), np.int64), gap_sec)
+
+    if bounds is not None and len(intervals):
+        lo, hi = bounds
+        intervals = intervals[(intervals[:, 1] >= lo) & (intervals[:, 0] < hi)]
+        intervals = np.column_stack([np.maximum(intervals[:, 0], lo), np.minimum(intervals[:, 1], hi - 1)])
+
+    if len(intervals) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 2), np.int64), intervals
+
+    step = int(step_sec)
+    anchor = int(intervals[0, 0]) if anchor is None else int(anchor)
+
+    first = anchor + -(-(intervals[:, 0] - anchor) // step) * step     # first grid point ≥ start
+    counts = np.maximum((intervals[:, 1] - first) // step + 1, 0)
+    keep = counts > 0
+    first, counts, intervals = first[keep], counts[keep], intervals[keep]
+
+    stops = np.cumsum(counts)
+    segments = np.column_stack([stops - counts, stops])
+
+    # one arange for all segments: row offsets inside each segment, plus its first point
+    seg_of_row = np.repeat(np.arange(len(counts)), counts)
+    grid = first[seg_of_row] + (np.arange(stops[-1] if len(stops) else 0) - segments[seg_of_row, 0]) * step
+
+    return grid.astype(np.int64), segments.astype(np.int64), intervals
+
+
+def coverage_mask(source_times: List[List[np.ndarray]], intervals: np.ndarray, gap_sec: float) -> np.ndarray:
+    """
+    bool (R, S): rack r has at least one source covering segment s.
+    ``source_times[r]`` are the timestamp arrays of rack r's files.
+    """
+    own = [[covered_intervals(ts, gap_sec) for ts in tlists] for tlists in source_times]
+    return coverage_from_intervals(own, intervals)
+
+
+def coverage_from_intervals(source_intervals: List[List[np.ndarray]], intervals: np.ndarray) -> np.ndarray:
+    """
+    coverage_mask from the covered intervals of each rack's sources.
+    """
+    mask = np.zeros((len(source_intervals), len(intervals)), dtype=bool)
+    if len(intervals) == 0:
+        return mask
+
+    for r, parts in enumerate(source_intervals):
+        own = np.concatenate(parts) if parts else np.empty((0, 2), np.int64)
+        if len(own):
+            overlap = (own[:, :1] <= intervals[None, :, 1]) & (own[:, 1:] >= intervals[None, :, 0])
+            mask[r] = overlap.any(axis=0)
+    return mask
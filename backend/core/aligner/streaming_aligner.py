@@ -0,0 +1,308 @@
+"""
+Streaming, windowed alignment for long (multi-day / multi-week) jobs.
+
+align_day_data needs every source of a job in memory and one dense grid
+from the global min to the global max. StreamingAligner instead walks the
+grid window by window (ALIGN_WINDOW_SEC, e.g. one hour):
+
+    1) pull record batches from every source until it has a sample at or
+       past the window end (or is exhausted)
+    2) align the window into a small DayFrame block — same kernels, same
+       grid anchor as align_day_data
+    3) hand the block to a sink (storage / analysis), then drop the rows
+       that only the next windows could still need beyond the carry-over
+
+Carry-over state is the tail of each source's buffer: rows younger than
+ALIGN_CARRY_SEC before the next window start, plus every channel's last
+valid sample before them, however old. Linear interpolation and ffill
+therefore continue across window boundaries and bridge the same gaps as
+align_day_data (up to ALIGN_GAP_SEC / TEMP_FILL_MAX_GAP_SEC when set).
+Windows without any data are skipped, and inside a window only covered
+segments are gridded (ALIGN_GAP_SEC).
+
+Memory per source is bounded by the batches that reach past the current
+window, plus the carry. A batch is one cached member, about a day of
+data, so a job of any length holds one to two days per source, not the
+whole job.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..logging_cfg import get_task_logger
+from ..model.dayframe import DayFrame
+from ..parsers.common import RecordBatch
+from .rollup import RollupAccumulator, build_rollups, rollup_levels
+from .segments import build_segmented_grid, coverage_mask
+from .timeline_aligner import (
+    SUMMARY_CHANNELS,
+    cfg_value,
+    _channel_key,
+    align_matrix_into,
+    channel_layout_for,
+    run_align_tasks,
+    sort_rack_ids,
+)
+
+
+# ---------------------------------------------------------
+# Sources
+# ---------------------------------------------------------
+@dataclass
+class StreamSource:
+    owner: str                          # "bank" or rack id
+    kind: str                           # summary / batvol / battemp
+    batches: Iterator[RecordBatch]      # time-ordered across files
+
+
+class _SourceState:
+    """
+    Row buffer of one source: (time, values) still needed by the aligner.
+    """
+
+    def __init__(self, source: StreamSource):
+        self.source = source
+        self.it = iter(source.batches)
+        self.time = np.empty(0, dtype=np.int64)
+        self.values: Optional[np.ndarray] = None
+        self.columns: List[str] = []
+        self.done = False
+
+    def _pull(self) -> bool:
+        batch = next(self.it, None)
+        if batch is None:
+            self.done = True
+            return False
+        if len(batch) == 0:
+            return True
+
+        if self.values is None:
+            self.columns = list(batch.columns)
+            self.time, self.values = batch.time, batch.values
+            return True
+
+        values = batch.values
+        if list(batch.columns) != self.columns:
+            # a later file with another header: map onto the first one
+            pos = {c: j for j, c in enumerate(batch.columns)}
+            values = np.full((len(batch), len(self.columns)), np.nan, dtype=self.values.dtype)
+            for j, c in enumerate(self.columns):
+                if c in pos:
+                    values[:, j] = batch.values[:, pos[c]]
+
+        self.time = np.concatenate([self.time, batch.time])
+        self.values = np.concatenate([self.values, values.astype(self.values.dtype, copy=False)])
+        return True
+
+    def first_time(self) -> Optional[int]:
+        while not len(self.time) and not self.done:
+            self._pull()
+        return int(self.time[0]) if len(self.time) else None
+
+    def fill_until(self, t_end: int):
+        while not self.done and (not len(self.time) or self.time[-1] < t_end):
+            self._pull()
+
+    def next_time_from(self, t: int) -> Optional[int]:
+        i = np.searchsorted(self.time, t, side="left")
+        return int(self.time[i]) if i < len(self.time) else None
+
+    def trim(self, t_keep: int):
+        """
+        Drop the rows before ``t_keep``, except each channel's last valid
+        sample among them: a later window interpolates / fills from it
+        however old it is (max_gap masks it where one is set).
+        """
+        i = np.searchsorted(self.time, t_keep, side="left")
+        if not i:
+            return
+        head = ~np.isnan(self.values[:i])
+        if head[-1].all():
+            keep = [i - 1]
+        else:
+            last = i - 1 - np.argmax(head[::-1], axis=0)
+            keep = np.unique(last[head.any(axis=0)])
+        self.time = np.concatenate([self.time[keep], self.time[i:]])
+        self.values = np.concatenate([self.values[keep], self.values[i:]])
+
+    @property
+    def finished(self) -> bool:
+        return self.done and not len(self.time)
+
+
+# ---------------------------------------------------------
+# Aligner
+# ---------------------------------------------------------
+class StreamingAligner:
+
+    def __init__(self, sources: List[StreamSource], config=None, job_id: str = "align"):
+        self.states = [_SourceState(s) for s in sources]
+        self.log = get_task_logger(job_id)
+
+        self.step = int(cfg_value(config, "TIME_STEP_SEC", settings.TIME_STEP_SEC))
+        window = int(cfg_value(config, "ALIGN_WINDOW_SEC", settings.ALIGN_WINDOW_SEC)) or 3600
+        self.window = max(self.step, window - window % self.step)   # whole grid steps
+        self.carry = int(cfg_value(config, "ALIGN_CARRY_SEC", settings.ALIGN_CARRY_SEC))
+
+        self.gap = cfg_value(config, "ALIGN_GAP_SEC", settings.ALIGN_GAP_SEC) or None
+        self.temp_mode = cfg_value(config, "TEMP_ALIGN_MODE", settings.TEMP_ALIGN_MODE)
+        self.temp_max_gap = cfg_value(config, "TEMP_FILL_MAX_GAP_SEC", settings.TEMP_FILL_MAX_GAP_SEC)
+        self.layout = channel_layout_for(config)
+        self.threads = cfg_value(config, "ALIGN_THREADS", settings.ALIGN_THREADS)
+        self.rollup_levels = rollup_levels(
+            cfg_value(config, "ROLLUP_LEVELS_SEC", settings.ROLLUP_LEVELS_SEC), self.step,
+        )
+        self.rollup_flush = int(cfg_value(config, "ROLLUP_FLUSH_SEC", settings.ROLLUP_FLUSH_SEC))
+
+    # ------------------------------------------------------------
+    # Topology from the first batch of every source
+    # ------------------------------------------------------------
+    def _columns(self, kind: str, layout_columns) -> List[str]:
+        known = set(layout_columns)
+        extra = {
+            c
+            for st in self.states
+            if st.source.kind == kind
+            for c in st.columns
+            if c not in known
+        }
+        return list(layout_columns) + sorted(extra, key=_channel_key)
+
+    # ------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------
+    def run(self, sink: Callable[[int, DayFrame], None]) -> Dict:
+        """
+        Align window by window; ``sink(part_no, block)`` gets every non-empty
+        block in time order. Returns a small summary of the run.
+
+        ``block.rollups`` only holds complete buckets, gathered over
+        ROLLUP_FLUSH_SEC (most blocks carry none); a bucket cut by the
+        window end is handed on with the next block. Blocks are therefore
+        sunk one window late, so the last one can take the final buckets.
+        """
+        starts = [t for t in (st.first_time() for st in self.states) if t is not None]
+        if not starts:
+            return {"parts": 0, "time_start": None, "time_end": None}
+
+        t0 = min(starts)   # same grid anchor as build_time_grid
+        rack_ids = sort_rack_ids({st.source.owner for st in self.states if st.source.owner != "bank"})
+        cell_columns = tuple(self._columns("batvol", self.layout.cell_columns))
+        temp_columns = tuple(self._columns("battemp", self.layout.temp_columns))
+
+        part = 0
+        t_last = None
+        w0 = t0
+        rollups = RollupAccumulator(self.rollup_flush)
+        held = None
+
+        while True:
+            w1 = w0 + self.window
+            for st in self.states:
+                st.fill_until(w1)
+
+            if all(st.finished for st in self.states):
+                break
+
+            # skip windows with no samples at all (days missing from the job)
+            nxt = [t for t in (st.next_time_from(w0) for st in self.states) if t is not None]
+            if not nxt:
+                break
+            if min(nxt) >= w1:
+                skip = (min(nxt) - w0) // self.window
+                for st in self.states:
+                    st.trim(w0 + skip * self.window - self.carry)
+                w0 += skip * self.window
+                continue
+
+            # the last window stops at the last sample, like build_time_grid
+            end = w1
+            if all(st.done for st in self.states):
+                t_max = max(int(st.time[-1]) for st in self.states if len(st.time))
+                end = min(w1, t_max + 1)
+
+            tic = time.time()
+            block = self._align_window(t0, w0, end, rack_ids, cell_columns, temp_columns)
+            if not block.n_time:
+                # only isolated samples around the window: nothing to grid
+                for st in self.states:
+                    st.trim(w1 - self.carry)
+                w0 = w1
+                continue
+            block.rollups = rollups.push(block.rollups)
+            if held is not None:
+                sink(*held)
+            held = (part, block)
+            self.log.info(f"window {part}: {block} in {time.time() - tic:.2f}s")
+
+            part += 1
+            t_last = int(block.time[-1])
+            for st in self.states:
+                st.trim(w1 - self.carry)
+            w0 = w1
+
+        if held is not None:
+            held[1].rollups = rollups.flush(held[1].rollups)
+            sink(*held)
+
+        return {"parts": part, "time_start": t0, "time_end": t_last}
+
+    def _window_grid(self, t0: int, w0: int, end: int, rack_ids: List[str]):
+        if not self.gap:
+            return np.arange(w0, end, self.step, dtype=np.int64), None, None
+
+        # covered segments inside the window, same phase as the full grid
+        tlists = [st.time for st in self.states]
+        grid, segments, intervals = build_segmented_grid(tlists, self.step, self.gap, anchor=t0, bounds=(w0, end))
+        per_rack = [[st.time for st in self.states if st.source.owner == rid] for rid in rack_ids]
+        return grid, segments, coverage_mask(per_rack, intervals, self.gap)
+
+    def _align_window(self, t0, w0, end, rack_ids, cell_columns, temp_columns) -> DayFrame:
+        grid, segments, coverage = self._window_grid(t0, w0, end, rack_ids)
+        block = DayFrame.allocate(
+            grid,
+            rack_ids,
+            cell_columns,
+            temp_columns,
+            self.layout.cells_per_module,
+            self.layout.temps_per_module,
+            segments=segments,
+            coverage=coverage,
+        )
+        if not len(grid):
+            return block
+
+        tasks = []
+        for st in self.states:
+            if st.values is None:
+                continue
+            src = st.source
+            args = (st.time, st.values, st.columns, grid)
+
+            if src.kind == "summary":
+                dest = np.full((len(grid), len(SUMMARY_CHANNELS)), np.nan, dtype=np.float32)
+                block.summary[src.owner] = {c: dest[:, j] for j, c in enumerate(SUMMARY_CHANNELS)}
+                fn = partial(align_matrix_into, *args, dest, SUMMARY_CHANNELS, max_gap_sec=self.gap)
+            elif src.kind == "batvol":
+                r = block.rack_index(src.owner)
+                block.has_voltage[r] = True
+                fn = partial(align_matrix_into, *args, block.voltage[r], cell_columns, max_gap_sec=self.gap)
+            elif src.kind == "battemp":
+                r = block.rack_index(src.owner)
+                block.has_temp[r] = True
+                fn = partial(
+                    align_matrix_into, *args, block.temp[r], temp_columns,
+                    self.temp_mode, self.temp_max_gap,
+                )
+            else:
+                continue
+            tasks.append((src.owner, src.kind, fn))
+
+        run_align_tasks(tasks, self.threads, self.log)
+        block.rollups = build_rollups(block, self.rollup_levels)
+        return block
@@ -3,47 +3,76 @@ Timeline & hierarchical alignment:
 
 1) Build unified time grid (5s interval)
 2) Align all bank/rack/module/cell values to the same time grid
-3) Construct module/cell topology (32 cells per module, 20 temp sensors)
+3) Pack everything into a DayFrame (contiguous float32 rack tensors);
+   module/cell topology (32 cells per module, 20 temp sensors) comes from
+   HierarchyBuilder and is a reshape view (T, modules, 32) of each rack
+4) Reduce the frame into the 1 min / 15 min / 1 h rollup pyramid
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import partial
+
 import numpy as np
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
-from .interpolation import sync_and_interp
+from .interpolation import sync_and_interp, sync_and_interp_matrix, values_matrix
+from .rollup import build_rollups, rollup_levels
+from .segments import covered_intervals, coverage_from_intervals, grid_from_intervals
+from ..config import settings
 from ..logging_cfg import get_task_logger
+from ..model.dayframe import DayFrame
+from ..model.hierarchy import ChannelLayout, HierarchyBuilder, gather_indices
+from ..parsers.columnar import views_matrix
+
+
+SUMMARY_CHANNELS = ("totalVol", "totalCur", "soc", "soh")
 
 
 # ---------------------------------------------------------
 # Build time grid
 # ---------------------------------------------------------
-def build_time_grid(time_lists: List[List[datetime]], step_sec=5) -> List[datetime]:
+def time_bounds(time_lists: List[np.ndarray]) -> Optional[Tuple[int, int]]:
     """
-    union of all timestamps → min/max → generate dense grid
+    (min, max) over all sources, one reduction per source — the
+    timestamps are never concatenated.
     """
-    all_ts = []
+    lo = hi = None
     for ts in time_lists:
-        all_ts.extend(ts)
+        ts = np.asarray(ts)
+        if ts.size == 0:
+            continue
+        tmin, tmax = int(ts.min()), int(ts.max())
+        lo = tmin if lo is None else min(lo, tmin)
+        hi = tmax if hi is None else max(hi, tmax)
+    return None if lo is None else (lo, hi)
 
-    if not all_ts:
-        return []
 
-    tmin = min(all_ts)
-    tmax = max(all_ts)
+def build_time_grid(time_lists: List[np.ndarray], step_sec=5) -> np.ndarray:
+    """
+    union of all timestamps → min/max → generate dense grid
+    time_lists: int64 epoch-second arrays; returns an int64 epoch grid
 
-    grid = []
-    cur = tmin
-    while cur <= tmax:
-        grid.append(cur)
-        cur += timedelta(seconds=step_sec)
+    The grid is a single np.arange, so multi-day / multi-week ranges cost
+    8 bytes per point and no Python objects.
+    """
+    bounds = time_bounds(time_lists)
+    if bounds is None:
+        return np.empty(0, dtype=np.int64)
 
-    return grid
+    tmin, tmax = bounds
+    return np.arange(tmin, tmax + 1, int(step_sec), dtype=np.int64)
 
 
 # ---------------------------------------------------------
 # Align summary data (bank & rack)
 # ---------------------------------------------------------
-def align_summary(summary_raw: Dict, time_grid: List[datetime]) -> Dict:
+def align_summary(
+    summary_raw: Dict,
+    time_grid: np.ndarray,
+    max_gap_sec: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
     """
     summary_raw example:
       {
@@ -51,92 +80,307 @@ def align_summary(summary_raw: Dict, time_grid: List[datetime]) -> Dict:
         "totalVol": [...],
         ...
       }
+
+    Returns {channel: float32 (T,)} on the grid; missing channels are NaN.
     """
+    channels = {k: summary_raw[k] for k in SUMMARY_CHANNELS if k in summary_raw}
+    aligned = sync_and_interp(summary_raw["time"], channels, time_grid, max_gap=max_gap_sec)
+
     return {
-        "time": time_grid,
-        "totalVol": sync_and_interp(summary_raw["time"], {"v": summary_raw["totalVol"]}, time_grid)["v"],
-        "totalCur": sync_and_interp(summary_raw["time"], {"c": summary_raw.get("totalCur", [])}, time_grid)["c"],
-        "soc": sync_and_interp(summary_raw["time"], {"soc": summary_raw.get("soc", [])}, time_grid)["soc"],
-        "soh": sync_and_interp(summary_raw["time"], {"soh": summary_raw.get("soh", [])}, time_grid)["soh"],
+        k: (aligned[k] if k in aligned else np.full(len(time_grid), np.nan)).astype(np.float32)
+        for k in SUMMARY_CHANNELS
     }
 
 
+# ---------------------------------------------------------
+# Rack tensors
+# ---------------------------------------------------------
+def _channel_key(name: str):
+    """
+    V1, V2, ..., V10 in numeric (not lexical) order.
+    """
+    digits = name[1:]
+    return (0, int(digits), name) if digits.isdigit() else (1, 0, name)
+
+
+def align_matrix_into(
+    time_src: np.ndarray,
+    matrix: np.ndarray,
+    names,
+    time_grid: np.ndarray,
+    dest: np.ndarray,
+    columns: Tuple[str, ...],
+    mode: str = "linear",
+    max_gap_sec: Optional[float] = None,
+):
+    """
+    Align an (n × N) source block with column ``names`` into dest (T, M)
+    laid out as ``columns``. Gather indices map file columns to frame
+    columns (cached per header). When the file already has the frame
+    order the kernel writes into ``dest`` in place, otherwise there is a
+    single scatter.
+    """
+    src_idx, dst_idx = gather_indices(tuple(columns), tuple(names))
+    k = len(src_idx)
+    if k == 0:
+        return
+
+    if np.array_equal(src_idx, np.arange(k)) and np.array_equal(dst_idx, np.arange(k)):
+        sync_and_interp_matrix(time_src, matrix[:, :k], time_grid, mode, max_gap_sec, out=dest[:, :k])
+    else:
+        dest[:, dst_idx] = sync_and_interp_matrix(time_src, matrix[:, src_idx], time_grid, mode, max_gap_sec)
+
+
+def channel_matrix(values: Dict[str, np.ndarray], n_rows: int) -> np.ndarray:
+    """
+    The parsed channels are views of one (n × N) block, which is used as
+    is; anything else is stacked once.
+    """
+    matrix = views_matrix(values)
+    return matrix if matrix is not None else values_matrix(values, n_rows)
+
+
+def align_channels(
+    raw: Dict,
+    channel_key: str,
+    time_grid: np.ndarray,
+    dest: np.ndarray,
+    columns: Tuple[str, ...],
+    mode: str = "linear",
+    max_gap_sec: Optional[float] = None,
+):
+    """
+    Align one batVol / batTemp file straight into its rack slice of the
+    frame tensor, dest (T, N) in ``columns`` order.
+    """
+    values = raw[channel_key]
+    matrix = channel_matrix(values, len(raw["time"]))
+    align_matrix_into(raw["time"], matrix, values.keys(), time_grid, dest, columns, mode, max_gap_sec)
+
+
 # ---------------------------------------------------------
 # Align batVol (cell voltages)
 # ---------------------------------------------------------
-def align_batvol(vol_raw: Dict, time_grid: List[datetime]) -> Dict[str, List]:
+def align_batvol(
+    vol_raw: Dict,
+    time_grid: np.ndarray,
+    dest: np.ndarray,
+    columns,
+    max_gap_sec: Optional[float] = None,
+):
     """
     vol_raw:
       {
         "time": [...],
         "voltage": {"V1":[...], "V2":[...], ...}
       }
+
+    Linear interpolation; holes longer than ``max_gap_sec`` stay NaN.
     """
-    return sync_and_interp(vol_raw["time"], vol_raw["voltage"], time_grid, mode="linear")
+    align_channels(vol_raw, "voltage", time_grid, dest, columns, mode="linear", max_gap_sec=max_gap_sec)
 
 
 # ---------------------------------------------------------
 # Align batTemp (temperature sensors)
 # ---------------------------------------------------------
-def align_battemp(temp_raw: Dict, time_grid: List[datetime]) -> Dict[str, List]:
+def align_battemp(
+    temp_raw: Dict,
+    time_grid: np.ndarray,
+    dest: np.ndarray,
+    columns,
+    mode: str = "ffill",
+    max_gap_sec: Optional[float] = None,
+):
     """
     temp_raw:
       {
         "time": [...],
         "temp": {"T1":[...], "T2":[...], ...}
       }
+
+    Temperatures are held (ffill) or snapped (nearest) onto the grid, not
+    interpolated; samples older than ``max_gap_sec`` are not carried.
+    """
+    align_channels(temp_raw, "temp", time_grid, dest, columns, mode=mode, max_gap_sec=max_gap_sec)
+
+
+def cfg_value(config, name: str, default):
+    # worker passes a plain dict, scripts may pass the Settings object
+    if config is None:
+        return default
+    if isinstance(config, dict):
+        return config.get(name, default)
+    return getattr(config, name, default)
+
+
+def channel_layout_for(config) -> ChannelLayout:
+    return HierarchyBuilder(
+        n_racks=1,
+        n_modules=cfg_value(config, "MODULES_PER_RACK", settings.MODULES_PER_RACK),
+        cell_rows=cfg_value(config, "MODULE_ROWS", settings.MODULE_ROWS),
+        cell_cols=cfg_value(config, "MODULE_COLS", settings.MODULE_COLS),
+        temp_per_module=cfg_value(config, "TEMP_PER_MODULE", settings.TEMP_SENSORS_PER_MODULE),
+    ).channel_layout()
+
+
+def sort_rack_ids(rack_ids) -> List[str]:
+    # rack2 before rack10
+    return sorted(rack_ids, key=lambda r: (len(r), r))
+
+
+def run_align_tasks(tasks: List[Tuple[str, str, Callable]], threads: int, log) -> List[Any]:
     """
-    return sync_and_interp(temp_raw["time"], temp_raw["temp"], time_grid, mode="ffill")
+    Run (owner, kind, fn) tasks, on a thread pool when ``threads`` > 1 (the
+    kernels are NumPy calls that release the GIL). Results come back in
+    task order; per-owner timings are logged in that order too.
+    """
+    def timed(fn):
+        tic = time.perf_counter()
+        res = fn()
+        return res, time.perf_counter() - tic
+
+    if threads and threads > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=min(threads, len(tasks)), thread_name_prefix="align") as pool:
+            futures = [pool.submit(timed, fn) for _, _, fn in tasks]
+            outcomes = [f.result() for f in futures]
+    else:
+        outcomes = [timed(fn) for _, _, fn in tasks]
+
+    timings: Dict[str, List[str]] = {}
+    for (owner, kind, _), (_, dt) in zip(tasks, outcomes):
+        timings.setdefault(owner, []).append(f"{kind} {dt * 1000:.0f}ms")
+    for owner, parts in timings.items():
+        log.info(f"Aligned {owner}: {', '.join(parts)}")
+
+    return [res for res, _ in outcomes]
 
 
 # ---------------------------------------------------------
-# Build hierarchical modules
+# Planning: grid + topology from per-source summaries
 # ---------------------------------------------------------
-def build_module_structure(vol_aligned: Dict[str, List], temp_aligned: Dict[str, List], config) -> Dict:
+@dataclass
+class SourceSpan:
     """
-    config:
-      CELLS_PER_MODULE = 32
-      TEMP_PER_MODULE  = 20
-
-    vol_aligned: {"V1":[...], "V2":[...], ...}
+    What planning needs to know about one parsed file: its covered time
+    intervals and channel names (small — crosses process boundaries).
     """
+    owner: str                  # "bank" or rack id
+    kind: str                   # summary / batvol / battemp
+    intervals: np.ndarray       # int64 (k, 2) covered [first, last] times
+    columns: List[str] = field(default_factory=list)
 
-    cells_per_mod = config.CELLS_PER_MODULE
-    temp_per_mod = config.TEMP_PER_MODULE
 
-    # total cells: e.g. 224 = 7 modules * 32 cells
-    all_cell_keys = sorted(vol_aligned.keys(), key=lambda x: int(x[1:]))
-
-    modules = {}
-    num_modules = len(all_cell_keys) // cells_per_mod
+@dataclass
+class AlignPlan:
+    """
+    Everything a frame is allocated from: the grid, its segments, rack
+    coverage and the column layout. The same plan is used by every
+    per-rack task of a fanned-out job, so their slices line up.
+    """
+    time: np.ndarray
+    rack_ids: List[str]
+    cell_columns: List[str]
+    temp_columns: List[str]
+    cells_per_module: int = 32
+    temps_per_module: int = 20
+    segments: Optional[np.ndarray] = None
+    coverage: Optional[np.ndarray] = None
+
+    def for_racks(self, rack_ids: List[str]) -> "AlignPlan":
+        rows = [self.rack_ids.index(r) for r in rack_ids]
+        return replace(
+            self,
+            rack_ids=list(rack_ids),
+            coverage=self.coverage[rows] if self.coverage is not None else None,
+        )
+
+    def allocate(self) -> DayFrame:
+        return DayFrame.allocate(
+            self.time,
+            self.rack_ids,
+            self.cell_columns,
+            self.temp_columns,
+            self.cells_per_module,
+            self.temps_per_module,
+            segments=self.segments,
+            coverage=self.coverage,
+        )
+
+
+_CHANNEL_KEYS = {"batvol": "voltage", "battemp": "temp"}
+
+
+def describe_source(owner: str, kind: str, raw: Dict, gap_sec: Optional[float]) -> SourceSpan:
+    """
+    SourceSpan of one parsed file (``gap_sec`` None: one interval).
+    """
+    key = _CHANNEL_KEYS.get(kind)
+    return SourceSpan(
+        owner=owner,
+        kind=kind,
+        intervals=covered_intervals(raw["time"], gap_sec or np.inf),
+        columns=list(raw[key].keys()) if key else [],
+    )
 
-    for m in range(num_modules):
-        mod_id = f"module{m+1}"
 
-        # slice cell indices
-        cell_keys = all_cell_keys[m*cells_per_mod:(m+1)*cells_per_mod]
+def day_sources(day_raw: Dict[str, Any], gap_sec: Optional[float]) -> List[SourceSpan]:
+    spans = []
+    if "bank" in day_raw["summary"]:
+        spans.append(describe_source("bank", "summary", day_raw["summary"]["bank"], gap_sec))
+    for rack_id, rack in day_raw["rack"].items():
+        for kind in ("summary", "batvol", "battemp"):
+            if kind in rack:
+                spans.append(describe_source(rack_id, kind, rack[kind], gap_sec))
+    return spans
 
-        # gather voltage T × N
-        volt_mat = np.stack([vol_aligned[k] for k in cell_keys], axis=1)  # shape: (T, 32)
 
-        # temperatures
-        # T1~T20 per module (temperature sensors)
-        start_temp = m * temp_per_mod + 1
-        temp_keys = [f"T{i}" for i in range(start_temp, start_temp + temp_per_mod)]
-        temp_mat = np.stack([temp_aligned[k] for k in temp_keys], axis=1)  # shape: (T,20)
+def _frame_columns(spans: List[SourceSpan], kind: str, layout_columns) -> List[str]:
+    """
+    Topology order first; channels the topology does not know are appended
+    so nothing read from the files is dropped.
+    """
+    known = set(layout_columns)
+    extra = {c for s in spans if s.kind == kind for c in s.columns if c not in known}
+    return list(layout_columns) + sorted(extra, key=_channel_key)
 
-        modules[mod_id] = {
-            "voltage": volt_mat.tolist(),
-            "temp": temp_mat.tolist(),
-        }
 
-    return modules
+def plan_alignment(spans: List[SourceSpan], config, rack_ids: Optional[List[str]] = None) -> AlignPlan:
+    """
+    Unified grid (covered segments only, dense if ALIGN_GAP_SEC = 0),
+    rack coverage and frame columns for a set of sources.
+    """
+    if rack_ids is None:
+        rack_ids = sort_rack_ids({s.owner for s in spans if s.owner != "bank"})
+    step_sec = cfg_value(config, "TIME_STEP_SEC", settings.TIME_STEP_SEC)
+    gap_sec = cfg_value(config, "ALIGN_GAP_SEC", settings.ALIGN_GAP_SEC) or None
+
+    parts = [s.intervals for s in spans]
+    if gap_sec:
+        time_grid, segments, intervals = grid_from_intervals(parts, step_sec, gap_sec)
+        own = [[s.intervals for s in spans if s.owner == rack_id] for rack_id in rack_ids]
+        coverage = coverage_from_intervals(own, intervals)
+    else:
+        # dense grid: each source is a single [min, max] interval
+        time_grid = build_time_grid([p.ravel() for p in parts], step_sec=step_sec)
+        segments = coverage = None
+
+    layout = channel_layout_for(config)
+    return AlignPlan(
+        time=time_grid,
+        rack_ids=list(rack_ids),
+        cell_columns=_frame_columns(spans, "batvol", layout.cell_columns),
+        temp_columns=_frame_columns(spans, "battemp", layout.temp_columns),
+        cells_per_module=layout.cells_per_module,
+        temps_per_module=layout.temps_per_module,
+        segments=segments,
+        coverage=coverage,
+    )
 
 
 # ---------------------------------------------------------
 # MAIN ENTRY
 # ---------------------------------------------------------
-def align_day_data(day_raw: Dict[str, Any], config) -> Dict[str, Any]:
+def align_day_data(day_raw: Dict[str, Any], config) -> DayFrame:
     """
     day_raw structure:
       {
@@ -149,71 +393,83 @@ def align_day_data(day_raw: Dict[str, Any], config) -> Dict[str, Any]:
             },
             ...
       }
-    """
-
-    log = get_task_logger("align")
 
-    # Collect all timelines
-    tlists = []
+    Returns a DayFrame: (rack, time, cell) / (rack, time, sensor) float32
+    tensors on one int64 time grid; modules are views into those. The grid
+    only spans covered time (holes > ALIGN_GAP_SEC are cut out).
+    """
+    gap_sec = cfg_value(config, "ALIGN_GAP_SEC", settings.ALIGN_GAP_SEC) or None
+    plan = plan_alignment(day_sources(day_raw, gap_sec), config, sort_rack_ids(day_raw["rack"].keys()))
+    return align_planned(day_raw, plan, config)
 
-    # bank
-    if "bank" in day_raw["summary"]:
-        tlists.append(day_raw["summary"]["bank"]["time"])
 
-    # rack
-    for rack_id, rack in day_raw["rack"].items():
-        if "summary" in rack:
-            tlists.append(rack["summary"]["summary"]["time"] if "summary" in rack["summary"] else rack["summary"]["time"])
-        if "batvol" in rack:
-            tlists.append(rack["batvol"]["time"])
-        if "battemp" in rack:
-            tlists.append(rack["battemp"]["time"])
+def align_planned(day_raw: Dict[str, Any], plan: AlignPlan, config, log=None) -> DayFrame:
+    """
+    Align ``day_raw`` onto a given plan. ``day_raw`` may hold only part of
+    a job (one rack, or just the bank summary) as long as the plan's racks
+    are the ones it contains.
+    """
+    log = log or get_task_logger("align")
+    log.info(f"Timeline: {len(plan.segments) if plan.segments is not None else 1} covered segment(s), "
+             f"{len(plan.time)} grid points")
 
-    # Build unified time grid
-    time_grid = build_time_grid(tlists, step_sec=config.TIME_STEP_SEC)
+    gap_sec = cfg_value(config, "ALIGN_GAP_SEC", settings.ALIGN_GAP_SEC) or None
+    step_sec = cfg_value(config, "TIME_STEP_SEC", settings.TIME_STEP_SEC)
+    temp_mode = cfg_value(config, "TEMP_ALIGN_MODE", settings.TEMP_ALIGN_MODE)
+    temp_max_gap = cfg_value(config, "TEMP_FILL_MAX_GAP_SEC", settings.TEMP_FILL_MAX_GAP_SEC)
 
-    aligned = {
-        "time": time_grid,
-        "bank": {},
-        "rack": {},
-    }
+    frame = plan.allocate()
+    time_grid = frame.time
+    cell_columns, temp_columns = tuple(frame.cell_columns), tuple(frame.temp_columns)
 
     # ---------------------------------------------------------
-    # BANK summary
+    # BANK summary + RACKS: one task per file, racks (and voltage vs
+    # temperature inside a rack) run concurrently with ALIGN_THREADS > 1;
+    # every task writes its own slice of the frame tensors
     # ---------------------------------------------------------
+    tasks = []
     if "bank" in day_raw["summary"]:
-        log.info("Aligning bank summary...")
-        aligned["bank"] = align_summary(day_raw["summary"]["bank"], time_grid)
+        tasks.append(("bank", "summary", partial(align_summary, day_raw["summary"]["bank"], time_grid, gap_sec)))
 
-    # ---------------------------------------------------------
-    # RACKS
-    # ---------------------------------------------------------
-    for rack_id, rack in day_raw["rack"].items():
-        log.info(f"Aligning {rack_id}")
-
-        rack_out = {}
+    for r, rack_id in enumerate(plan.rack_ids):
+        rack = day_raw["rack"].get(rack_id, {})
 
         # rack summary
         if "summary" in rack:
-            rack_out["summary"] = align_summary(rack["summary"], time_grid)
+            tasks.append((rack_id, "summary", partial(align_summary, rack["summary"], time_grid, gap_sec)))
 
         # voltage
         if "batvol" in rack:
-            vol_aligned = align_batvol(rack["batvol"], time_grid)
-        else:
-            vol_aligned = {}
+            tasks.append((rack_id, "batvol", partial(
+                align_batvol, rack["batvol"], time_grid, frame.voltage[r], cell_columns, gap_sec,
+            )))
 
         # temperature
         if "battemp" in rack:
-            temp_aligned = align_battemp(rack["battemp"], time_grid)
-        else:
-            temp_aligned = {}
+            tasks.append((rack_id, "battemp", partial(
+                align_battemp, rack["battemp"], time_grid, frame.temp[r], temp_columns, temp_mode, temp_max_gap,
+            )))
+
+    threads = cfg_value(config, "ALIGN_THREADS", settings.ALIGN_THREADS)
+    results = run_align_tasks(tasks, threads, log)
+
+    # results are applied in task order → identical frame for any thread count
+    for (owner, kind, _), res in zip(tasks, results):
+        if kind == "summary":
+            frame.summary[owner] = res
+        elif kind == "batvol":
+            frame.has_voltage[frame.rack_index(owner)] = True
+        elif kind == "battemp":
+            frame.has_temp[frame.rack_index(owner)] = True
 
-        # module structure
-        if vol_aligned and temp_aligned:
-            modules = build_module_structure(vol_aligned, temp_aligned, config)
-            rack_out["modules"] = modules
-
-        aligned["rack"][rack_id] = rack_out
-
-    return aligned
+    # ---------------------------------------------------------
+    # ROLLUPS (coarse views for overview / drill-down queries)
+    # ---------------------------------------------------------
+    levels = rollup_levels(cfg_value(config, "ROLLUP_LEVELS_SEC", settings.ROLLUP_LEVELS_SEC), step_sec)
+    tic = time.perf_counter()
+    frame.rollups = build_rollups(frame, levels)
+    if frame.rollups:
+        log.info(f"Rollups {list(frame.rollups.values())} in {(time.perf_counter() - tic) * 1000:.0f}ms")
+
+    log.info(f"Aligned {frame}")
+    return frame
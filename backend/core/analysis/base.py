@@ -4,7 +4,9 @@ Base analysis plugin — all analysis modules derive from this.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+from ..model.dayframe import DayFrame
 
 
 class AnalysisPlugin(ABC):
@@ -15,16 +17,19 @@ class AnalysisPlugin(ABC):
 
     name: str = "base_plugin"
     plugin_type: str = "generic"  # "cell", "anomaly", "soh", etc.
+    version: str = "1"            # bump when the output changes: cached results are keyed by it
+    config_keys: Optional[Tuple[str, ...]] = None   # config the output depends on (None = all of it)
 
     @abstractmethod
-    def run(self, aligned: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    def run(self, aligned: DayFrame, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         Perform an analysis step.
 
         Parameters
         ----------
-        aligned: dict
-            Aligned, structured dataset (bank → racks → modules → cells)
+        aligned: DayFrame
+            Aligned dataset: (rack, time, cell) / (rack, time, sensor)
+            tensors; use ``aligned.iter_modules()`` for per-module views
         config: dict
             Configuration parameters from settings
 
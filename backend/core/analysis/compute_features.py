@@ -5,21 +5,22 @@ Calls the AnalysisRegistry.run_all to execute all registered plugins.
 """
 
 from typing import Dict, Any
+from ..model.dayframe import DayFrame
 from .registry import registry
 from ..logging_cfg import get_task_logger
 
 log = get_task_logger("compute_features")
 
 
-def compute_battery_features(aligned: Dict[str, Any], config: Dict[str, Any] = None) -> Dict[str, Any]:
+def compute_battery_features(aligned: DayFrame, config: Dict[str, Any] = None, names=None) -> Dict[str, Any]:
     """
-    Run all registered analysis plugins on `aligned` data and return a dict
-    mapping plugin_name -> plugin_result.
+    Run all registered analysis plugins (or only ``names``) on `aligned`
+    data and return a dict mapping plugin_name -> plugin_result.
     """
     cfg = config or {}
     try:
         log.info("compute_battery_features: running registry.run_all")
-        results = registry.run_all(aligned, cfg)
+        results = registry.run_all(aligned, cfg, names)
         log.info(f"compute_battery_features: finished, plugins={list(results.keys())}")
         return results
     except Exception as e:
@@ -36,12 +36,17 @@ class AnalysisRegistry:
     def list_plugins(self) -> List[str]:
         return list(self._plugins.keys())
 
+    def get(self, name: str) -> Type[AnalysisPlugin]:
+        return self._plugins[name]
+
     # -----------------------------------------------------
     # Execute all plugins
     # -----------------------------------------------------
-    def run_all(self, aligned, config):
+    def run_all(self, aligned, config, names=None):
         results = {}
         for name, pcls in self._plugins.items():
+            if names is not None and name not in names:
+                continue
             plugin = pcls()
             output = plugin.run(aligned, config)
             results[name] = output
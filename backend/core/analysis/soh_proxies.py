@@ -9,6 +9,7 @@ SOH proxy uses:
 
 import numpy as np
 from typing import Dict, Any
+from ..model.dayframe import DayFrame
 from .base import AnalysisPlugin
 from .registry import registry
 
@@ -17,30 +18,28 @@ from .registry import registry
 class SOHProxyPlugin(AnalysisPlugin):
     name = "soh_proxy"
     plugin_type = "soh"
+    version = "2"
+    config_keys = ()
 
-    def run(self, aligned: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    def run(self, aligned: DayFrame, config: Dict[str, Any]) -> Dict[str, Any]:
 
         result = {}
 
-        for rack_id, rack in aligned["rack"].items():
-            rack_out = {}
+        for rack_id, mod_id, volt, _temp in aligned.iter_modules():
+            rack_out = result.setdefault(rack_id, {})
 
-            for mod_id, mod in rack["modules"].items():
-                volt = np.array(mod["voltage"])
-                dvdt = np.gradient(volt, axis=0)
+            dvdt = aligned.segmented_gradient(rack_id, volt)   # within segments only
 
-                v_mean = np.nanmean(volt, axis=1)
-                dvdt_mean = np.nanmean(dvdt, axis=1)
+            v_mean = np.nanmean(volt, axis=1)
+            dvdt_mean = np.nanmean(dvdt, axis=1)
 
-                # Simple heuristics
-                soh_cap = (v_mean - np.min(v_mean)) / (np.max(v_mean) - np.min(v_mean) + 1e-6)
-                soh_res = np.tanh(1 / (np.abs(dvdt_mean) + 1e-6))
+            # Simple heuristics
+            soh_cap = (v_mean - np.min(v_mean)) / (np.max(v_mean) - np.min(v_mean) + 1e-6)
+            soh_res = np.tanh(1 / (np.abs(dvdt_mean) + 1e-6))
 
-                rack_out[mod_id] = {
-                    "soh_capacity": soh_cap.mean().item(),
-                    "soh_resistance": soh_res.mean().item(),
-                }
-
-            result[rack_id] = rack_out
+            rack_out[mod_id] = {
+                "soh_capacity": soh_cap.mean().item(),
+                "soh_resistance": soh_res.mean().item(),
+            }
 
         return result
@@ -2,15 +2,12 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict
 
-from ..pipeline.dispatcher import Dispatcher
-from ..pipeline.worker_pool import JobStatus
+from ..pipeline.dispatcher import dispatcher   # 全局 dispatcher (AsyncDispatcher)
+from ..pipeline.status import JobStatus
 from ..logging_cfg import get_task_logger
 
 router = APIRouter()
 
-# 全局 dispatcher
-dispatcher = Dispatcher()
-
 # -----------------------------
 # 请求模型
 # -----------------------------
@@ -29,25 +26,25 @@ class JobResponse(BaseModel):
 # API
 # -----------------------------
 @router.post("/start", response_model=JobResponse)
-def start_job(req: JobRequest):
+async def start_job(req: JobRequest):
     """
     启动一个新任务：
     - ingest
     - align
     - analyze
     streaming 模式多进程执行
+
+    Returns as soon as the task is scheduled; it runs in the background
+    (progress: GET /{job_id} or the /ws/progress/{job_id} WebSocket).
     """
     log = get_task_logger()
 
     try:
-        job_id = dispatcher.create_job(
-            input_files=req.files,
-            config_override=req.config_override,
-        )
+        job_id = await dispatcher.start(req.files, req.config_override)
 
         log.info(f"Job started: {job_id}")
 
-        return JobResponse(job_id=job_id, status="queued", message="Job accepted")
+        return JobResponse(job_id=job_id, status=JobStatus.QUEUED.value, message="Job accepted")
 
     except Exception as e:
         log.error(f"Failed to start job: {e}")
@@ -55,35 +52,41 @@ def start_job(req: JobRequest):
 
 
 @router.get("/{job_id}", response_model=Dict)
-def get_job_status(job_id: str):
+async def get_job_status(job_id: str):
     """
-    查询任务状态（queue / running / finished / error）
+    查询任务状态（queued / running / finished / error / cancelled）
     """
-    job = dispatcher.get_job(job_id)
-    if job is None:
+    state = await dispatcher.status(job_id)
+    if state is None:
         raise HTTPException(404, f"Job not found: {job_id}")
 
     return {
         "job_id": job_id,
-        "status": job.status.value,
-        "progress": job.progress,
-        "message": job.message,
-        "errors": job.errors,
+        "status": state.get("status"),
+        "progress": {
+            "total": state.get("total"),
+            "finished": state.get("finished"),
+            "failed": state.get("failed"),
+            "stage": state.get("stage"),
+            "cache": state.get("cache", {}),
+        },
+        "message": state.get("msg", ""),
+        "errors": [state["error"]] if state.get("error") else [],
     }
 
 
 @router.post("/{job_id}/cancel", response_model=JobResponse)
-def cancel_job(job_id: str):
+async def cancel_job(job_id: str):
     """
-    取消任务
+    取消任务（已在运行的子任务会执行完）
     """
-    try:
-        dispatcher.cancel_job(job_id)
-        return JobResponse(
-            job_id=job_id,
-            status="cancelled",
-            message="Job cancelled",
-        )
-    except Exception as e:
-        raise HTTPException(400, f"Cancel failed: {e}")
+    if await dispatcher.status(job_id) is None:
+        raise HTTPException(404, f"Job not found: {job_id}")
+    if not await dispatcher.cancel(job_id):
+        raise HTTPException(400, f"Cancel failed: job {job_id} is not running")
+    return JobResponse(
+        job_id=job_id,
+        status=JobStatus.CANCELLED.value,
+        message="Job cancelled",
+    )
 # /api/jobs - 启动/取消/状态
\ No newline at end of file
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from ..storage.result_store import ResultStore
 from ..config import settings
@@ -37,3 +37,38 @@ def download_result(job_id: str):
         raise HTTPException(404, f"No downloadable bundle for job {job_id}")
 
     return FileResponse(f, media_type="application/zip", filename=f"{job_id}.zip")
+
+
+@router.get("/{job_id}/rollup/{level}/{owner}/{kind}", response_model=Dict)
+def get_rollup(
+    job_id: str,
+    level: str,
+    owner: str,
+    kind: str,
+    channels: Optional[str] = Query(None, description="逗号分隔, 如 V1,V2"),
+    stats: Optional[str] = Query(None, description="min,max,mean,last"),
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+):
+    """
+    粗粒度曲线 (1m / 15m / 1h): 概览与下钻不读 5 s 原始对齐数据
+      owner: bank / rack1 ...
+      kind : summary / batvol / battemp
+    """
+    levels = store.rollup_levels(job_id)
+    if level not in levels:
+        raise HTTPException(404, f"No {level} rollup for job {job_id} (have: {sorted(levels)})")
+
+    data = store.load_rollup(
+        job_id,
+        level,
+        owner,
+        kind,
+        channels=channels.split(",") if channels else None,
+        stats=stats.split(",") if stats else None,
+        start=start,
+        end=end,
+    )
+    if data is None:
+        raise HTTPException(404, f"No {kind} rollup for {owner} in job {job_id}")
+    return data
@@ -37,19 +37,53 @@ class Settings(BaseSettings):
     CHUNK_ROWS: int = 5000                     # rows per CSV chunk
     READ_BUFFER_SIZE: int = 4 * 1024 * 1024    # 4MB streaming buffer
 
-    MEMORY_SOFT_LIMIT_MB: int = 200            # max worker memory
-    MEMORY_HARD_LIMIT_MB: int = 300            # kill worker if exceeded
+    INDEX_DIR: Path = OUTPUT_ROOT / "index"    # tar member index sidecars
+
+    GZIP_INDEX_ENABLED: bool = False           # zran checkpoints (needs indexed_gzip, backend/requirements-optional.txt)
+    GZIP_CHECKPOINT_SPACING_MB: int = 4        # restart point every N MB (uncompressed)
+
+    MEMORY_SOFT_LIMIT_MB: int = 1536           # worker RSS: gc.collect() above this
+    MEMORY_HARD_LIMIT_MB: int = 3072           # worker RSS: task fails with MemoryError (requeued once)
+    MEMORY_BUDGET_MB: int = 0                  # host budget for running tasks' estimates (0 = 60% of RAM)
+    MEMORY_TASK_MIN_MB: int = 64               # smallest per-task estimate
 
     # ----------------------------------------------
     # Worker settings
     # ----------------------------------------------
     MAX_WORKERS: int = 4                       # CPU parallel workers
-    WORKER_QUEUE_SIZE: int = 32                # backpressure control
+    WORKER_QUEUE_SIZE: int = 32                # backpressure control: queued work before submit() blocks
+    WORKER_INFLIGHT_PER_WORKER: int = 2        # tasks handed to the mp pool per process
+    JOB_FANOUT: bool = True                    # parse / per-rack / merge tasks across all workers
+    SHM_TRANSPORT: bool = True                 # parsed arrays parse → rack tasks via shared memory
+    SHM_RESERVE_MB: int = 32                   # /dev/shm left free; members that don't fit go to the ingest cache
+    WORKER_START_METHOD: str = "forkserver"    # fork / forkserver / spawn
+    WORKER_PRELOAD: bool = True                # forkserver imports the worker stack once
+    WORKER_MAX_TASKS: int = 200                # tasks per worker process before it is replaced (0 = never)
+    WORKER_RECYCLE_RSS_MB: int = 2048          # recycle the pool once a worker grows past this (0 = off)
+    TASK_QUEUE_ENABLED: bool = False           # jobs go to the durable SQLite queue (queue_worker.py), not the pool
+    TASK_DB: Path = OUTPUT_ROOT / "task_meta.sqlite"   # job metadata + queue, shared by the API and queue workers
+    TASK_QUEUE_LEASE_SEC: int = 120            # a claimed task is requeued when its lease is not renewed
+    TASK_QUEUE_HEARTBEAT_SEC: int = 30         # lease renewal interval of a running task
+    TASK_QUEUE_MAX_ATTEMPTS: int = 3           # claims per task before it is marked failed
+    TASK_QUEUE_POLL_SEC: float = 1.0           # idle queue worker: delay between claims
+    TASK_PROGRESS_KEEP_SEC: int = 3600         # API: a finished task's progress stays queryable this long
 
     # ----------------------------------------------
     # Time alignment
     # ----------------------------------------------
-    TIME_GRID: str = "5S"                      # align to 5-second intervals
+    TIME_STEP_SEC: int = 5                     # align to 5-second intervals (int64 epoch grid)
+    DATA_TIMEZONE: str = ""                    # zone of the naive CSV timestamps, e.g. "Asia/Shanghai" ("" = host local time)
+
+    TEMP_ALIGN_MODE: str = "ffill"             # ffill (sample-and-hold) / nearest
+    TEMP_FILL_MAX_GAP_SEC: int = 300           # don't carry a temperature further than this
+
+    ALIGN_GAP_SEC: int = 600                   # data hole that splits the timeline (0 = one dense grid)
+    ALIGN_WINDOW_SEC: int = 0                  # >0: streaming aligner, one block per window
+    ALIGN_CARRY_SEC: int = 900                 # source tail kept across window boundaries
+    ALIGN_THREADS: int = 1                     # >1: align racks / files concurrently in a worker
+
+    ROLLUP_LEVELS_SEC: List[int] = [60, 900, 3600]   # min/max/mean/last pyramid ([] = off)
+    ROLLUP_FLUSH_SEC: int = 86400              # streamed jobs: write rollups in blocks of this span
 
     # ----------------------------------------------
     # Battery physical hierarchy (CR Liyujiang example)
@@ -87,6 +121,13 @@ class Settings(BaseSettings):
     PARQUET_COMPRESSION: str = "snappy"
     PARQUET_ROW_GROUP_SIZE: int = 50000
 
+    INGEST_CACHE_ENABLED: bool = True              # parsed members → parquet, reused by later jobs
+    INGEST_CACHE_DIR: Path = OUTPUT_ROOT / "ingest_cache"
+    INGEST_CACHE_MAX_MB: int = 20480               # LRU cap of the shared ingest cache on disk (0 = unbounded)
+    CHECKPOINT_ENABLED: bool = True                # stage cache: resumed by retries, reused across jobs
+    CHECKPOINT_DIR: Path = OUTPUT_ROOT / "checkpoints"
+    CHECKPOINT_MAX_MB: int = 20480                 # LRU cap of the stage cache on disk (0 = unbounded)
+
     # ----------------------------------------------
     # Frontend hosting (optional)
     # ----------------------------------------------
@@ -103,6 +144,11 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
 
+    @property
+    def TIME_GRID(self) -> str:
+        # the grid step as a pandas frequency, always TIME_STEP_SEC
+        return f"{self.TIME_STEP_SEC}s"
+
 
 # global settings instance
 settings = Settings()
@@ -110,4 +156,5 @@ settings = Settings()
 # Ensure essential folders exist
 settings.OUTPUT_ROOT.mkdir(parents=True, exist_ok=True)
 settings.RESULT_DIR.mkdir(parents=True, exist_ok=True)
+settings.INDEX_DIR.mkdir(parents=True, exist_ok=True)
 settings.LOG_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -1,9 +1,14 @@
-from .tar_stream import stream_tar_members
+from .tar_stream import stream_tar_members, iter_indexed_members
 from .file_indexer import FileIndexer
+from .member_index import MemberEntry, ArchiveIndex, get_member_index
 from .router import ParserRouter
 
 __all__ = [
     "stream_tar_members",
+    "iter_indexed_members",
     "FileIndexer",
+    "MemberEntry",
+    "ArchiveIndex",
+    "get_member_index",
     "ParserRouter",
 ]
@@ -6,6 +6,7 @@ Features:
 - list valid tar.gz files
 - detect bank / rack types
 - cache file metadata (size, mtime)
+- persistent per-archive member index (see member_index.py)
 """
 
 import os
@@ -14,6 +15,7 @@ from typing import List, Dict
 from datetime import datetime
 
 from ..config import settings
+from .member_index import MemberEntry, get_member_index, index_path_for
 
 
 class FileIndexer:
@@ -45,7 +47,8 @@ class FileIndexer:
                 "size_mb": round(stat.st_size / 1024 / 1024, 2),
                 "mtime": datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 "is_bank": "bank" in f.name.lower(),
-                "is_rack": "rack" in f.name.lower()
+                "is_rack": "rack" in f.name.lower(),
+                "member_index": str(index_path_for(f)),
             }
 
     # ------------------------------------------------------------
@@ -55,3 +58,14 @@ class FileIndexer:
         if filename not in self.cache:
             self.refresh()
         return self.cache.get(filename, {})
+
+    # ------------------------------------------------------------
+    # Members of a file (sidecar index, built once per archive)
+    # ------------------------------------------------------------
+    def get_members(self, filename: str) -> List[MemberEntry]:
+        path = Path(filename)
+        if not path.is_absolute():
+            path = self.data_dir / filename
+        if not path.exists():
+            return []
+        return get_member_index(path).members
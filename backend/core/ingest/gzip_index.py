@@ -0,0 +1,103 @@
+"""
+Random-access gzip checkpoints (zran-style) for tar.gz archives.
+
+While the member index is built, the inflater records a restart point
+(compressed offset + 32KB window) every ``GZIP_CHECKPOINT_SPACING_MB`` of
+uncompressed data. The checkpoint file is stored next to the member index;
+afterwards any process can open the archive, seek to a member's
+``offset_data`` and inflate only that member, so several workers can read
+different members of the same archive at the same time.
+
+Backed by the optional ``indexed_gzip`` package (zlib inflatePrime /
+inflateSetDictionary are not exposed by the stdlib), listed in
+backend/requirements-optional.txt. Without it, or with
+``GZIP_INDEX_ENABLED = False``, callers fall back to sequential gunzip.
+"""
+
+import hashlib
+import os
+import tarfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+
+
+def _indexed_gzip():
+    try:
+        import indexed_gzip
+    except ImportError:
+        return None
+    return indexed_gzip
+
+
+def is_enabled() -> bool:
+    return settings.GZIP_INDEX_ENABLED and _indexed_gzip() is not None
+
+
+def sidecar_stem(tar_path: Path) -> str:
+    """
+    File name stem of an archive's sidecars in INDEX_DIR: archives with
+    the same name in different directories must not share them, and a
+    symlink shares its target's.
+    """
+    tar_path = Path(tar_path).resolve()
+    digest = hashlib.sha1(str(tar_path).encode("utf-8")).hexdigest()[:12]
+    return f"{tar_path.name}.{digest}"
+
+
+def checkpoint_path_for(tar_path: Path, index_dir: Path | None = None) -> Path:
+    index_dir = Path(index_dir or settings.INDEX_DIR)
+    return index_dir / f"{sidecar_stem(tar_path)}.gzidx"
+
+
+# ---------------------------------------------------------
+# Build (during the member index pass)
+# ---------------------------------------------------------
+@contextmanager
+def open_checkpointing(tar_path: Path, spacing_mb: int | None = None):
+    """
+    Yield a gzip reader that records restart points while it is read.
+    Call ``export_checkpoints`` once the stream has been consumed.
+    """
+    igz = _indexed_gzip()
+    spacing = int((spacing_mb or settings.GZIP_CHECKPOINT_SPACING_MB) * 1024 * 1024)
+    f = igz.IndexedGzipFile(str(tar_path), spacing=spacing)
+    try:
+        yield f
+    finally:
+        f.close()
+
+
+def export_checkpoints(gzf, tar_path: Path, index_dir: Path | None = None) -> Path:
+    path = checkpoint_path_for(tar_path, index_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    gzf.export_index(str(tmp))
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------------------------------------------------
+# Random-access read
+# ---------------------------------------------------------
+@contextmanager
+def open_indexed_tar(tar_path: Path, checkpoints: str):
+    """
+    Open ``tar_path`` as an uncompressed, seekable tar stream on top of the
+    recorded checkpoints. ``extractfile(entry.to_tarinfo())`` then only
+    inflates from the nearest restart point before the member.
+    """
+    igz = _indexed_gzip()
+    f = igz.IndexedGzipFile(str(tar_path), index_file=str(checkpoints))
+    try:
+        with tarfile.open(fileobj=f, mode="r:") as tf:
+            yield tf
+    finally:
+        f.close()
+
+
+def usable_checkpoints(checkpoints: Optional[str]) -> bool:
+    return bool(checkpoints) and is_enabled() and Path(checkpoints).exists()
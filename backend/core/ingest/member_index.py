@@ -0,0 +1,268 @@
+"""
+Persistent member index for tar.gz archives.
+
+A single sequential pass over the archive (``r|gz``) records, for every
+regular file member:
+    name, header offset, data offset, size, parser type, rack id, date
+
+The index is saved as a JSON sidecar under ``settings.INDEX_DIR`` (named
+after the archive and a hash of its resolved path) together with the
+size / mtime of the source archive. As long as the archive is
+unchanged, listing members is a metadata lookup and never needs another
+decompression pass.
+
+Offsets refer to the *uncompressed* tar stream, so a reader can seek
+forward member by member (``tarfile.extractfile(entry.to_tarinfo())``).
+With ``GZIP_INDEX_ENABLED`` the same pass also records gzip restart
+points (gzip_index.py), which makes those seeks random-access.
+"""
+
+import json
+import os
+import re
+import tarfile
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import List, Optional
+
+from ..config import settings
+from . import gzip_index
+
+
+INDEX_VERSION = 1
+
+_DATE_PAT = re.compile(r"(\d{4})[-_/]?(\d{2})[-_/]?(\d{2})")
+
+
+# ---------------------------------------------------------
+# Name helpers
+# ---------------------------------------------------------
+def member_type(name: str) -> Optional[str]:
+    """
+    summary / batvol / battemp (same keys as ParserRouter), None if unparsed.
+    """
+    name = name.lower()
+    for key in ("summary", "batvol", "battemp"):
+        if key in name:
+            return key
+    return None
+
+
+def extract_rack_id(fname: str) -> str:
+    fname = fname.lower()
+    if "rack" not in fname:
+        return "unknown"
+    digits = ""
+    for c in fname[fname.index("rack") + 4:]:
+        if c.isdigit():
+            digits += c
+        else:
+            break
+    return f"rack{digits}"
+
+
+def extract_date(fname: str) -> Optional[str]:
+    m = _DATE_PAT.search(Path(fname).name)
+    if not m:
+        return None
+    return "-".join(m.groups())
+
+
+# ---------------------------------------------------------
+# Index model
+# ---------------------------------------------------------
+@dataclass
+class MemberEntry:
+    name: str
+    offset: int             # tar header offset (uncompressed stream)
+    offset_data: int        # member data offset (uncompressed stream)
+    size: int
+    type: Optional[str]     # summary / batvol / battemp / None
+    rack_id: Optional[str]  # rack1, rack2 ... (None for bank-level files)
+    date: Optional[str]     # YYYY-MM-DD parsed from member name
+
+    def to_tarinfo(self) -> tarfile.TarInfo:
+        """
+        Minimal TarInfo usable with TarFile.extractfile() without a header scan.
+        """
+        ti = tarfile.TarInfo(self.name)
+        ti.type = tarfile.REGTYPE
+        ti.size = self.size
+        ti.offset = self.offset
+        ti.offset_data = self.offset_data
+        return ti
+
+
+@dataclass
+class ArchiveIndex:
+    source: str
+    size: int
+    mtime: float
+    members: List[MemberEntry] = field(default_factory=list)
+    checkpoints: Optional[str] = None   # gzip restart points (.gzidx), if built
+    version: int = INDEX_VERSION
+
+    def is_valid_for(self, tar_path: Path) -> bool:
+        stat = tar_path.stat()
+        return (
+            self.version == INDEX_VERSION
+            and self.source == str(tar_path.resolve())
+            and self.size == stat.st_size
+            and self.mtime == stat.st_mtime
+        )
+
+    def parsable(self) -> List[MemberEntry]:
+        return [m for m in self.members if m.type is not None]
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ArchiveIndex":
+        members = [MemberEntry(**m) for m in d.get("members", [])]
+        return cls(
+            source=d["source"],
+            size=d["size"],
+            mtime=d["mtime"],
+            members=members,
+            checkpoints=d.get("checkpoints"),
+            version=d.get("version", 0),
+        )
+
+
+# ---------------------------------------------------------
+# Build / load / save
+# ---------------------------------------------------------
+def index_path_for(tar_path: Path, index_dir: Path | None = None) -> Path:
+    index_dir = Path(index_dir or settings.INDEX_DIR)
+    return index_dir / f"{gzip_index.sidecar_stem(tar_path)}.members.json"
+
+
+def build_member_index(tar_path: str) -> ArchiveIndex:
+    """
+    One streaming pass over the archive; member data is skipped, not extracted.
+    """
+    tar_path = Path(tar_path)
+    if not tar_path.exists():
+        raise FileNotFoundError(f"tar.gz not found: {tar_path}")
+
+    stat = tar_path.stat()
+    checkpoints = None
+
+    if gzip_index.is_enabled():
+        # same single pass, but the inflater records restart points as it goes
+        with gzip_index.open_checkpointing(tar_path) as gzf:
+            with tarfile.open(fileobj=gzf, mode="r|") as tf:
+                members = _scan_members(tf)
+            checkpoints = str(gzip_index.export_checkpoints(gzf, tar_path))
+    else:
+        with tarfile.open(tar_path, "r|gz") as tf:
+            members = _scan_members(tf)
+
+    return ArchiveIndex(
+        source=str(tar_path.resolve()),
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        members=members,
+        checkpoints=checkpoints,
+    )
+
+
+def _scan_members(tf: tarfile.TarFile) -> List[MemberEntry]:
+    members = []
+    for m in tf:
+        if not m.isfile():
+            continue
+        rack_id = extract_rack_id(m.name) if "rack" in m.name.lower() else None
+        members.append(
+            MemberEntry(
+                name=m.name,
+                offset=m.offset,
+                offset_data=m.offset_data,
+                size=m.size,
+                type=member_type(m.name),
+                rack_id=rack_id,
+                date=extract_date(m.name),
+            )
+        )
+    return members
+
+
+def load_member_index(tar_path: str, index_dir: Path | None = None) -> Optional[ArchiveIndex]:
+    """
+    Return the sidecar index if present and still matching the archive.
+    """
+    tar_path = Path(tar_path)
+    path = index_path_for(tar_path, index_dir)
+    if not path.exists() or not tar_path.exists():
+        return None
+
+    try:
+        index = ArchiveIndex.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    return index if index.is_valid_for(tar_path) else None
+
+
+def save_member_index(index: ArchiveIndex, index_dir: Path | None = None) -> Path:
+    path = index_path_for(Path(index.source), index_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # atomic replace: concurrent workers may read while the dispatcher writes
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(index.to_dict()), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def get_member_index(tar_path: str, index_dir: Path | None = None) -> ArchiveIndex:
+    """
+    Load the sidecar index, building (and persisting) it on first use.
+    """
+    index = load_member_index(tar_path, index_dir)
+    if index is None or (gzip_index.is_enabled() and not index.checkpoints):
+        index = build_member_index(tar_path)
+        save_member_index(index, index_dir)
+    return index
+
+
+# ---------------------------------------------------------
+# Work splitting
+# ---------------------------------------------------------
+def split_member_groups(entries: List[MemberEntry], n_groups: int) -> List[List[MemberEntry]]:
+    """
+    Balance members into ``n_groups`` by uncompressed size (largest first).
+    Each group keeps offset order so a reader still seeks forward only.
+    """
+    n_groups = max(1, min(n_groups, len(entries)))
+    groups: List[List[MemberEntry]] = [[] for _ in range(n_groups)]
+    loads = [0] * n_groups
+
+    for entry in sorted(entries, key=lambda e: e.size, reverse=True):
+        i = loads.index(min(loads))
+        groups[i].append(entry)
+        loads[i] += entry.size
+
+    return [sorted(g, key=lambda e: e.offset_data) for g in groups if g]
+
+
+def split_member_ranges(entries: List[MemberEntry], n_groups: int) -> List[List[MemberEntry]]:
+    """
+    Cut members (in offset order) into up to ``n_groups`` consecutive
+    runs of about equal uncompressed size: for sequential readers, which
+    inflate the archive from its start up to their last member.
+    """
+    entries = sorted(entries, key=lambda e: e.offset_data)
+    n_groups = max(1, min(n_groups, len(entries)))
+    total = sum(e.size for e in entries)
+    groups: List[List[MemberEntry]] = [[] for _ in range(n_groups)]
+
+    done = 0
+    for entry in entries:
+        # the run the member's midpoint falls in
+        i = min(n_groups - 1, (2 * done + entry.size) * n_groups // max(2 * total, 1))
+        groups[i].append(entry)
+        done += entry.size
+
+    return [g for g in groups if g]
@@ -4,6 +4,9 @@ Streaming utilities for reading .tar.gz files WITHOUT extraction.
 stream_tar_members(tar_path):
     Yields (member_name, fileobj) for all files inside tar.gz.
 
+iter_indexed_members(tar_path, index):
+    Yields (MemberEntry, fileobj) for indexed members in one forward pass.
+
 This is optimized for:
 - low memory footprint
 - sequential processing
@@ -11,7 +14,11 @@ This is optimized for:
 
 import tarfile
 from pathlib import Path
-from typing import Generator, Tuple, IO
+from typing import Generator, Tuple, IO, List, Optional
+
+from ..config import settings
+from . import gzip_index
+from .member_index import ArchiveIndex, MemberEntry
 
 
 def stream_tar_members(tar_path: str) -> Generator[Tuple[str, IO], None, None]:
@@ -40,3 +47,38 @@ def stream_tar_members(tar_path: str) -> Generator[Tuple[str, IO], None, None]:
                 if fileobj is None:
                     continue
                 yield member.name, fileobj
+
+
+def iter_indexed_members(
+    tar_path: str,
+    index: ArchiveIndex,
+    entries: Optional[List[MemberEntry]] = None,
+) -> Generator[Tuple[MemberEntry, IO], None, None]:
+    """
+    Stream the indexed members of a tar.gz, one bounded file object at a time.
+
+    - with gzip checkpoints: random access, seek straight to each member
+    - otherwise: a single forward ``r|gz`` pass, never ``getmembers()``,
+      that stops after the last of ``entries``
+
+    Each fileobj must be consumed before the generator is advanced
+    (stream mode cannot go back).
+    """
+    tar_path = Path(tar_path)
+    entries = index.parsable() if entries is None else entries
+
+    if gzip_index.usable_checkpoints(index.checkpoints):
+        with gzip_index.open_indexed_tar(tar_path, index.checkpoints) as tf:
+            for entry in entries:
+                yield entry, tf.extractfile(entry.to_tarinfo())
+        return
+
+    # the pass ends at the last wanted member, not at the end of the archive
+    by_name = {e.name: e for e in entries}
+    with tarfile.open(tar_path, "r|gz", bufsize=settings.READ_BUFFER_SIZE) as tf:
+        for member in tf:
+            if not member.isfile() or member.name not in by_name:
+                continue
+            yield by_name.pop(member.name), tf.extractfile(member)
+            if not by_name:
+                return
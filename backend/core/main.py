@@ -15,6 +15,7 @@ from .config import settings
 from .logging_cfg import setup_logging
 from .api import files, jobs, results, health
 from .tasks.progress import progress_manager
+from .pipeline.dispatcher import dispatcher
 from .analysis.registry import load_plugins
 
 import uvicorn
@@ -59,20 +60,30 @@ def create_app() -> FastAPI:
     app.include_router(results.router, prefix="/api/results", tags=["Results"])
     app.include_router(health.router, prefix="/api/health", tags=["Health"])
 
+    # ------------------------------------------------
+    # Dispatcher: worker pool up with the server, down with it
+    # ------------------------------------------------
+    @app.on_event("startup")
+    async def start_dispatcher():
+        await dispatcher.startup()
+
+    @app.on_event("shutdown")
+    async def stop_dispatcher():
+        await dispatcher.shutdown()
+
     # ------------------------------------------------
     # WebSocket: Real-time progress updates
     # ------------------------------------------------
     @app.websocket("/ws/progress/{task_id}")
     async def progress_ws(websocket: WebSocket, task_id: str):
-        await websocket.accept()
-        progress_manager.connect(task_id, websocket)
+        await progress_manager.connect(task_id, websocket)   # accepts the socket
 
         try:
             while True:
                 # WebSocket will automatically receive pushes from manager
                 await websocket.receive_text()
         except WebSocketDisconnect:
-            progress_manager.disconnect(task_id, websocket)
+            await progress_manager.disconnect(task_id, websocket)
 
     # ------------------------------------------------
     # (Optional) Serve frontend build
@@ -0,0 +1,228 @@
+"""
+DayFrame — compact, array-backed container for one job's aligned data.
+
+Replaces the nested dict-of-lists tree (rack → module → list of lists):
+
+    time     int64   (T,)          epoch seconds of the aligned grid
+    voltage  float32 (R, T, C)     cell voltages, C = modules × cells/module
+    temp     float32 (R, T, S)     temperature sensors, S = modules × sensors/module
+    summary  {"bank" | rack_id: {channel: float32 (T,)}}
+
+plus the topology needed to slice it (rack ids, column names, per-module
+sizes). Module access is always a zero-copy view into the rack tensor.
+
+The time axis may be segmented (see aligner/segments.py): only covered
+time is gridded, ``segments`` holds the row bounds of each contiguous
+piece and ``coverage`` (rack × segment) which racks have data in it.
+
+``rollups`` holds the coarse pyramid (1 min / 15 min / 1 h, see
+model/rollup.py) the aligner builds in the same pass.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .rollup import RollupLevel
+
+
+@dataclass
+class DayFrame:
+    time: np.ndarray
+    rack_ids: List[str]
+    voltage: np.ndarray
+    temp: np.ndarray
+    cell_columns: List[str]
+    temp_columns: List[str]
+    cells_per_module: int = 32
+    temps_per_module: int = 20
+    has_voltage: np.ndarray = None      # bool (R,) — rack had a batVol file
+    has_temp: np.ndarray = None         # bool (R,) — rack had a batTemp file
+    summary: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    segments: np.ndarray = None         # int64 (S, 2) row bounds [start, stop)
+    coverage: np.ndarray = None         # bool (R, S) — rack has data in segment
+    rollups: Dict[int, RollupLevel] = field(default_factory=dict)   # bucket_sec → coarse view
+
+    def __post_init__(self):
+        n_racks = len(self.rack_ids)
+        if self.has_voltage is None:
+            self.has_voltage = np.ones(n_racks, dtype=bool)
+        if self.has_temp is None:
+            self.has_temp = np.ones(n_racks, dtype=bool)
+        if self.segments is None:
+            self.segments = np.array([[0, len(self.time)]], dtype=np.int64)
+        if self.coverage is None:
+            self.coverage = np.ones((n_racks, len(self.segments)), dtype=bool)
+
+    # ------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------
+    @classmethod
+    def allocate(
+        cls,
+        time: np.ndarray,
+        rack_ids: List[str],
+        cell_columns: List[str],
+        temp_columns: List[str],
+        cells_per_module: int = 32,
+        temps_per_module: int = 20,
+        segments: np.ndarray = None,
+        coverage: np.ndarray = None,
+    ) -> "DayFrame":
+        """
+        NaN-filled frame; the aligner writes each rack into its slice.
+        """
+        n_t, n_r = len(time), len(rack_ids)
+        return cls(
+            time=np.asarray(time, dtype=np.int64),
+            rack_ids=list(rack_ids),
+            voltage=np.full((n_r, n_t, len(cell_columns)), np.nan, dtype=np.float32),
+            temp=np.full((n_r, n_t, len(temp_columns)), np.nan, dtype=np.float32),
+            cell_columns=list(cell_columns),
+            temp_columns=list(temp_columns),
+            cells_per_module=cells_per_module,
+            temps_per_module=temps_per_module,
+            has_voltage=np.zeros(n_r, dtype=bool),
+            has_temp=np.zeros(n_r, dtype=bool),
+            segments=segments,
+            coverage=coverage,
+        )
+
+    # ------------------------------------------------------------
+    # Topology
+    # ------------------------------------------------------------
+    @property
+    def n_time(self) -> int:
+        return len(self.time)
+
+    @property
+    def n_modules(self) -> int:
+        if self.cells_per_module <= 0:
+            return 0
+        n = len(self.cell_columns) // self.cells_per_module
+        if self.temps_per_module > 0:
+            n = min(n, len(self.temp_columns) // self.temps_per_module)
+        return n
+
+    def rack_index(self, rack_id: str) -> int:
+        return self.rack_ids.index(rack_id)
+
+    @staticmethod
+    def module_id(m: int) -> str:
+        return f"module{m + 1}"
+
+    # ------------------------------------------------------------
+    # Zero-copy views
+    # ------------------------------------------------------------
+    def rack_voltage(self, rack_id: str) -> np.ndarray:
+        return self.voltage[self.rack_index(rack_id)]             # (T, C)
+
+    def rack_temp(self, rack_id: str) -> np.ndarray:
+        return self.temp[self.rack_index(rack_id)]                # (T, S)
+
+    def rack_modules_voltage(self, rack_id: str) -> np.ndarray:
+        """
+        (T, modules, 32) — reshape of the rack matrix, no copy.
+        """
+        c, n = self.cells_per_module, self.n_modules
+        return self.voltage[self.rack_index(rack_id), :, :n * c].reshape(self.n_time, n, c)
+
+    def rack_modules_temp(self, rack_id: str) -> np.ndarray:
+        """
+        (T, modules, 20) — reshape of the rack matrix, no copy.
+        """
+        s, n = self.temps_per_module, self.n_modules
+        return self.temp[self.rack_index(rack_id), :, :n * s].reshape(self.n_time, n, s)
+
+    def module_voltage(self, rack_id: str, m: int) -> np.ndarray:
+        return self.rack_modules_voltage(rack_id)[:, m, :]   # (T, 32)
+
+    def module_temp(self, rack_id: str, m: int) -> np.ndarray:
+        return self.rack_modules_temp(rack_id)[:, m, :]      # (T, 20)
+
+    def iter_modules(self) -> Iterator[Tuple[str, str, np.ndarray, np.ndarray]]:
+        """
+        Yield (rack_id, module_id, voltage view (T, 32), temp view (T, 20))
+        for racks that had both a batVol and a batTemp file. Views are
+        trimmed to the rows between the rack's first and last covered
+        segment: row i of a view is grid row ``covered_span(rack_id).start
+        + i``. Racks without coverage are skipped.
+        """
+        for r, rack_id in enumerate(self.rack_ids):
+            if not (self.has_voltage[r] and self.has_temp[r]):
+                continue
+            rows = self.covered_span(rack_id)
+            if rows is None:
+                continue
+            volt = self.rack_modules_voltage(rack_id)[rows]
+            temp = self.rack_modules_temp(rack_id)[rows]
+            for m in range(self.n_modules):
+                yield rack_id, self.module_id(m), volt[:, m, :], temp[:, m, :]
+
+    # ------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------
+    @property
+    def n_segments(self) -> int:
+        return len(self.segments)
+
+    def segment_intervals(self) -> np.ndarray:
+        """
+        (S, 2) first / last grid time of every segment.
+        """
+        if not self.n_time:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.column_stack([self.time[self.segments[:, 0]], self.time[self.segments[:, 1] - 1]])
+
+    def covered_span(self, rack_id: str) -> Optional[slice]:
+        """
+        Rows from the rack's first to its last covered segment (None if none).
+        """
+        covered = np.flatnonzero(self.coverage[self.rack_index(rack_id)])
+        if not len(covered):
+            return None
+        return slice(int(self.segments[covered[0], 0]), int(self.segments[covered[-1], 1]))
+
+    def iter_segments(self, rack_id: str = None) -> Iterator[Tuple[int, slice]]:
+        """
+        (segment no, row slice); with ``rack_id`` only segments that rack covers.
+        """
+        covered = self.coverage[self.rack_index(rack_id)] if rack_id is not None else None
+        for s, (start, stop) in enumerate(self.segments):
+            if covered is None or covered[s]:
+                yield s, slice(int(start), int(stop))
+
+    def segmented_gradient(self, rack_id: str, values: np.ndarray) -> np.ndarray:
+        """
+        np.gradient along time of an iter_modules view of ``rack_id``,
+        taken within each segment the rack covers: rows on either side of
+        a segment join (a hole in the data) are never differenced. Rows of
+        uncovered or single-row segments are NaN.
+        """
+        out = np.full(values.shape, np.nan, dtype=np.result_type(values.dtype, np.float32))
+        span = self.covered_span(rack_id)
+        if span is None:
+            return out
+        for _, rows in self.iter_segments(rack_id):
+            if rows.stop - rows.start >= 2:
+                seg = slice(rows.start - span.start, rows.stop - span.start)
+                out[seg] = np.gradient(values[seg], axis=0)
+        return out
+
+    # ------------------------------------------------------------
+    # Info
+    # ------------------------------------------------------------
+    @property
+    def nbytes(self) -> int:
+        total = self.time.nbytes + self.voltage.nbytes + self.temp.nbytes
+        for channels in self.summary.values():
+            total += sum(v.nbytes for v in channels.values())
+        return total
+
+    def __repr__(self):
+        return (
+            f"<DayFrame racks={len(self.rack_ids)} T={self.n_time} segments={self.n_segments} "
+            f"cells={len(self.cell_columns)} temps={len(self.temp_columns)} "
+            f"{self.nbytes / 1e6:.1f} MB>"
+        )
@@ -3,7 +3,10 @@ Physical hierarchy (Stack → Rack → Module → Cell)
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -52,6 +55,35 @@ class Stack:
     racks: List[Rack]
 
 
+@dataclass(frozen=True)
+class ChannelLayout:
+    """
+    Column order of one rack in the aligned tensors: cells / sensors
+    module by module, so a (T, C) rack matrix reshapes to (T, modules, 32).
+    """
+    cell_columns: Tuple[str, ...]       # "V1", "V2", ... in module/row/col order
+    temp_columns: Tuple[str, ...]       # "T1", "T2", ... in module/pos order
+    n_modules: int
+    cells_per_module: int
+    temps_per_module: int
+
+
+@lru_cache(maxsize=64)
+def gather_indices(layout_columns: Tuple[str, ...], src_columns: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (src_idx, dst_idx): source column src_idx[k] lands in layout column
+    dst_idx[k]. Cached per header, so it is computed once per file layout.
+    Source columns the layout does not know are skipped.
+    """
+    pos = {name: j for j, name in enumerate(layout_columns)}
+    pairs = [(i, pos[name]) for i, name in enumerate(src_columns) if name in pos]
+    src_idx = np.array([i for i, _ in pairs], dtype=np.intp)
+    dst_idx = np.array([j for _, j in pairs], dtype=np.intp)
+    src_idx.flags.writeable = False
+    dst_idx.flags.writeable = False
+    return src_idx, dst_idx
+
+
 # -------------------------------------------------------------------
 # Builder
 # -------------------------------------------------------------------
@@ -124,3 +156,22 @@ class HierarchyBuilder:
             racks.append(Rack(rack_id=r + 1, modules=modules))
 
         return Stack(stack_id=stack_id, racks=racks)
+
+    def channel_layout(self) -> ChannelLayout:
+        """
+        Per-rack column layout (cell / sensor ids restart in every rack).
+        """
+        return _channel_layout(self.n_modules, self.cell_rows, self.cell_cols, self.temp_per_module)
+
+
+@lru_cache(maxsize=16)
+def _channel_layout(n_modules: int, cell_rows: int, cell_cols: int, temp_per_module: int) -> ChannelLayout:
+    builder = HierarchyBuilder(1, n_modules, cell_rows, cell_cols, temp_per_module)
+    rack = builder.build(stack_id=0).racks[0]
+    return ChannelLayout(
+        cell_columns=tuple(f"V{c.cell_id}" for m in rack.modules for c in m.cells),
+        temp_columns=tuple(f"T{t.temp_id}" for m in rack.modules for t in m.temps),
+        n_modules=n_modules,
+        cells_per_module=builder.n_cells_per_module,
+        temps_per_module=temp_per_module,
+    )
@@ -0,0 +1,203 @@
+"""
+Rollups — coarse, bucketed views of an aligned DayFrame.
+
+One RollupLevel per bucket size (1 min / 15 min / 1 h by default). Every
+channel of every tensor is reduced to
+
+    min / max / mean / last     per bucket (NaN-aware)
+
+with the same layout as the DayFrame it comes from:
+
+    time     int64 (B,)          bucket start, epoch aligned (t // sec * sec)
+    voltage  RollupStats (B, R, C)
+    temp     RollupStats (B, R, S)
+    summary  {"bank" | rack_id: RollupStats (B, K)}
+
+RollupStats keeps sum and count instead of the mean, so levels can be
+reduced again into coarser ones (the pyramid) and the split bucket at the
+edge of two streamed blocks can be merged exactly.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+ROLLUP_STATS = ("min", "max", "mean", "last")
+
+
+@dataclass
+class RollupStats:
+    min: np.ndarray
+    max: np.ndarray
+    sum: np.ndarray        # float64, sum of the valid samples
+    n: np.ndarray          # int32, number of valid samples
+    last: np.ndarray       # last valid sample of the bucket
+
+    @classmethod
+    def of_samples(cls, values: np.ndarray) -> "RollupStats":
+        """
+        Full-resolution samples seen as one-row buckets (no copies but sum).
+        """
+        valid = ~np.isnan(values)
+        return cls(values, values, np.where(valid, values, 0), valid, values)
+
+    @property
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.sum / self.n).astype(np.float32)
+
+    def stat(self, name: str) -> np.ndarray:
+        return self.mean if name == "mean" else getattr(self, name)
+
+    def reduce(self, starts: np.ndarray) -> "RollupStats":
+        """
+        Merge consecutive rows into buckets beginning at ``starts`` (axis 0).
+        """
+        has = self.n > 0
+        rows = np.arange(len(has), dtype=np.int32).reshape(-1, *([1] * (has.ndim - 1)))
+        last_row = np.maximum.reduceat(np.where(has, rows, -1), starts, axis=0)
+
+        last = np.take_along_axis(self.last, np.maximum(last_row, 0), axis=0)
+        last[last_row < 0] = np.nan
+
+        return RollupStats(
+            min=np.fmin.reduceat(self.min, starts, axis=0),
+            max=np.fmax.reduceat(self.max, starts, axis=0),
+            sum=np.add.reduceat(self.sum, starts, axis=0, dtype=np.float64),
+            n=np.add.reduceat(self.n, starts, axis=0, dtype=np.int32),
+            last=last,
+        )
+
+    @classmethod
+    def empty(cls, n: int, like: "RollupStats") -> "RollupStats":
+        """
+        ``n`` buckets without samples, shaped like ``like``.
+        """
+        shape = (n,) + like.min.shape[1:]
+        nan = np.full(shape, np.nan, dtype=like.min.dtype)
+        return cls(nan, nan, np.zeros(shape), np.zeros(shape, dtype=np.int32), nan)
+
+    def take(self, rows) -> "RollupStats":
+        return RollupStats(self.min[rows], self.max[rows], self.sum[rows], self.n[rows], self.last[rows])
+
+    @staticmethod
+    def concat(parts: List["RollupStats"]) -> "RollupStats":
+        return RollupStats(*(np.concatenate([getattr(p, f) for p in parts]) for f in ("min", "max", "sum", "n", "last")))
+
+
+def bucket_starts(time: np.ndarray, bucket_sec: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (row where each bucket starts, bucket start time) for a sorted time axis.
+    """
+    if not len(time):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    bucket = time // bucket_sec * bucket_sec
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    return starts, bucket[starts]
+
+
+def rollup_label(bucket_sec: int) -> str:
+    """
+    60 → "1m", 900 → "15m", 3600 → "1h".
+    """
+    if bucket_sec % 3600 == 0:
+        return f"{bucket_sec // 3600}h"
+    if bucket_sec % 60 == 0:
+        return f"{bucket_sec // 60}m"
+    return f"{bucket_sec}s"
+
+
+@dataclass
+class RollupLevel:
+    bucket_sec: int
+    time: np.ndarray
+    rack_ids: List[str]
+    cell_columns: List[str]
+    temp_columns: List[str]
+    voltage: RollupStats
+    temp: RollupStats
+    has_voltage: np.ndarray
+    has_temp: np.ndarray
+    summary: Dict[str, RollupStats] = field(default_factory=dict)
+    summary_columns: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def label(self) -> str:
+        return rollup_label(self.bucket_sec)
+
+    @property
+    def n_buckets(self) -> int:
+        return len(self.time)
+
+    def _map(self, fn) -> Dict:
+        return dict(
+            voltage=fn(self.voltage),
+            temp=fn(self.temp),
+            summary={owner: fn(s) for owner, s in self.summary.items()},
+        )
+
+    def _like(self, bucket_sec: int, time: np.ndarray, fn) -> "RollupLevel":
+        return RollupLevel(
+            bucket_sec=bucket_sec,
+            time=time,
+            rack_ids=self.rack_ids,
+            cell_columns=self.cell_columns,
+            temp_columns=self.temp_columns,
+            has_voltage=self.has_voltage,
+            has_temp=self.has_temp,
+            summary_columns=self.summary_columns,
+            **self._map(fn),
+        )
+
+    def coarsen(self, bucket_sec: int) -> "RollupLevel":
+        """
+        Next pyramid level; ``bucket_sec`` must be a multiple of this one's.
+        """
+        starts, time = bucket_starts(self.time, bucket_sec)
+        return self._like(bucket_sec, time, lambda s: s.reduce(starts))
+
+    def take(self, rows) -> "RollupLevel":
+        return self._like(self.bucket_sec, self.time[rows], lambda s: s.take(rows))
+
+    def merge(self, other: "RollupLevel") -> "RollupLevel":
+        """
+        This level followed by ``other`` (a later block of the same job);
+        a bucket present in both is merged exactly.
+        """
+        time = np.concatenate([self.time, other.time])
+        starts, time = bucket_starts(time, self.bucket_sec)
+
+        def cat(a, b):
+            a = a if a is not None else RollupStats.empty(self.n_buckets, b)
+            b = b if b is not None else RollupStats.empty(other.n_buckets, a)
+            return RollupStats.concat([a, b]).reduce(starts)
+
+        level = self._like(self.bucket_sec, time, lambda s: s)
+        level.voltage = cat(self.voltage, other.voltage)
+        level.temp = cat(self.temp, other.temp)
+        level.summary = {
+            owner: cat(self.summary.get(owner), other.summary.get(owner))
+            for owner in {**self.summary, **other.summary}
+        }
+        level.summary_columns = {**self.summary_columns, **other.summary_columns}
+        level.has_voltage = self.has_voltage | other.has_voltage
+        level.has_temp = self.has_temp | other.has_temp
+        return level
+
+    def tables(self):
+        """
+        Yield (owner, kind, columns, stats (B, K)) — one table per file the
+        DayFrame would store; rack tables are views into the level tensors.
+        """
+        for owner, stats in self.summary.items():
+            yield owner, "summary", self.summary_columns[owner], stats
+        for r, rack_id in enumerate(self.rack_ids):
+            if self.has_voltage[r]:
+                yield rack_id, "batvol", self.cell_columns, self.voltage.take((slice(None), r))
+            if self.has_temp[r]:
+                yield rack_id, "battemp", self.temp_columns, self.temp.take((slice(None), r))
+
+    def __repr__(self):
+        return f"<RollupLevel {self.label} B={self.n_buckets} racks={len(self.rack_ids)}>"
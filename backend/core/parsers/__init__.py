@@ -1,14 +1,19 @@
-from .common import parse_time, fast_float
-from .summary_parser import parse_summary_csv
-from .rack_summary_parser import parse_rack_summary_csv
-from .batvol_parser import parse_batvol_csv
-from .battemp_parser import parse_battemp_csv
+from .common import parse_time, fast_float, RecordBatch
+from .summary_parser import parse_summary_csv, iter_summary_batches
+from .rack_summary_parser import parse_rack_summary_csv, iter_rack_summary_batches
+from .batvol_parser import parse_batvol_csv, iter_batvol_batches
+from .battemp_parser import parse_battemp_csv, iter_battemp_batches
 
 __all__ = [
     "parse_time",
     "fast_float",
+    "RecordBatch",
     "parse_summary_csv",
     "parse_rack_summary_csv",
     "parse_batvol_csv",
     "parse_battemp_csv",
+    "iter_summary_batches",
+    "iter_rack_summary_batches",
+    "iter_batvol_batches",
+    "iter_battemp_batches",
 ]
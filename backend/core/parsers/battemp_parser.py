@@ -3,32 +3,33 @@ Parser for cell temperature CSV (e.g. rack1batTemp_2024-10-01)
 
 Columns:
   time, T1, T2, T3, ... (140 temperature sensors)
-Unit: 0.1°C → °C
+Unit: 0.1°C → °C (TEMP_SCALE_CELL)
 """
 
-from typing import IO, Dict
-from .common import iter_csv, fast_float, parse_time
+from typing import IO, Dict, Callable, Generator, Optional
 
+from ..config import settings
+from .common import RecordBatch
+from .columnar import iter_wide_batches, concat_batches, column_views
 
-def parse_battemp_csv(fileobj: IO) -> Dict:
 
-    time_list = []
-    temp_table = {}   # {"T1": [...], "T2": [...]}
+def _is_sensor_col(name: str) -> bool:
+    return name.lower().startswith("t") and name != "time"
 
-    for row in iter_csv(fileobj):
-        ts = parse_time(row.get("time"))
-        if ts is None:
-            continue
 
-        time_list.append(ts)
+def iter_battemp_batches(fileobj: IO, rows: Optional[int] = None) -> Generator[RecordBatch, None, None]:
+    """
+    Yield RecordBatch(time int64[n], values float32[n, sensors], columns) of
+    at most ``rows`` (default CHUNK_ROWS) rows.
+    """
+    yield from iter_wide_batches(fileobj, _is_sensor_col, settings.TEMP_SCALE_CELL, rows)
 
-        for key, val in row.items():
-            if key.lower().startswith("t"):
-                if key not in temp_table:
-                    temp_table[key] = []
-                temp_table[key].append(fast_float(val) * 0.1 if val else None)
+
+def parse_battemp_csv(fileobj: IO, on_chunk: Optional[Callable[[], None]] = None) -> Dict:
+
+    times, columns, matrix = concat_batches(iter_battemp_batches(fileobj), on_chunk)
 
     return {
-        "time": time_list,
-        "temp": temp_table,
+        "time": times,                              # int64 epoch seconds
+        "temp": column_views(columns, matrix),      # {"T1": float32[T], ...}, NaN = missing
     }
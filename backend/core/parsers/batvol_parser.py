@@ -3,33 +3,33 @@ Parser for cell voltage CSV (e.g. rack1batVol_2024-10-01)
 
 Columns:
   time, V1, V2, V3, ... (224 cells)
-Unit: millivolt → volt
+Unit: millivolt → volt (VOLTAGE_SCALE_CELL)
 """
 
-from typing import IO, Dict
-from .common import iter_csv, fast_float, parse_time
+from typing import IO, Dict, Callable, Generator, Optional
 
+from ..config import settings
+from .common import RecordBatch
+from .columnar import iter_wide_batches, concat_batches, column_views
 
-def parse_batvol_csv(fileobj: IO) -> Dict:
 
-    time_list = []
-    cell_table = {}   # key: V1, V2, ...
+def _is_cell_col(name: str) -> bool:
+    return name.lower().startswith("v")
 
-    for row in iter_csv(fileobj):
-        ts = parse_time(row.get("time"))
-        if ts is None:
-            continue
 
-        time_list.append(ts)
+def iter_batvol_batches(fileobj: IO, rows: Optional[int] = None) -> Generator[RecordBatch, None, None]:
+    """
+    Yield RecordBatch(time int64[n], values float32[n, cells], columns) of at
+    most ``rows`` (default CHUNK_ROWS) rows.
+    """
+    yield from iter_wide_batches(fileobj, _is_cell_col, settings.VOLTAGE_SCALE_CELL, rows)
 
-        # parse all Vxxx
-        for key, val in row.items():
-            if key.lower().startswith("v"):
-                if key not in cell_table:
-                    cell_table[key] = []
-                cell_table[key].append(fast_float(val) / 1000.0 if val else None)
+
+def parse_batvol_csv(fileobj: IO, on_chunk: Optional[Callable[[], None]] = None) -> Dict:
+
+    times, columns, matrix = concat_batches(iter_batvol_batches(fileobj), on_chunk)
 
     return {
-        "time": time_list,
-        "voltage": cell_table,   # dict: {"V1": [..], "V2":[..]}
+        "time": times,                              # int64 epoch seconds
+        "voltage": column_views(columns, matrix),   # {"V1": float32[T], ...}, NaN = missing
     }
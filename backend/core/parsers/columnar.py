@@ -0,0 +1,246 @@
+"""
+Columnar CSV backend for the wide cell files (batVol: 224 V columns,
+batTemp: 140 T columns).
+
+Instead of csv.DictReader + one fast_float per cell, the header is read
+once, value columns are mapped to indices, and each block of CHUNK_ROWS
+raw lines is converted into a (rows × channels) float matrix in bulk:
+
+    fast path : all non-time columns are values, no quoting
+                → one np.loadtxt over the block text
+    fallback  : csv.reader + per-cell cast (ragged rows, quotes, junk)
+
+Empty / unparsable cells become NaN. The time column is decoded in one
+vectorized pass per block into int64 epoch seconds.
+
+Each block is yielded as a typed RecordBatch, so callers can consume a
+file incrementally (memory bounded by CHUNK_ROWS) or concatenate it.
+"""
+
+import csv
+import io
+from typing import IO, Callable, Dict, Generator, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..utils.timeutil import decode_epoch_seconds, INVALID_EPOCH
+from .common import RecordBatch, _text_lines, fast_float
+
+
+# ---------------------------------------------------------
+# Raw line blocks
+# ---------------------------------------------------------
+def iter_line_blocks(
+    fileobj: IO,
+    rows: Optional[int] = None,
+    encoding="utf-8",
+) -> Generator[Tuple[List[str], List[str]], None, None]:
+    """
+    Yield (header, lines) with at most ``rows`` raw data lines per block.
+    """
+    rows = rows or settings.CHUNK_ROWS
+    header = None
+    block = []
+
+    for line in _text_lines(fileobj, encoding):
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        if header is None:
+            header = [h.strip() for h in next(csv.reader([line]))]
+            continue
+        block.append(line)
+        if len(block) >= rows:
+            yield header, block
+            block = []
+
+    if block:
+        yield header, block
+
+
+# ---------------------------------------------------------
+# Block → matrix
+# ---------------------------------------------------------
+def _parse_block(rows: List[str], shape: Tuple[int, int]) -> Optional[np.ndarray]:
+    """
+    Float matrix of comma separated rows in one C-level np.loadtxt pass,
+    or None if a cell is not a number (the caller falls back to csv).
+    """
+    text = "\n".join(rows)
+    # empty fields → nan (",," twice to cover runs of empties, then the
+    # first / last field of a row)
+    text = text.replace(",,", ",nan,").replace(",,", ",nan,")
+    text = text.replace("\n,", "\nnan,").replace(",\n", ",nan\n")
+    if text.startswith(","):
+        text = "nan" + text
+    if text.endswith(","):
+        text = text + "nan"
+
+    try:
+        mat = np.loadtxt(io.StringIO(text), dtype=np.float64, delimiter=",", comments=None, ndmin=2)
+    except ValueError:
+        return None
+    return mat if mat.shape == shape else None
+
+
+def block_to_matrix(
+    lines: List[str],
+    header: List[str],
+    value_idx: List[int],
+    time_idx: int,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Return (raw time strings, float64 matrix of shape (len(lines), len(value_idx))).
+    """
+    n, k = len(lines), len(value_idx)
+    simple = (
+        time_idx == 0
+        and value_idx == list(range(1, len(header)))
+    )
+
+    if simple:
+        heads, rests = [], []
+        for line in lines:
+            head, _, rest = line.partition(",")
+            heads.append(head)
+            rests.append(rest)
+
+        if all(r.count(",") == k - 1 for r in rests) and not any('"' in r for r in rests):
+            mat = _parse_block(rests, (n, k))
+            if mat is not None:
+                return heads, mat
+
+    # fallback: tolerant per-cell path
+    rows = list(csv.reader(lines))
+    times = [r[time_idx] if time_idx < len(r) else "" for r in rows]
+    mat = np.array(
+        [[fast_float(r[i]) if i < len(r) else None for i in value_idx] for r in rows],
+        dtype=np.float64,
+    ).reshape(n, k)
+    return times, mat
+
+
+# ---------------------------------------------------------
+# Record-batch generators
+# ---------------------------------------------------------
+def _time_column(header: List[str]) -> Optional[int]:
+    return header.index("time") if "time" in header else None
+
+
+def _to_batch(raw_times, mat, scale, columns, dtype) -> RecordBatch:
+    ts = decode_epoch_seconds(raw_times)
+    valid = ts != INVALID_EPOCH     # rows with an unparsable time are dropped
+    return RecordBatch(
+        time=ts[valid],
+        values=(mat[valid] * scale).astype(dtype),
+        columns=columns,
+    )
+
+
+def iter_wide_batches(
+    fileobj: IO,
+    is_value_col: Callable[[str], bool],
+    scale,
+    rows: Optional[int] = None,
+    dtype=np.float32,
+) -> Generator[RecordBatch, None, None]:
+    """
+    Wide tables (time + many channels): every column accepted by
+    ``is_value_col`` becomes a channel; ``scale`` applied in one multiply.
+    """
+    columns = value_idx = time_idx = None
+
+    for header, lines in iter_line_blocks(fileobj, rows):
+        if columns is None:
+            time_idx = _time_column(header)
+            if time_idx is None:
+                return
+            value_idx = [i for i, h in enumerate(header) if i != time_idx and is_value_col(h)]
+            columns = [header[i] for i in value_idx]
+
+        raw_times, mat = block_to_matrix(lines, header, value_idx, time_idx)
+        yield _to_batch(raw_times, mat, scale, columns, dtype)
+
+
+def iter_named_batches(
+    fileobj: IO,
+    spec: List[Tuple[str, str, float]],
+    rows: Optional[int] = None,
+    dtype=np.float64,
+) -> Generator[RecordBatch, None, None]:
+    """
+    Narrow tables with a fixed schema. ``spec`` is a list of
+    (output name, CSV column, scale); columns missing from the header are NaN.
+    """
+    columns = [out for out, _, _ in spec]
+    scale = np.array([sc for _, _, sc in spec], dtype=np.float64)
+    value_idx = time_idx = present = None
+
+    for header, lines in iter_line_blocks(fileobj, rows):
+        if time_idx is None:
+            time_idx = _time_column(header)
+            if time_idx is None:
+                return
+            present = [src in header for _, src, _ in spec]
+            value_idx = [header.index(src) for (_, src, _), ok in zip(spec, present) if ok]
+
+        raw_times, mat = block_to_matrix(lines, header, value_idx, time_idx)
+        if not all(present):
+            full = np.full((mat.shape[0], len(spec)), np.nan)
+            full[:, present] = mat
+            mat = full
+        yield _to_batch(raw_times, mat, scale, columns, dtype)
+
+
+def concat_batches(
+    batches: Iterable[RecordBatch],
+    on_chunk: Optional[Callable[[], None]] = None,
+    dtype=np.float32,
+    columns: Optional[List[str]] = None,
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Materialize a batch stream: (int64 time, column names, values T × N).
+    ``columns`` is only used to shape the result of an empty stream.
+    """
+    times, blocks, columns = [], [], list(columns or [])
+
+    for batch in batches:
+        times.append(batch.time)
+        blocks.append(batch.values)
+        columns = batch.columns
+
+        if on_chunk is not None:
+            on_chunk()   # e.g. ResourceGuard.check_rss between chunks
+
+    if not blocks:
+        return np.empty(0, dtype=np.int64), columns, np.empty((0, len(columns)), dtype=dtype)
+
+    return np.concatenate(times), columns, np.concatenate(blocks, axis=0)
+
+
+def column_views(columns: List[str], matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    {"V1": matrix[:, 0], ...} — zero-copy views, same logical shape as the
+    old dict-of-lists output.
+    """
+    return {name: matrix[:, j] for j, name in enumerate(columns)}
+
+
+def views_matrix(views: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Inverse of column_views: the (T × N) matrix the views were cut from,
+    or None if they are not consecutive columns of one array.
+    """
+    cols = list(views.values())
+    if not cols:
+        return None
+    base = cols[0].base
+    if not isinstance(base, np.ndarray) or base.ndim != 2 or base.shape[1] != len(cols):
+        return None
+
+    ptr, step = base.ctypes.data, base.strides[1]
+    for j, col in enumerate(cols):
+        if col.base is not base or col.ctypes.data != ptr + j * step or col.shape != base.shape[:1]:
+            return None
+    return base
@@ -3,8 +3,30 @@ Common shared utilities for CSV parsers.
 """
 
 import csv
+import io
+from dataclasses import dataclass
 from datetime import datetime
-from typing import IO, Generator
+from typing import IO, Generator, List, Optional
+
+import numpy as np
+
+from ..config import settings
+
+
+# ---------------------------------------------------------
+# Typed record batch (one CSV chunk)
+# ---------------------------------------------------------
+@dataclass
+class RecordBatch:
+    time: np.ndarray        # int64 epoch seconds, shape (n,)
+    values: np.ndarray      # float matrix, shape (n, len(columns))
+    columns: List[str]
+
+    def __len__(self):
+        return len(self.time)
+
+    def take(self, mask: np.ndarray) -> "RecordBatch":
+        return RecordBatch(self.time[mask], self.values[mask], self.columns)
 
 
 # ---------------------------------------------------------
@@ -30,13 +52,43 @@ def parse_time(s: str):
 # ---------------------------------------------------------
 # 流式逐行 CSV 读取器
 # ---------------------------------------------------------
+def _text_lines(fileobj: IO, encoding: str, buffer_size: Optional[int] = None) -> Generator[str, None, None]:
+    """
+    Decode a binary member stream line by line through one bounded
+    READ_BUFFER_SIZE buffer. Nothing is read ahead beyond that buffer.
+    (No TextIOWrapper: r|gz member streams are not seekable.)
+    """
+    buffered = io.BufferedReader(fileobj, buffer_size=buffer_size or settings.READ_BUFFER_SIZE)
+    for line in buffered:
+        yield line.decode(encoding, errors="ignore")
+
+
 def iter_csv(fileobj: IO, encoding="utf-8") -> Generator[dict, None, None]:
     """
     Yield one row (dict) at a time.
     fileobj: extracted file object from tar.extractfile()
     """
-    wrapper = (line.decode(encoding, errors="ignore") for line in fileobj)
-    reader = csv.DictReader(wrapper)
+    reader = csv.DictReader(_text_lines(fileobj, encoding))
     for row in reader:
         yield row
+
+
+def iter_csv_chunks(
+    fileobj: IO,
+    rows: Optional[int] = None,
+    encoding="utf-8",
+) -> Generator[List[dict], None, None]:
+    """
+    Yield lists of at most ``rows`` (default CHUNK_ROWS) row dicts, so the
+    caller holds one chunk of raw rows at a time.
+    """
+    rows = rows or settings.CHUNK_ROWS
+    chunk = []
+    for row in iter_csv(fileobj, encoding):
+        chunk.append(row)
+        if len(chunk) >= rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 # 共用工具（time parse, cast）
\ No newline at end of file
@@ -2,41 +2,44 @@
 Parser for rack-level summary CSV (rack1summary_2024-10-01)
 """
 
-from typing import IO, Dict
-from .common import iter_csv, fast_float, parse_time
-
-
-def parse_rack_summary_csv(fileobj: IO) -> Dict:
-
-    out = {
-        "time": [],
-        "totalVol": [],
-        "totalCurrent": [],
-        "soc": [],
-        "soh": [],
-        "maxSingleVoltage": [],
-        "minSingleVoltage": [],
-        "maxSingleTemp": [],
-        "minSingleTemp": [],
-    }
+from typing import IO, Dict, Callable, Generator, Optional
+
+import numpy as np
+
+from .common import RecordBatch
+from .columnar import iter_named_batches, concat_batches, column_views
+
 
-    for row in iter_csv(fileobj):
+# (output name, CSV column, scale)
+RACK_SUMMARY_SPEC = [
+    ("totalVol", "totalVol", 0.1),
+    ("totalCurrent", "totalCurrent", 0.1),
+    ("soc", "soc", 0.1),
+    ("soh", "soh", 0.1),
 
-        ts = parse_time(row.get("time"))
-        if ts is None:
-            continue
+    # 单体电压/温度
+    ("maxSingleVoltage", "maxSingleVoltageValue", 0.001),
+    ("minSingleVoltage", "minSingleVoltageValue", 0.001),
+    ("maxSingleTemp", "maxSingleTempValue", 0.1),
+    ("minSingleTemp", "minSingleTempValue", 0.1),
+]
 
-        out["time"].append(ts)
-        out["totalVol"].append(fast_float(row.get("totalVol")) * 0.1)
-        out["totalCurrent"].append(fast_float(row.get("totalCurrent")) * 0.1)
-        out["soc"].append(fast_float(row.get("soc")) * 0.1)
-        out["soh"].append(fast_float(row.get("soh")) * 0.1)
 
-        # 单体电压/温度
-        out["maxSingleVoltage"].append(fast_float(row.get("maxSingleVoltageValue")) * 0.001)
-        out["minSingleVoltage"].append(fast_float(row.get("minSingleVoltageValue")) * 0.001)
+def iter_rack_summary_batches(fileobj: IO, rows: Optional[int] = None) -> Generator[RecordBatch, None, None]:
+    """
+    Yield RecordBatch(time int64[n], values float64[n, 8], columns).
+    """
+    yield from iter_named_batches(fileobj, RACK_SUMMARY_SPEC, rows)
 
-        out["maxSingleTemp"].append(fast_float(row.get("maxSingleTempValue")) * 0.1)
-        out["minSingleTemp"].append(fast_float(row.get("minSingleTempValue")) * 0.1)
 
-    return out
+def parse_rack_summary_csv(fileobj: IO, on_chunk: Optional[Callable[[], None]] = None) -> Dict:
+
+    names = [out for out, _, _ in RACK_SUMMARY_SPEC]
+    times, columns, matrix = concat_batches(
+        iter_rack_summary_batches(fileobj), on_chunk, dtype=np.float64, columns=names
+    )
+
+    return {
+        "time": times,     # int64 epoch seconds
+        **column_views(columns, matrix),
+    }
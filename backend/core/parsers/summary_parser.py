@@ -2,41 +2,40 @@
 Parser for bank-level summary CSV (bank0summary_2024-10-01)
 """
 
-from typing import IO, Dict
-from .common import iter_csv, parse_time, fast_float
+from typing import IO, Dict, Callable, Generator, Optional
 
+import numpy as np
 
-def parse_summary_csv(fileobj: IO) -> Dict:
-    time_list = []
-    volt_list = []
-    curr_list = []
-    soc_list = []
-    soh_list = []
+from .common import RecordBatch
+from .columnar import iter_named_batches, concat_batches, column_views
 
-    for row in iter_csv(fileobj):
 
-        ts = parse_time(row.get("time"))
-        if ts is None:
-            continue
+# (output name, CSV column, scale)
+SUMMARY_SPEC = [
+    ("totalVol", "totalVol", 0.1),
+    ("totalCur", "totalCur", 0.1),
+    ("soc", "soc", 0.1),
+    ("soh", "soh", 0.1),
+]
 
-        total_vol = fast_float(row.get("totalVol"))
-        total_cur = fast_float(row.get("totalCur"))
-        soc = fast_float(row.get("soc"))
-        soh = fast_float(row.get("soh"))
 
-        if total_vol is None:
-            continue
+def iter_summary_batches(fileobj: IO, rows: Optional[int] = None) -> Generator[RecordBatch, None, None]:
+    """
+    Yield RecordBatch(time int64[n], values float64[n, 4], columns).
+    Rows without totalVol are dropped (as before).
+    """
+    for batch in iter_named_batches(fileobj, SUMMARY_SPEC, rows):
+        yield batch.take(~np.isnan(batch.values[:, 0]))
 
-        time_list.append(ts)
-        volt_list.append(total_vol * 0.1)
-        curr_list.append(total_cur * 0.1 if total_cur is not None else None)
-        soc_list.append(soc * 0.1 if soc is not None else None)
-        soh_list.append(soh * 0.1 if soh is not None else None)
+
+def parse_summary_csv(fileobj: IO, on_chunk: Optional[Callable[[], None]] = None) -> Dict:
+
+    names = [out for out, _, _ in SUMMARY_SPEC]
+    times, columns, matrix = concat_batches(
+        iter_summary_batches(fileobj), on_chunk, dtype=np.float64, columns=names
+    )
 
     return {
-        "time": time_list,
-        "totalVol": volt_list,
-        "totalCur": curr_list,
-        "soc": soc_list,
-        "soh": soh_list,
+        "time": times,     # int64 epoch seconds
+        **column_views(columns, matrix),
     }
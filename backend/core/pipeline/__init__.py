@@ -4,6 +4,9 @@ Battery Analysis Pipeline Package
 Contains:
 - dispatcher: Task-level orchestration
 - worker_pool: Multiprocess worker pool manager
+- job_graph: Job fan-out (parse → per-rack align/analyze → bank merge)
+- worker_init: Warm worker processes (forkserver preload, initializer)
 - worker_process: Worker subprocess main loop
+- shm_transport: Shared-memory array transport between workers
 - resource_ctl: RSS & system resource monitoring
 """
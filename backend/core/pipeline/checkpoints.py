@@ -0,0 +1,357 @@
+"""
+checkpoints.py
+--------------
+Content-addressed stage cache, shared by every job. Each stage output is
+stored in the CheckpointStore under a hash of everything it depends on:
+
+    INGEST   archive fingerprints (source, size, mtime)   parsed members (ingest cache, per member)
+             + data timezone
+    ALIGN    INGEST + align settings (TIME_STEP_SEC, gap,  aligned tables + rollups + dayframe.json
+             temp mode, rollup levels) + channel layout
+    ANALYZE  ALIGN + plugin name / version / config_keys  plugin output (payload.json), per plugin
+    EXPORT   ANALYZE keys + job id + result dir           marker
+
+Same inputs, same key: a retried job resumes after its last completed
+stage, and any other job over the same archives and settings reuses the
+outputs instead of recomputing them. A job that only changes one
+plugin's thresholds reruns that plugin on the cached aligned frame.
+
+Aligned tables are hard-linked from the cache into the job's results, so
+both share the bytes; the store evicts least recently used entries past
+CHECKPOINT_MAX_MB. A fanned-out job caches the same way per rack
+(rack_align_key: the rack's members + the job plan).
+
+Hits and misses are counted per stage (CacheStats) and returned with the
+job result; the Dispatcher sums them per task.
+"""
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..aligner.timeline_aligner import AlignPlan, cfg_value, channel_layout_for
+from ..analysis.compute_features import compute_battery_features
+from ..analysis.registry import registry
+from ..config import settings
+from ..ingest.member_index import get_member_index
+from ..logging_cfg import get_task_logger
+from ..model.dayframe import DayFrame
+from ..storage.checkpoint_store import CacheStats, CheckpointStore, link_tree
+from ..storage.ingest_cache import CACHE_FORMAT, IngestCache
+from ..storage.parquet_store import ParquetStore
+from ..storage.result_store import ResultStore
+from ..tasks.job import JobStage
+from ..utils.timeutil import timezone_key
+
+
+# settings the aligned frame depends on (layout handled separately)
+_ALIGN_SETTINGS = (
+    "TIME_STEP_SEC",
+    "ALIGN_GAP_SEC",
+    "TEMP_ALIGN_MODE",
+    "TEMP_FILL_MAX_GAP_SEC",
+    "ROLLUP_LEVELS_SEC",
+)
+
+
+def _digest(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _array_digest(array: Optional[np.ndarray]) -> Optional[str]:
+    if array is None:
+        return None
+    array = np.ascontiguousarray(array)
+    return hashlib.sha256(array.tobytes()).hexdigest()[:32] + f"{array.dtype.str}{array.shape}"
+
+
+def cache_enabled(config: Dict[str, Any]) -> bool:
+    return bool(cfg_value(config, "CHECKPOINT_ENABLED", settings.CHECKPOINT_ENABLED))
+
+
+# ---------------------------------------------------------
+# Keys
+# ---------------------------------------------------------
+def archive_fingerprint(tar_path: str):
+    index = get_member_index(tar_path)
+    return index.source, index.size, index.mtime
+
+
+def align_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    out = {name: cfg_value(config, name, getattr(settings, name)) for name in _ALIGN_SETTINGS}
+    out["layout"] = channel_layout_for(config)
+    return out
+
+
+def plugin_key(align_key: str, name: str, config: Dict[str, Any]) -> str:
+    """
+    ANALYZE key of one plugin: its version and only the config it reads
+    (AnalysisPlugin.config_keys; all of it when undeclared).
+    """
+    plugin = registry.get(name)
+    if plugin.config_keys is None:
+        cfg = config or {}
+    else:
+        cfg = {k: cfg_value(config, k, None) for k in plugin.config_keys}
+    return _digest(JobStage.ANALYZE.value, align_key, name, plugin.version, cfg)
+
+
+def stage_keys(job_id: str, files: List[str], config: Dict[str, Any]) -> Dict[Any, Any]:
+    """
+    {JobStage: key}, ANALYZE being {plugin: key}.
+    """
+    archives = [archive_fingerprint(path) for path in files if Path(path).exists()]
+    ingest = _digest(JobStage.INGEST.value, CACHE_FORMAT, timezone_key(), archives)
+    align = _digest(JobStage.ALIGN.value, ingest, align_settings(config))
+    analyze = {name: plugin_key(align, name, config) for name in registry.list_plugins()}
+    export = _digest(JobStage.EXPORT.value, analyze, job_id, settings.RESULT_DIR)
+    return {
+        JobStage.INGEST: ingest,
+        JobStage.ALIGN: align,
+        JobStage.ANALYZE: analyze,
+        JobStage.EXPORT: export,
+    }
+
+
+def plan_digest(plan: AlignPlan) -> str:
+    return _digest(
+        _array_digest(plan.time),
+        plan.rack_ids,
+        plan.cell_columns,
+        plan.temp_columns,
+        plan.cells_per_module,
+        plan.temps_per_module,
+        _array_digest(plan.segments),
+        _array_digest(plan.coverage),
+    )
+
+
+def rack_align_key(members: Dict[str, List], plan: AlignPlan, config: Dict[str, Any]) -> str:
+    """
+    ALIGN key of one rack of a fanned-out job: its members ({kind: [(tar,
+    member, ...)]}), the rack's slice of the plan and the align settings.
+    """
+    sources = sorted(
+        (kind, *archive_fingerprint(tar_path), name)
+        for kind, refs in members.items()
+        for tar_path, name, *_ in refs
+    )
+    return _digest(
+        JobStage.ALIGN.value, "rack", CACHE_FORMAT, timezone_key(), sources, plan_digest(plan), align_settings(config),
+    )
+
+
+# ---------------------------------------------------------
+# Stage cache
+# ---------------------------------------------------------
+class StageCache:
+    """
+    ALIGN / ANALYZE lookups and stores against the shared CheckpointStore,
+    counted in ``stats``. Without a store (CHECKPOINT_ENABLED off) every
+    lookup misses and outputs go straight to the job.
+    """
+
+    def __init__(self, store: Optional[CheckpointStore] = None, enabled: bool = True, stats: CacheStats = None):
+        self.store = (store or CheckpointStore()) if enabled else None
+        self.stats = stats or CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    # ------------------------------------------------------------
+    # ALIGN
+    # ------------------------------------------------------------
+    def cached_frame(self, key: str, target: ParquetStore, skip=()) -> Optional[DayFrame]:
+        """
+        The frame cached under ``key``, its files linked into ``target``
+        (except ``skip``); None on a miss.
+        """
+        if not self.enabled:
+            return None
+        stage = JobStage.ALIGN.value
+        frame = None
+        if self.store.has(stage, key):
+            try:
+                frame = ParquetStore(self.store.path(stage, key)).read_dayframe()
+                if frame is not None:
+                    self.store.link(stage, key, target.root, skip=skip)
+            except Exception as e:
+                get_task_logger().warning(f"[StageCache] ALIGN {key[:12]} unusable ({e})")
+                frame = None
+        self.stats.count(JobStage.ALIGN, frame is not None)
+        if frame is not None:
+            self.store.touch(stage, key)
+        return frame
+
+    def store_frame(self, key: str, frame: DayFrame, target: ParquetStore, skip=(), **info):
+        """
+        Write the frame into the cache and link it into ``target``; without
+        the cache it is written to ``target`` directly (tables only when
+        dayframe.json is skipped).
+        """
+        if not self.enabled:
+            if "dayframe.json" in skip:
+                target.write_dayframe_tables(frame)
+            else:
+                target.write_dayframe(frame)
+            return
+        stage = JobStage.ALIGN.value
+        staging = self.store.begin(stage, key)
+        ParquetStore(staging).write_dayframe(frame)
+        # linked from our own copy: the entry another writer may commit
+        # first (or an eviction) does not affect the job's tables
+        link_tree(staging, target.root, skip=skip)
+        self.store.commit(stage, key, staging, **info)
+
+    # ------------------------------------------------------------
+    # ANALYZE
+    # ------------------------------------------------------------
+    def features(self, align_key: str, frame: DayFrame, config: Dict[str, Any], **info) -> Dict[str, Any]:
+        """
+        Every plugin's output for ``frame``: cached ones are loaded, only
+        the rest run.
+        """
+        if not self.enabled:
+            return compute_battery_features(frame, config)
+        names = registry.list_plugins()
+        stage = JobStage.ANALYZE.value
+        keys = {name: plugin_key(align_key, name, config) for name in names}
+
+        found: Dict[str, Any] = {}
+        for name in names:
+            data = self.store.load_json(stage, keys[name])
+            if data is not None:
+                found[name] = data
+        missing = [name for name in names if name not in found]
+        self.stats.count(JobStage.ANALYZE, True, len(found))
+        self.stats.count(JobStage.ANALYZE, False, len(missing))
+
+        if missing:
+            computed = compute_battery_features(frame, config, names=missing)
+            for name, data in computed.items():
+                found[name] = data
+                self.store.save_json(stage, keys[name], data, plugin=name, **info)
+        return {name: found[name] for name in names if name in found}
+
+
+class JobCheckpoints(StageCache):
+    """
+    The stage cache as seen by one worker_entry run.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        files: List[str],
+        config: Dict[str, Any],
+        store: CheckpointStore = None,
+        enabled: bool = True,
+    ):
+        super().__init__(store, enabled and cache_enabled(config))
+        self.job_id = job_id
+        self.config = config
+        self.keys = stage_keys(job_id, files, config) if self.enabled else {}
+        self.results = ResultStore(settings.RESULT_DIR)
+        self.resumed: List[str] = []
+        self._ingest_staging: Optional[Path] = None
+        self.log = get_task_logger(job_id)
+
+    def done(self, stage: JobStage) -> bool:
+        return self.enabled and self.store.has(stage.value, self.keys[stage])
+
+    def _resumed(self, stage: JobStage):
+        self.resumed.append(stage.value)
+        self.log.info(f"[Checkpoint] {self.job_id}: {stage.value} reused")
+
+    # ------------------------------------------------------------
+    # INGEST
+    # ------------------------------------------------------------
+    def ingest_cache(self) -> Optional[IngestCache]:
+        """
+        Where parsed members go: the shared ingest cache, or the INGEST
+        entry itself (None without either).
+        """
+        if settings.INGEST_CACHE_ENABLED:
+            return IngestCache()
+        if not self.enabled:
+            return None
+        stage, key = JobStage.INGEST.value, self.keys[JobStage.INGEST]
+        if self.done(JobStage.INGEST):
+            self.store.touch(stage, key)
+            return IngestCache(self.store.path(stage, key))
+        self._ingest_staging = self.store.begin(stage, key)
+        return IngestCache(self._ingest_staging)
+
+    def ingest_done(self):
+        if not self.enabled:
+            return
+        staging, self._ingest_staging = self._ingest_staging, None
+        if staging is None and self.done(JobStage.INGEST):
+            return
+        # a staged ingest loses to an entry committed meanwhile (and is dropped)
+        self.store.commit(
+            JobStage.INGEST.value, self.keys[JobStage.INGEST], staging,
+            job_id=self.job_id, shared_cache=settings.INGEST_CACHE_ENABLED,
+        )
+
+    # ------------------------------------------------------------
+    # ALIGN
+    # ------------------------------------------------------------
+    def _aligned_target(self) -> ParquetStore:
+        target = self.results.aligned_store(self.job_id)
+        shutil.rmtree(target.root, ignore_errors=True)   # leftovers of an earlier run
+        return target
+
+    def load_aligned(self) -> Optional[DayFrame]:
+        """
+        The cached aligned frame, with its tables (and rollups) linked into
+        this job's results; None if the stage has to run.
+        """
+        if not self.done(JobStage.ALIGN):
+            if self.enabled:
+                self.stats.count(JobStage.ALIGN, False)
+            return None
+        frame = self.cached_frame(self.keys[JobStage.ALIGN], self._aligned_target())
+        if frame is not None:
+            self._resumed(JobStage.ALIGN)
+        return frame
+
+    def save_aligned(self, frame: DayFrame):
+        """
+        The job's aligned tables (its output anyway), shared with the cache.
+        """
+        self.store_frame(self.keys.get(JobStage.ALIGN), frame, self._aligned_target(), job_id=self.job_id)
+
+    # ------------------------------------------------------------
+    # ANALYZE
+    # ------------------------------------------------------------
+    def job_features(self, frame: DayFrame) -> Dict[str, Any]:
+        if not self.enabled:
+            return compute_battery_features(frame, self.config)
+        features = self.features(self.keys[JobStage.ALIGN], frame, self.config, job_id=self.job_id)
+        if not self.stats.counts.get(JobStage.ANALYZE.value, {}).get("misses"):
+            self._resumed(JobStage.ANALYZE)
+        return features
+
+    # ------------------------------------------------------------
+    # EXPORT
+    # ------------------------------------------------------------
+    def exported(self) -> bool:
+        if not self.done(JobStage.EXPORT) or self.results.load_report(self.job_id) is None:
+            return False
+        self._resumed(JobStage.EXPORT)
+        return True
+
+    def export_done(self):
+        if not self.enabled:
+            return
+        self.store.commit(JobStage.EXPORT.value, self.keys[JobStage.EXPORT], job_id=self.job_id)
+        if not settings.INGEST_CACHE_ENABLED:
+            # a private ingest cache is only there for retries of this job
+            self.store.discard(JobStage.INGEST.value, self.keys[JobStage.INGEST])
@@ -12,21 +12,51 @@ Coordinates multi-stage processing pipeline:
 
 The dispatcher:
 - Accepts a task_id and list of tar files
-- Splits them into work units
-- Pushes work units into worker_pool
-- Pushes progress updates
+- Plans work units lazily (one job per archive, i.e. per bank-day)
+- Pushes them into worker_pool, blocking while its backlog is full
+- Drains the results channel as it goes and tracks progress, including
+  the stage cache hits / misses of its jobs (checkpoints.py)
+
+A 90-day backfill therefore never holds more than WORKER_QUEUE_SIZE
+queued jobs (plus the few tasks in flight) at any time.
+
+Dispatcher.start_task runs a task to the end in the calling thread
+(scripts, CLI). The API uses AsyncDispatcher: start() schedules the task
+on the event loop and returns its id at once; admission and results are
+awaited, never waited for, so the loop keeps serving requests while jobs
+run. With TASK_QUEUE_ENABLED its jobs go to the durable SQLite queue
+instead (TaskManager) and are run by queue workers (queue_worker.py),
+in this server's host or elsewhere on it.
 """
 
+import asyncio
+import time
 import uuid
+from functools import partial
 from loguru import logger
-from multiprocessing import Queue
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
 
-from .worker_pool import WorkerPool
-from .resource_ctl import ResourceGuard
-from ..tasks.progress import progress_manager
+from .status import JobStatus
+from .worker_pool import JobRecord, TaskResult, WorkerPool
 from ..config import settings
-from ..ingest.tar_stream import stream_tar_members
+from ..storage.checkpoint_store import CacheStats
+from ..tasks.job import JobStatus as QueueStatus
+from ..tasks.progress import ProgressUpdate, progress_manager
+from ..tasks.task_manager import TaskManager
+
+
+_ADMIT_RETRY_SEC = 0.2      # backlog full: how often an async task retries admission
+_DONE = {JobStatus.FINISHED.value, JobStatus.ERROR.value, JobStatus.CANCELLED.value}
+
+# durable queue job status → dispatcher status
+_QUEUE_STATUS = {
+    QueueStatus.PENDING.value: JobStatus.QUEUED,
+    QueueStatus.RUNNING.value: JobStatus.RUNNING,
+    QueueStatus.SUCCESS.value: JobStatus.FINISHED,
+    QueueStatus.FAILED.value: JobStatus.FINISHED,     # finished, with failed jobs
+    QueueStatus.CANCELLED.value: JobStatus.CANCELLED,
+}
 
 
 class Dispatcher:
@@ -34,64 +64,316 @@ class Dispatcher:
     Orchestrates the multi-process pipeline.
 
     Responsibilities:
-    - Create work units (tar_member jobs)
-    - Push jobs to worker pool
+    - Create work units (one job per tar file)
+    - Push jobs to worker pool (bounded)
     - Drain worker results
     - Update progress
     """
 
     def __init__(self):
         self.worker_pool = WorkerPool(max_workers=settings.MAX_WORKERS)
+        self.progress: Dict[str, Dict] = {}
 
+    def _progress(self, task_id: str, **fields):
+        state = self.progress.setdefault(task_id, {"total": None, "finished": 0, "failed": 0})
+        state.update(fields, updated=time.time())
+        logger.info(f"[Dispatcher] {task_id}: {fields}")
 
-    def start_task(self, task_id: str, tar_files: list[str]):
-        logger.info(f"[Dispatcher] Starting task={task_id}")
-        progress_manager.push(task_id, msg="Task started", stage="init")
-
-        # Build job list
-        jobs = []
-        for tar in tar_files:
-            full_path = settings.DATA_ROOT / tar
+    # ------------------------------------------------------------
+    # Planning (lazy)
+    # ------------------------------------------------------------
+    def plan_jobs(self, task_id: str, tar_files: List[str], config: Optional[dict] = None) -> Iterator[JobRecord]:
+        """
+        One JobRecord per existing archive, generated on demand so a long
+        file list is never expanded (or indexed) up front.
+        """
+        for n, tar in enumerate(tar_files):
+            full_path = Path(tar) if Path(tar).is_absolute() else settings.DATA_ROOT / tar
             if not full_path.exists():
                 logger.error(f"File not found: {full_path}")
                 continue
+            yield JobRecord(job_id=f"{task_id}-{n:05d}", files=[str(full_path)], config=dict(config or {}))
 
-            for member_name, _ in stream_tar_members(full_path):
-                job_id = str(uuid.uuid4())
-                jobs.append({
-                    "task_id": task_id,
-                    "job_id": job_id,
-                    "tar_file": tar,
-                    "member": member_name,
-                })
-
-        if not jobs:
-            progress_manager.push(task_id, msg="No valid jobs found", stage="error")
+    # ------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------
+    def start_task(self, task_id: str, tar_files: list[str], config: Optional[dict] = None):
+        logger.info(f"[Dispatcher] Starting task={task_id}")
+        self._progress(task_id, status=JobStatus.RUNNING.value, stage="init", msg="Task started", total=len(tar_files))
+
+        channel = self.worker_pool.open_channel()
+        submitted = completed = 0
+
+        for job in self.plan_jobs(task_id, tar_files, config):
+            # blocks while WORKER_QUEUE_SIZE jobs are waiting: backpressure
+            self.worker_pool.submit_job(job, results=channel)
+            submitted += 1
+
+            # drain whatever finished meanwhile
+            for result in self.worker_pool.poll_results(channel):
+                completed += 1
+                self._on_result(task_id, result, completed, submitted)
+
+        if not submitted:
+            self._progress(task_id, status=JobStatus.ERROR.value, stage="error", msg="No valid jobs found", total=0)
             return
 
-        total = len(jobs)
-        logger.info(f"[Dispatcher] Created {total} jobs for task={task_id}")
+        self._progress(task_id, total=submitted)
+        for result in self.worker_pool.results(expected=submitted - completed, channel=channel):
+            completed += 1
+            self._on_result(task_id, result, completed, submitted)
 
-        progress_manager.set_total(task_id, total)
+        self._progress(task_id, status=JobStatus.FINISHED.value, stage="complete", msg="Task finished")
+        logger.info(f"[Dispatcher] Task finished: {task_id}, stage cache {self.progress[task_id].get('cache', {})}")
 
-        # Enqueue jobs
-        for job in jobs:
-            self.worker_pool.submit(job)
+    def _on_result(self, task_id: str, result: TaskResult, completed: int, submitted: int):
+        state = self.progress[task_id]
+        if not result.ok:
+            logger.error(f"[Dispatcher] {result.tag} failed: {result.error}")
+        elif isinstance(result.value, dict) and result.value.get("cache"):
+            cache = CacheStats(state.get("cache"))
+            cache.merge(result.value["cache"])
+            state["cache"] = cache.to_dict()
+        self._progress(
+            task_id,
+            finished=completed,
+            failed=state["failed"] + (0 if result.ok else 1),
+            stage="running",
+            msg=f"Completed {completed}/{submitted}",
+        )
 
-        # Drain results
-        completed = 0
-        for result in self.worker_pool.results():
+
+# ------------------------------------------------------------
+# asyncio front end (FastAPI)
+# ------------------------------------------------------------
+class LoopChannel:
+    """
+    WorkerPool results channel that delivers into the event loop.
+
+    The pool puts results from its own threads (the multiprocessing
+    result handler, the feeder); put() hands each one to the loop with
+    call_soon_threadsafe and returns at once, and the dispatcher awaits
+    get(). Nothing on the loop ever blocks on the pool.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def put(self, result: TaskResult):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, result)
+        except RuntimeError:
+            pass   # loop closed (server shutting down): nobody is waiting
+
+    async def get(self) -> TaskResult:
+        return await self.queue.get()
+
+
+class AsyncDispatcher(Dispatcher):
+    """
+    Dispatcher for the API, on the server's event loop.
+
+    - start()  registers the task and schedules it; returns its id at once
+    - jobs are admitted with non-blocking submits; while the backlog is
+      full the task awaits its own results instead of a free slot
+    - results arrive through a LoopChannel
+    - jobs are planned (archive lookups) on a thread, one at a time
+    - progress is also pushed to the task's WebSocket subscribers; a
+      finished task's entry is dropped after TASK_PROGRESS_KEEP_SEC
+    - TASK_QUEUE_ENABLED: jobs are put in the durable queue and the task
+      follows their state there (queue workers run them)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def startup(self):
+        if settings.TASK_QUEUE_ENABLED:
+            return   # queue workers run the jobs, no pool in the server
+        # forks the pool and warms its workers: off the loop
+        await asyncio.to_thread(self.worker_pool.start)
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.to_thread(self.worker_pool.shutdown)
+
+    def _progress(self, task_id: str, **fields):
+        super()._progress(task_id, **fields)
+        state = self.progress[task_id]
+        total = state.get("total") or 0
+        if state.get("status") == JobStatus.FINISHED.value:
+            percent = 100.0
+        else:
+            percent = 100.0 * state["finished"] / total if total else 0.0
+        progress_manager.publish(task_id, ProgressUpdate(
+            job_id=task_id,
+            stage=state.get("stage", ""),
+            percent=round(percent, 1),
+            detail=state.get("msg", ""),
+            error=state.get("error"),
+        ))
+
+    # ------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------
+    async def start(self, tar_files: List[str], config: Optional[dict] = None, task_id: Optional[str] = None) -> str:
+        task_id = task_id or uuid.uuid4().hex[:12]
+        if task_id in self._tasks:
+            raise ValueError(f"Task already running: {task_id}")
+        self._prune_progress()
+        self._progress(task_id, status=JobStatus.QUEUED.value, stage="init", msg="Task accepted", total=len(tar_files))
+        run = self._run_queued if settings.TASK_QUEUE_ENABLED else self._run
+        task = asyncio.create_task(run(task_id, list(tar_files), config), name=f"dispatch-{task_id}")
+        self._tasks[task_id] = task
+        task.add_done_callback(partial(self._task_done, task_id))
+        return task_id
+
+    def _task_done(self, task_id: str, task: asyncio.Task):
+        self._tasks.pop(task_id, None)
+        if task.cancelled() and self.progress[task_id].get("status") != JobStatus.CANCELLED.value:
+            # cancelled before it ever ran
+            self._progress(task_id, status=JobStatus.CANCELLED.value, stage="cancelled", msg="Task cancelled")
+
+    def _prune_progress(self):
+        cutoff = time.time() - settings.TASK_PROGRESS_KEEP_SEC
+        for task_id, state in list(self.progress.items()):
+            if task_id not in self._tasks and state.get("status") in _DONE and state["updated"] < cutoff:
+                del self.progress[task_id]
+
+    async def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        state = self.progress.get(task_id)
+        if state is None and settings.TASK_QUEUE_ENABLED:
+            # queued before this server (re)started; the DB may be busy: off the loop
+            queue = await asyncio.to_thread(TaskManager.queue_progress, task_id)
+            if queue is not None:
+                state = self._queue_fields(queue)
+        return state
+
+    async def cancel(self, task_id: str) -> bool:
+        """
+        Stop admitting the task's jobs and drop those still queued; jobs
+        already running finish. False if the task is not running.
+        """
+        task = self._tasks.get(task_id)
+        if task is None or task.done():
+            if not settings.TASK_QUEUE_ENABLED:
+                return False
+            return await asyncio.to_thread(TaskManager.cancel_queued, task_id) > 0
+        task.cancel()
+        return True
+
+    # ------------------------------------------------------------
+    # Run (on the loop)
+    # ------------------------------------------------------------
+    async def _run(self, task_id: str, tar_files: List[str], config: Optional[dict]):
+        channel = LoopChannel()
+        pending: Set[str] = set()      # submitted, not reported yet
+        submitted = completed = 0
+
+        def handle(result: TaskResult):
+            nonlocal completed
             completed += 1
-            progress_manager.update(
-                task_id,
-                finished=completed,
-                msg=f"Completed {completed}/{total}",
-                stage=result.get("stage", "done")
+            pending.discard(result.tag)
+            self._on_result(task_id, result, completed, submitted)
+
+        try:
+            self._progress(task_id, status=JobStatus.RUNNING.value, msg="Task started")
+            # planning stats the archives: off the loop, still one job at a time
+            jobs = self.plan_jobs(task_id, tar_files, config)
+            while (job := await asyncio.to_thread(next, jobs, None)) is not None:
+                while not self.worker_pool.submit_job(job, block=False, results=channel):
+                    # backlog full: handle our own results while waiting for room
+                    try:
+                        handle(await asyncio.wait_for(channel.get(), _ADMIT_RETRY_SEC))
+                    except asyncio.TimeoutError:
+                        pass
+                submitted += 1
+                pending.add(job.job_id)
+
+            if not submitted:
+                self._progress(task_id, status=JobStatus.ERROR.value, stage="error", msg="No valid jobs found", total=0)
+                return
+
+            self._progress(task_id, total=submitted)
+            while completed < submitted:
+                handle(await channel.get())
+
+            self._progress(task_id, status=JobStatus.FINISHED.value, stage="complete", msg="Task finished")
+            logger.info(f"[Dispatcher] Task finished: {task_id}, stage cache {self.progress[task_id].get('cache', {})}")
+
+        except asyncio.CancelledError:
+            dropped = sum(self.worker_pool.cancel_job(job_id) for job_id in pending)
+            self._progress(
+                task_id, status=JobStatus.CANCELLED.value, stage="cancelled",
+                msg=f"Task cancelled ({dropped} queued job(s) dropped)",
+            )
+            raise
+        except Exception as e:
+            logger.exception(f"[Dispatcher] {task_id} failed")
+            self._progress(task_id, status=JobStatus.ERROR.value, stage="error", msg=str(e), error=str(e))
+
+
+    # ------------------------------------------------------------
+    # Run through the durable queue
+    # ------------------------------------------------------------
+    @staticmethod
+    def _queue_fields(queue: Dict[str, Any]) -> Dict[str, Any]:
+        status = _QUEUE_STATUS[queue["status"]]
+        done = queue["success"] + queue["failed"]
+        fields = {
+            "status": status.value,
+            "stage": {JobStatus.FINISHED: "complete", JobStatus.CANCELLED: "cancelled"}.get(status, "running"),
+            "total": queue["total"],
+            "finished": done,
+            "failed": queue["failed"],
+            "msg": f"Completed {done}/{queue['total']}",
+        }
+        if queue.get("error"):
+            fields["error"] = queue["error"]
+        return fields
+
+    async def _run_queued(self, task_id: str, tar_files: List[str], config: Optional[dict]):
+        try:
+            jobs = await asyncio.to_thread(
+                lambda: [(job.job_id, job.files) for job in self.plan_jobs(task_id, tar_files, config)]
             )
+            if not jobs:
+                self._progress(task_id, status=JobStatus.ERROR.value, stage="error", msg="No valid jobs found", total=0)
+                return
+            await asyncio.to_thread(TaskManager.enqueue_job, task_id, jobs, config)
+            self._progress(task_id, total=len(jobs), msg=f"{len(jobs)} job(s) queued")
 
-        progress_manager.push(task_id, msg="Task finished", stage="complete")
-        logger.info(f"[Dispatcher] Task finished: {task_id}")
+            # follow the queue: the jobs' state lives in the DB, not here
+            while True:
+                queue = await asyncio.to_thread(TaskManager.queue_progress, task_id)
+                fields = self._queue_fields(queue)
+                if fields["status"] in (JobStatus.FINISHED.value, JobStatus.CANCELLED.value):
+                    break
+                if fields["finished"] != self.progress[task_id]["finished"] or fields["status"] != self.progress[task_id]["status"]:
+                    self._progress(task_id, **fields)
+                await asyncio.sleep(settings.TASK_QUEUE_POLL_SEC)
+
+            cache = CacheStats()
+            for result in await asyncio.to_thread(TaskManager.task_results, task_id):
+                cache.merge(result.get("cache"))
+            self._progress(task_id, **fields, cache=cache.to_dict())
+            logger.info(f"[Dispatcher] Task finished: {task_id}, stage cache {cache.to_dict()}")
+
+        except asyncio.CancelledError:
+            # shielded: the drop must finish although this task is being cancelled
+            dropped = await asyncio.shield(asyncio.to_thread(TaskManager.cancel_queued, task_id))
+            self._progress(
+                task_id, status=JobStatus.CANCELLED.value, stage="cancelled",
+                msg=f"Task cancelled ({dropped} queued job(s) dropped)",
+            )
+            raise
+        except Exception as e:
+            logger.exception(f"[Dispatcher] {task_id} failed")
+            self._progress(task_id, status=JobStatus.ERROR.value, stage="error", msg=str(e), error=str(e))
 
 
 # Global dispatcher instance
-dispatcher = Dispatcher()
+dispatcher = AsyncDispatcher()
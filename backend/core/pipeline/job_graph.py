@@ -0,0 +1,245 @@
+"""
+job_graph.py
+------------
+One job fanned out over the whole pool as a small DAG:
+
+                       ┌─▶ parse (member group) ─┐                   ┌─▶ align + analyze rack1 ─┐
+    index (archive) ───┼─▶ parse (member group) ─┼─▶ plan (parent) ──┼─▶ align + analyze rack2 ─┼─▶ merge (bank)
+    index (archive) ───┴─▶ ...                  ─┘                   └─▶ ...                    ─┘
+
+- index   : load (or build: one full inflate of a cold archive) the
+            member index and split the members into parse groups; done
+            in the pool, so a new archive never stalls the pool's feeder
+- parse   : members → ingest cache (and shared memory, SHM_TRANSPORT);
+            returns SourceSpans (intervals + columns), BatchRefs and
+            its cache hits
+- plan    : unified grid / coverage / columns, computed in the parent from
+            the spans (no timestamps cross process boundaries)
+- rack    : map the rack's members from shared memory (or load them from
+            the cache), align onto the plan, run the plugins, write the
+            rack's tables — or reuse them from the stage cache
+            (checkpoints.py); its segments are released when it returns
+- merge   : bank summary, dayframe.json, merged features / report
+
+Stages are chained through pool callbacks (they run on the pool's result
+thread) and submitted as WorkerPool follow-ups, which never block and run
+ahead of newly admitted jobs; a stage starts as soon as the last task of
+the previous one returns.
+"""
+
+import shutil
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+from typing import Callable, Dict, List, Tuple
+
+from ..aligner.timeline_aligner import AlignPlan, cfg_value, plan_alignment
+from ..config import settings
+from ..logging_cfg import get_task_logger
+from ..storage.checkpoint_store import CacheStats
+
+
+def _load_task_fns():
+    # worker_process imports the whole analysis stack: keep it lazy
+    from .worker_process import align_rack, index_archive, merge_bank, parse_members
+    return index_archive, parse_members, align_rack, merge_bank
+
+
+class JobGraph:
+
+    def __init__(
+        self,
+        pool,                   # WorkerPool
+        job_id: str,
+        config: Dict,
+        files: List[str],
+        on_done: Callable[[Dict], None],
+        on_error: Callable[[Exception], None],
+        on_empty: Callable[[], None],
+    ):
+        self.pool = pool
+        self.job_id = job_id
+        self.config = config
+        self.files = [str(path) for path in files]
+        self.archives: List[str] = []   # self.files without repeats, set by start()
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_empty = on_empty    # no parsable member in any archive
+        self.log = get_task_logger(job_id)
+
+        self._lock = threading.Lock()
+        self._failed = False
+        self._pending = 0
+        self._indexes: Dict[str, Dict] = {}
+        self._spans: List = []
+        self._racks: List[Dict] = []
+        self.cache = CacheStats()      # stage cache hits of all tasks
+        self._t0 = time.time()
+
+        # parsed members travel between stages through shared memory (the
+        # pool releases the job's segments), or else through the ingest
+        # cache; without the shared cache a per-job scratch area is used
+        # (with shared memory: for the members /dev/shm had no room for)
+        self.shm = cfg_value(config, "SHM_TRANSPORT", settings.SHM_TRANSPORT)
+        self.scratch = None
+        if not settings.INGEST_CACHE_ENABLED:
+            self.scratch = settings.OUTPUT_ROOT / "tmp" / job_id
+        self.cache_root = str(self.scratch) if self.scratch else None
+        self._rack_refs: Dict[str, List] = {}
+
+    # ------------------------------------------------------------
+    # Stage plumbing
+    # ------------------------------------------------------------
+    def _submit(self, fn, args, callback, input_bytes: int = 0):
+        self.pool.followup(fn, args, callback, self._fail, input_bytes=input_bytes)
+
+    def _fail(self, err: Exception):
+        with self._lock:
+            if self._failed:
+                return
+            self._failed = True
+        self._cleanup()
+        self.log.error(f"[JobGraph] {self.job_id} failed: {err}")
+        self.on_error(err)
+
+    def _cleanup(self):
+        if self.scratch is not None:
+            shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def _input_bytes(self, refs) -> int:
+        # task size for the memory budget, from the index stage's results
+        return sum(self._indexes[tar_path]["sizes"][name] for tar_path, name, *_ in refs)
+
+    def _last_of_stage(self) -> bool:
+        with self._lock:
+            self._pending -= 1
+            return self._pending == 0 and not self._failed
+
+    # ------------------------------------------------------------
+    # index
+    # ------------------------------------------------------------
+    def start(self):
+        index_archive, _, _, _ = _load_task_fns()
+        self.archives = list(dict.fromkeys(self.files))
+        self._pending = len(self.archives)
+        for tar_path in self.archives:
+            self._submit(
+                index_archive,
+                (self.job_id, tar_path, self.pool.max_workers),
+                partial(self._indexed, tar_path),
+            )
+
+    def _indexed(self, tar_path: str, result: Dict):
+        with self._lock:
+            self._indexes[tar_path] = result
+        if self._last_of_stage():
+            self._guarded(self._submit_parse)
+
+    # ------------------------------------------------------------
+    # parse
+    # ------------------------------------------------------------
+    def _submit_parse(self):
+        _, parse_members, _, _ = _load_task_fns()
+        groups = [
+            (tar_path, names)
+            for tar_path in self.archives
+            for names in self._indexes[tar_path]["groups"]
+        ]
+        if not groups:
+            self._cleanup()
+            self.on_empty()
+            return
+
+        self._pending = len(groups)
+        for tar_path, names in groups:
+            sizes = self._indexes[tar_path]["sizes"]
+            self._submit(
+                parse_members,
+                (tar_path, names, self.config, self.cache_root, self.job_id if self.shm else None),
+                partial(self._parsed, tar_path),
+                sum(sizes[name] for name in names),
+            )
+        self.log.info(f"[JobGraph] {self.job_id}: {len(groups)} parse task(s)")
+
+    def _parsed(self, tar_path: str, result: Dict):
+        spans = result["members"]
+        self.pool.shm.track(self.job_id, (ref for _, _, ref in spans))
+        with self._lock:
+            self._spans.extend((tar_path, entry, span, ref) for entry, span, ref in spans)
+            self.cache.merge(result.get("cache"))
+        if self._last_of_stage():
+            self._guarded(self._submit_racks)
+
+    def _guarded(self, fn):
+        # callbacks run on the pool's result thread: never let them raise
+        try:
+            fn()
+        except Exception as e:
+            self._fail(e)
+
+    # ------------------------------------------------------------
+    # plan + racks
+    # ------------------------------------------------------------
+    def _submit_racks(self):
+        _, _, align_rack, _ = _load_task_fns()
+
+        members: Dict[str, Dict[str, List[Tuple]]] = defaultdict(lambda: defaultdict(list))
+        spans, dropped = [], []
+        for tar_path, entry, span, ref in self._spans:
+            if entry.type == "summary" and span.owner != "bank" and entry.rack_id is None:
+                dropped.append(ref)
+                continue   # rack summary without a rack id: dropped, as in merge_member
+            members[span.owner][entry.type].append((tar_path, entry.name, ref))
+            spans.append(span)
+        self.pool.shm.release(self.job_id, dropped)
+
+        self.bank_members = members.pop("bank", {}).get("summary", [])
+        self.plan: AlignPlan = plan_alignment(spans, self.config)
+        self.log.info(
+            f"[JobGraph] {self.job_id}: plan {len(self.plan.time)} grid points, "
+            f"{len(self.plan.rack_ids)} rack task(s)"
+        )
+
+        if not self.plan.rack_ids:
+            self._submit_merge()
+            return
+
+        self._pending = len(self.plan.rack_ids)
+        for rack_id in self.plan.rack_ids:
+            refs = [ref for kind_refs in members[rack_id].values() for ref in kind_refs]
+            self._rack_refs[rack_id] = [shm for _, _, shm in refs]
+            self._submit(
+                align_rack,
+                (self.job_id, rack_id, dict(members[rack_id]), self.plan.for_racks([rack_id]),
+                 self.config, self.cache_root),
+                self._rack_done,
+                self._input_bytes(refs),
+            )
+
+    def _rack_done(self, result: Dict):
+        self.pool.shm.release(self.job_id, self._rack_refs.pop(result["rack_id"], ()))
+        with self._lock:
+            self._racks.append(result)
+            self.cache.merge(result.pop("cache", None))
+        if self._last_of_stage():
+            self._guarded(self._submit_merge)
+
+    # ------------------------------------------------------------
+    # merge
+    # ------------------------------------------------------------
+    def _submit_merge(self):
+        _, _, _, merge_bank = _load_task_fns()
+        self._submit(
+            merge_bank,
+            (self.job_id, self.bank_members, self.plan, self._racks, self.config, self.cache_root),
+            self._merged,
+            self._input_bytes(self.bank_members),
+        )
+
+    def _merged(self, result: Dict):
+        self._cleanup()
+        result["duration"] = round(time.time() - self._t0, 2)
+        result["cache"] = self.cache.to_dict()
+        self.log.info(f"[JobGraph] {self.job_id} done in {result['duration']}s")
+        self.on_done(result)
@@ -0,0 +1,144 @@
+"""
+memory_budget.py
+----------------
+Scheduler-side memory admission control for WorkerPool.
+
+Every pool task gets an estimate of the memory it will add to its worker
+on top of the worker's resident baseline:
+
+    estimate = max(MEMORY_TASK_MIN_MB, ratio[kind] × input MB)
+
+``kind`` is the task function (parse_members, align_rack, worker_entry,
+...) and the input size the uncompressed size of the archive members the
+task reads. ``ratio`` starts from a conservative default and is learned
+from past runs: workers report each task's peak RSS (sampled while it
+runs), and an EWMA of (peak − the worker's RSS once warm) / input MB is
+kept per kind in SQLiteMetaStore, so it survives restarts. Counting from
+the post-warm baseline rather than the RSS at task start keeps what a
+worker still holds from earlier tasks in the footprint.
+
+Workers also publish their RSS while a task grows. A task past its
+estimate has its reservation raised to what it uses (``grow``), so the
+feeder stops admitting work while it runs, not only after it returned.
+
+The feeder only hands a task to the pool while the sum of the estimates
+of the running tasks plus its own fits MEMORY_BUDGET_MB and the host
+still has that much available; otherwise the task waits at the head of
+its queue. A task that is alone always runs, so an oversized one cannot
+starve. A task that dies with MemoryError (worker over
+MEMORY_HARD_LIMIT_MB, see ResourceGuard) is requeued once and then runs
+exclusively.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import psutil
+
+from ..config import settings
+from ..logging_cfg import get_task_logger
+from ..storage.sqlite_meta import SQLiteMetaStore
+
+
+MB = 1024 ** 2
+DEFAULT_RATIO = 4.0     # task peak ≈ 4 × the CSV text it parses / aligns
+_EWMA = 0.3
+
+
+@dataclass
+class TaskMemory:
+    """
+    What a worker reports back for one task (bytes).
+    """
+    rss_before: int = 0
+    peak: int = 0
+    rss: int = 0
+    baseline: int = 0       # the worker's RSS once warm (0: unknown)
+
+    @property
+    def delta(self) -> int:
+        return max(0, self.peak - (self.baseline or self.rss_before))
+
+
+class MemoryModel:
+    """
+    Learned peak / input ratio per task kind, persisted in SQLiteMetaStore.
+    """
+
+    KEY = "memory_model:{kind}"
+
+    def __init__(self):
+        self._ratios: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.log = get_task_logger()
+
+    def ratio(self, kind: str) -> float:
+        with self._lock:
+            if kind not in self._ratios:
+                stored = SQLiteMetaStore.get_cached_stats(self.KEY.format(kind=kind)) or {}
+                self._ratios[kind] = float(stored.get("ratio", DEFAULT_RATIO))
+            return self._ratios[kind]
+
+    def observe(self, kind: str, input_bytes: int, mem: TaskMemory):
+        if input_bytes < MB:
+            return   # too small to say anything about the ratio
+        observed = mem.delta / input_bytes
+        ratio = self.ratio(kind)
+        ratio = (1 - _EWMA) * ratio + _EWMA * observed
+        with self._lock:
+            self._ratios[kind] = ratio
+        try:
+            SQLiteMetaStore.set_cached_stats(self.KEY.format(kind=kind), {"ratio": ratio})
+        except Exception as e:
+            self.log.warning(f"[MemoryBudget] could not store the {kind} model: {e}")
+
+
+class MemoryBudget:
+    """
+    Reservations of the tasks in flight against the host budget.
+    Not thread-safe on its own: WorkerPool calls it under its condition.
+    """
+
+    def __init__(self, budget_mb: Optional[int] = None, model: Optional[MemoryModel] = None):
+        budget_mb = budget_mb if budget_mb is not None else settings.MEMORY_BUDGET_MB
+        if not budget_mb:
+            budget_mb = int(psutil.virtual_memory().total * 0.6 / MB)
+        self.budget = budget_mb * MB
+        self.model = model or MemoryModel()
+        self.reserved = 0
+        self.peak_reserved = 0
+
+    def estimate(self, kind: str, input_bytes: int) -> int:
+        return max(settings.MEMORY_TASK_MIN_MB * MB, int(self.model.ratio(kind) * input_bytes))
+
+    def fits(self, estimate: int, running: int) -> bool:
+        if not running:
+            return True   # alone: always admitted, whatever the estimate
+        if self.reserved + estimate > self.budget:
+            return False
+        return psutil.virtual_memory().available > estimate
+
+    def reserve(self, estimate: int):
+        self.reserved += estimate
+        self.peak_reserved = max(self.peak_reserved, self.reserved)
+
+    def grow(self, estimate: int, footprint: int) -> int:
+        """
+        A running task reported ``footprint``: reserve what it uses past
+        its ``estimate``; returns the new estimate.
+        """
+        if footprint > estimate:
+            self.reserve(footprint - estimate)
+            return footprint
+        return estimate
+
+    def release(self, estimate: int):
+        self.reserved = max(0, self.reserved - estimate)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "budget_mb": self.budget // MB,
+            "reserved_mb": self.reserved // MB,
+            "peak_reserved_mb": self.peak_reserved // MB,
+        }
@@ -0,0 +1,203 @@
+"""
+queue_worker.py
+---------------
+Worker service for the durable task queue (TaskManager, settings.TASK_DB).
+
+Every worker process loops:
+
+    claim_task   → worker_entry(job_id, files, config) → complete_task / fail_task
+
+While a task runs, a heartbeat thread renews its lease every
+TASK_QUEUE_HEARTBEAT_SEC. A worker that dies or hangs stops renewing:
+after TASK_QUEUE_LEASE_SEC its task is claimed again by another worker
+(at most TASK_QUEUE_MAX_ATTEMPTS claims in all). A task that runs again
+resumes from the stage cache (checkpoints.py), so a re-run after a lost
+lease is cheap and writes the same results; only the lease holder may
+settle the task.
+
+Any number of workers — processes of one service, or services started
+separately on the same host — pull from the same database; none of them
+needs the API server or its WorkerPool:
+
+    python -m backend.core.pipeline.queue_worker --workers 4
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from ..logging_cfg import get_task_logger, setup_logging
+from ..tasks.job import QueuedTask
+from ..tasks.task_manager import TaskManager
+from .status import JobStatus
+from .worker_init import pool_context, run_task, settings_snapshot, warm_worker
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Renews one task's lease until stopped; ``lost`` is set once the lease
+    could not be renewed (expired and requeued, or cancelled).
+    """
+
+    def __init__(self, task: QueuedTask, worker_id: str):
+        super().__init__(name=f"lease-{task.task_id}", daemon=True)
+        self.task = task
+        self.worker_id = worker_id
+        self.stop = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(settings.TASK_QUEUE_HEARTBEAT_SEC):
+            try:
+                held = TaskManager.heartbeat(self.task.task_id, self.worker_id)
+            except Exception as e:
+                get_task_logger().warning(f"[QueueWorker] heartbeat of {self.task.task_id} failed: {e}")
+                continue   # the DB is busy: try again, the lease has slack
+            if not held:
+                self.lost.set()
+                return
+
+
+class QueueWorker:
+    """
+    One worker of the durable queue; runs the claimed tasks in this process.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.log = get_task_logger()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """
+        Finish the running task, then leave the loop.
+        """
+        self._stop.set()
+
+    def run(self, max_tasks: Optional[int] = None) -> int:
+        """
+        Claim and run tasks until stopped (or ``max_tasks`` are done);
+        returns how many ran.
+        """
+        self.log.info(f"[QueueWorker] {self.worker_id} started")
+        done = 0
+        while not self._stop.is_set() and (max_tasks is None or done < max_tasks):
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                # DB locked for longer than the busy timeout, disk full, ...
+                self.log.error(f"[QueueWorker] {self.worker_id}: {e}")
+                ran = False
+            if ran:
+                done += 1
+            else:
+                self._stop.wait(settings.TASK_QUEUE_POLL_SEC)
+        self.log.info(f"[QueueWorker] {self.worker_id} stopped after {done} task(s)")
+        return done
+
+    def run_once(self) -> bool:
+        """
+        Claim one task and run it; False if the queue was empty.
+        """
+        task = TaskManager.claim_task(self.worker_id)
+        if task is None:
+            return False
+
+        self.log.info(f"[QueueWorker] {self.worker_id} claimed {task.task_id} (attempt {task.attempts})")
+        heartbeat = _Heartbeat(task, self.worker_id)
+        heartbeat.start()
+        try:
+            result, error = self._execute(task)
+        finally:
+            heartbeat.stop.set()
+            heartbeat.join()
+
+        if heartbeat.lost.is_set():
+            self.log.warning(f"[QueueWorker] lease of {task.task_id} lost, result dropped")
+        elif error is None:
+            TaskManager.complete_task(task.task_id, self.worker_id, result)
+        else:
+            TaskManager.fail_task(task.task_id, self.worker_id, error)
+        return True
+
+    @staticmethod
+    def _execute(task: QueuedTask):
+        """
+        (result, None) or (None, error message).
+        """
+        from .worker_process import worker_entry   # the whole analysis stack: keep it lazy
+
+        try:
+            result, _ = run_task(worker_entry, (task.task_id, task.files, task.config))
+        except MemoryError:
+            return None, "MemoryError"   # retried; another worker may have more room
+        except Exception as e:
+            return None, f"{e}\n{traceback.format_exc()}"
+        if isinstance(result, dict) and result.get("status") == JobStatus.ERROR:
+            # worker_entry reports its own failures instead of raising
+            return None, result.get("message", "worker error")
+        return result, None
+
+
+# ---------------------------------------------------------
+# Service entry point
+# ---------------------------------------------------------
+def _serve(overrides: Dict[str, Any], max_tasks: Optional[int] = None):
+    warm_worker(overrides)
+    worker = QueueWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())   # Ctrl-C reaches the whole group
+    worker.run(max_tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run workers of the durable task queue.")
+    parser.add_argument("--workers", type=int, default=settings.MAX_WORKERS, help="worker processes")
+    parser.add_argument("--max-tasks", type=int, default=None, help="tasks per process before it is replaced by a fresh one")
+    args = parser.parse_args(argv)
+
+    setup_logging()   # the supervisor's own records; workers set up theirs in warm_worker
+    TaskManager.requeue_expired()   # leases of a previous run that died
+    ctx = pool_context()
+    stopping = threading.Event()
+
+    def spawn(n: int):
+        p = ctx.Process(target=_serve, args=(settings_snapshot(), args.max_tasks), name=f"queue-worker-{n}")
+        p.start()
+        return p
+
+    def stop(*_):
+        stopping.set()
+        for p in procs:
+            if p.is_alive():
+                p.terminate()   # SIGTERM: each worker finishes its task first
+
+    procs = [spawn(n) for n in range(max(1, args.workers))]
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # supervise: a worker that exited (--max-tasks done, OOM kill, crash)
+    # is replaced until shutdown; a dead worker's task comes back through
+    # the queue once its lease expires
+    while not stopping.is_set():
+        stopping.wait(1.0)
+        if stopping.is_set():
+            break
+        for n, p in enumerate(procs):
+            if not p.is_alive() and not stopping.is_set():
+                # exit code 0: done after --max-tasks, replaced by a fresh process
+                if p.exitcode != 0:
+                    get_task_logger().warning(f"[QueueWorker] {p.name} died ({p.exitcode}), restarting")
+                procs[n] = spawn(n)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
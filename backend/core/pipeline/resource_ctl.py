@@ -8,25 +8,33 @@ import os
 import gc
 import time
 
+from ..config import settings
 from ..logging_cfg import get_task_logger
 
 
 class ResourceGuard:
     """
     Monitor worker resource usage:
-      - RSS memory
+      - RSS memory: soft limit → on_limit_action, hard limit → MemoryError
+        (the pool requeues the task, see memory_budget.py)
       - CPU (optional)
     """
 
     def __init__(
         self,
         job_id: str,
-        max_rss_gb: float = 1.5,
+        max_rss_gb: float = None,
         check_interval_sec: float = 3.0,
         on_limit_action: str = "gc",
+        hard_rss_gb: float = None,
     ):
         self.job_id = job_id
+        if max_rss_gb is None:
+            max_rss_gb = settings.MEMORY_SOFT_LIMIT_MB / 1024
+        if hard_rss_gb is None:
+            hard_rss_gb = settings.MEMORY_HARD_LIMIT_MB / 1024
         self.max_rss = max_rss_gb * 1024**3
+        self.hard_rss = hard_rss_gb * 1024**3 if hard_rss_gb else None
         self.check_interval = check_interval_sec
         self.on_limit_action = on_limit_action
 
@@ -43,6 +51,14 @@ class ResourceGuard:
         self._last_check_time = now
         rss = self.process.memory_info().rss
 
+        if self.hard_rss and rss >= self.hard_rss:
+            self.log.error(
+                f"[ResourceGuard] RSS {rss/1e9:.2f} GB over the hard limit "
+                f"{self.hard_rss/1e9:.2f} GB"
+            )
+            gc.collect()
+            raise MemoryError("Worker exceeded hard memory limit")
+
         if rss < self.max_rss:
             return
 
@@ -0,0 +1,253 @@
+"""
+shm_transport.py
+----------------
+Shared-memory transport for parsed arrays between pool processes.
+
+A worker publishes the (time, values) arrays of a parsed member into named
+POSIX shared-memory segments and sends back only a BatchRef (segment names,
+shapes, dtypes, columns) — a few hundred bytes through the result queue
+instead of a pickled matrix or a parquet round trip. The task that consumes
+it maps the segments and aligns straight from zero-copy views.
+
+Lifetime
+    Segments outlive the task that created them (the multiprocessing
+    resource tracker is told to forget them, otherwise it would unlink
+    them when that worker is recycled) and belong to the job. Every
+    segment name carries a per-job prefix. The parent tracks the refs it
+    received in a ShmRegistry; WorkerPool releases a job's segments when
+    the job finishes or fails, sweeping the prefix as well, so segments
+    whose ref never made it back (a task that died mid-publish) go too.
+
+Space
+    Writing into a segment /dev/shm has no room for kills the process
+    with SIGBUS (Docker's default /dev/shm is 64 MB). shm_has_room() is
+    checked before every publish: a member that would leave less than
+    SHM_RESERVE_MB free is not published, and the parse task spills it
+    to the ingest cache instead.
+"""
+
+import hashlib
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from ..config import settings
+from ..logging_cfg import get_task_logger
+from ..parsers.common import RecordBatch
+
+
+SHM_PREFIX = "die"
+_SHM_DIR = Path("/dev/shm")      # Linux: lets a job's leftovers be swept by prefix
+_RELEASED_TTL_SEC = 3600         # late refs of a released job are expected within this
+
+
+# ---------------------------------------------------------
+# Descriptors
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class ArrayRef:
+    name: str                   # shared-memory segment name
+    shape: Tuple[int, ...]
+    dtype: str                  # numpy dtype string, e.g. "<f4"
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape, dtype=np.int64)) * np.dtype(self.dtype).itemsize
+
+
+@dataclass(frozen=True)
+class BatchRef:
+    time: ArrayRef
+    values: ArrayRef
+    columns: Tuple[str, ...]
+
+    @property
+    def names(self) -> List[str]:
+        return [self.time.name, self.values.name]
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + self.values.nbytes
+
+
+def job_prefix(job_id: str) -> str:
+    # segment names are short on some platforms: hash the job id
+    return f"{SHM_PREFIX}_{hashlib.sha1(job_id.encode()).hexdigest()[:12]}_"
+
+
+def _untrack(shm: SharedMemory):
+    # the job owns the segment, not this process
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------
+# Publish (worker side)
+# ---------------------------------------------------------
+def shm_has_room(nbytes: int) -> bool:
+    """
+    True if ``nbytes`` fit into /dev/shm with SHM_RESERVE_MB to spare
+    (always True where there is no /dev/shm to check).
+    """
+    if not _SHM_DIR.is_dir():
+        return True
+    free = shutil.disk_usage(_SHM_DIR).free
+    return free - nbytes >= settings.SHM_RESERVE_MB * 1024**2
+
+
+def publish_array(job_id: str, array: np.ndarray) -> ArrayRef:
+    array = np.ascontiguousarray(array)
+    name = job_prefix(job_id) + uuid.uuid4().hex[:16]
+    shm = SharedMemory(name=name, create=True, size=max(array.nbytes, 1))
+    _untrack(shm)
+    try:
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    except BaseException:
+        shm.close()
+        unlink([name])
+        raise
+    shm.close()
+    return ArrayRef(name, tuple(array.shape), array.dtype.str)
+
+
+def publish_batch(job_id: str, batch: RecordBatch) -> BatchRef:
+    time = publish_array(job_id, batch.time)
+    try:
+        values = publish_array(job_id, batch.values)
+    except BaseException:
+        unlink([time.name])
+        raise
+    return BatchRef(time, values, tuple(batch.columns))
+
+
+# ---------------------------------------------------------
+# Attach (consumer side)
+# ---------------------------------------------------------
+class SharedArrays:
+    """
+    Mappings opened by one task; use as a context manager. Views handed
+    out must be dropped before close() for the mappings to be released
+    right away — otherwise they go when the views are collected.
+    """
+
+    def __init__(self):
+        self._handles: List[SharedMemory] = []
+
+    def array(self, ref: ArrayRef) -> np.ndarray:
+        shm = SharedMemory(name=ref.name)
+        _untrack(shm)
+        self._handles.append(shm)
+        return np.ndarray(ref.shape, np.dtype(ref.dtype), buffer=shm.buf)
+
+    def batch(self, ref: BatchRef) -> RecordBatch:
+        return RecordBatch(time=self.array(ref.time), values=self.array(ref.values), columns=list(ref.columns))
+
+    def close(self):
+        handles, self._handles = self._handles, []
+        for shm in handles:
+            try:
+                shm.close()
+            except BufferError:
+                pass   # a view is still alive; unmapped once it is collected
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------
+# Cleanup (parent side)
+# ---------------------------------------------------------
+def unlink(names: Iterable[str]) -> int:
+    n = 0
+    for name in names:
+        try:
+            shm = SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        # opening registered it with the tracker, unlink() unregisters it
+        shm.close()
+        try:
+            shm.unlink()
+            n += 1
+        except FileNotFoundError:
+            pass
+    return n
+
+
+def sweep(job_id: str) -> int:
+    """
+    Unlink every segment left with the job's prefix (Linux only).
+    """
+    if not _SHM_DIR.is_dir():
+        return 0
+    return unlink(p.name for p in _SHM_DIR.glob(job_prefix(job_id) + "*"))
+
+
+class ShmRegistry:
+    """
+    Segments per job, as seen by the parent. Refs tracked after the job
+    was released (results of tasks still running when it failed) are
+    unlinked immediately; released job ids are forgotten after
+    _RELEASED_TTL_SEC.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: Dict[str, Set[str]] = {}
+        self._released: Dict[str, float] = {}     # job id → when it was released
+        self.log = get_task_logger()
+
+    def track(self, job_id: str, refs: Iterable[BatchRef]):
+        names = [n for ref in refs if ref is not None for n in ref.names]
+        with self._lock:
+            if job_id not in self._released:
+                self._names.setdefault(job_id, set()).update(names)
+                return
+        unlink(names)
+
+    def release(self, job_id: str, refs: Iterable[BatchRef]):
+        """
+        Unlink some of a job's segments early (e.g. once their rack is done).
+        """
+        names = {n for ref in refs if ref is not None for n in ref.names}
+        with self._lock:
+            self._names.get(job_id, set()).difference_update(names)
+        unlink(names)
+
+    def release_job(self, job_id: str):
+        now = time.monotonic()
+        with self._lock:
+            names = self._names.pop(job_id, set())
+            self._released.pop(job_id, None)
+            self._released[job_id] = now
+            # dicts keep insertion order: the oldest releases come first
+            for old, when in list(self._released.items()):
+                if now - when < _RELEASED_TTL_SEC:
+                    break
+                del self._released[old]
+        n = unlink(names) + sweep(job_id)
+        if n:
+            self.log.info(f"[shm] {job_id}: released {n} segment(s)")
+
+    def release_all(self):
+        with self._lock:
+            job_ids = list(self._names)
+        for job_id in job_ids:
+            self.release_job(job_id)
+
+    def segments(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._names.values())
@@ -0,0 +1,148 @@
+"""
+worker_init.py
+--------------
+Warm, persistent worker processes for WorkerPool.
+
+    forkserver    the server process imports the heavy modules once
+                  (NumPy, Polars, psutil, loguru, the whole worker /
+                  analysis stack incl. the SQLite stores); every worker
+                  is forked from it already warm, also after recycling
+    warm_worker   pool initializer: applies the parent's settings, sets up
+                  the log sinks (core.log, structured.jsonl), loads the
+                  analysis plugins and builds the channel topology
+                  (HierarchyBuilder → ChannelLayout, lru-cached)
+    run_task      wraps every pool task: announces it on the pool's
+                  events queue (which worker runs which task, so the
+                  parent can fail the tasks of a worker that died),
+                  publishes the worker's RSS there while the task grows,
+                  and returns its RSS (post-warm baseline, sampled peak,
+                  after), so the parent can learn task footprints, hold
+                  back work while a task outgrows its estimate and
+                  recycle the pool when workers grow
+
+Workers are reused across jobs; WORKER_MAX_TASKS bounds how many tasks a
+process runs before it is replaced. Forking from a clean server instead
+of the (threaded) parent also keeps Polars' thread pool out of the
+children.
+"""
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import psutil
+
+from ..config import settings
+from ..logging_cfg import get_task_logger, setup_logging
+from .memory_budget import TaskMemory
+
+
+PRELOAD_MODULES = [
+    "numpy",
+    "polars",
+    "psutil",
+    "loguru",
+    f"{__package__}.worker_process",
+]
+
+_PROCESS = None
+_BASELINE = 0            # worker RSS once warm: what a task's footprint is counted from
+_EVENTS = None           # WorkerPool's SimpleQueue: ("start", token, pid) / ("rss", token, pid, rss, footprint)
+_SAMPLE_SEC = 0.1
+_REPORT_SEC = 0.5        # live RSS: at most one event per this interval ...
+_REPORT_MB = 16          # ... and only after the RSS grew by this much
+
+
+def pool_context():
+    """
+    Multiprocessing context for WORKER_START_METHOD, with the forkserver
+    preload set; falls back to the platform default where unavailable.
+    """
+    method = settings.WORKER_START_METHOD
+    if method not in mp.get_all_start_methods():
+        return mp.get_context()
+    ctx = mp.get_context(method)
+    if method == "forkserver" and settings.WORKER_PRELOAD:
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+    return ctx
+
+
+def settings_snapshot() -> Dict[str, Any]:
+    # settings changed at runtime in the parent are not seen by a
+    # forkserver / spawn child, which imports config afresh
+    return settings.model_dump()
+
+
+def warm_worker(overrides: Dict[str, Any], events=None):
+    """
+    Pool initializer, once per worker process.
+    """
+    global _PROCESS, _BASELINE, _EVENTS
+    _EVENTS = events
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    # a forkserver / spawn child starts with loguru's default stderr sink
+    # only; after the overrides, so LOG_DIR is the parent's
+    setup_logging()
+
+    from ..aligner.timeline_aligner import channel_layout_for
+    from ..analysis.registry import load_plugins
+    from . import worker_process  # noqa: F401
+
+    load_plugins()
+    channel_layout_for(settings)
+    _PROCESS = psutil.Process(os.getpid())
+    _BASELINE = _PROCESS.memory_info().rss
+    get_task_logger().debug(f"worker {os.getpid()} warm ({_BASELINE / 1e6:.0f} MB)")
+
+
+class _PeakSampler(threading.Thread):
+    """
+    Peak RSS of the running task; growth is published on the events queue
+    as it happens, not only once the task returns.
+    """
+
+    def __init__(self, process: psutil.Process, token: Optional[int]):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.process = process
+        self.token = token
+        self.peak = process.memory_info().rss
+        self.stop = threading.Event()
+
+    def run(self):
+        reported, last = self.peak, time.monotonic()
+        while not self.stop.wait(_SAMPLE_SEC):
+            rss = self.process.memory_info().rss
+            self.peak = max(self.peak, rss)
+            now = time.monotonic()
+            if rss - reported >= _REPORT_MB * 1024**2 and now - last >= _REPORT_SEC:
+                self._publish(rss)
+                reported, last = rss, now
+
+    def _publish(self, rss: int):
+        if _EVENTS is not None and self.token is not None:
+            _EVENTS.put(("rss", self.token, os.getpid(), rss, max(0, rss - _BASELINE)))
+
+
+def run_task(fn: Callable, args: tuple, token: Optional[int] = None) -> Tuple[Any, TaskMemory]:
+    """
+    (fn(*args), this worker's memory around the task).
+    """
+    if _EVENTS is not None and token is not None:
+        # synchronous pipe write: there even if the task kills the process
+        _EVENTS.put(("start", token, os.getpid()))
+    if _PROCESS is None:
+        return fn(*args), TaskMemory()
+
+    sampler = _PeakSampler(_PROCESS, token)
+    before = sampler.peak
+    sampler.start()
+    try:
+        value = fn(*args)
+    finally:
+        sampler.stop.set()
+        sampler.join()
+    rss = _PROCESS.memory_info().rss
+    return value, TaskMemory(rss_before=before, peak=max(sampler.peak, rss), rss=rss, baseline=_BASELINE)
@@ -1,17 +1,29 @@
+import itertools
 import multiprocessing as mp
 from multiprocessing.pool import Pool
+from collections import deque
+from functools import partial
+import queue
+import threading
 import time
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Any
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
 
+from ..config import settings
 from ..logging_cfg import get_task_logger
+from .job_graph import JobGraph
+from .memory_budget import MemoryBudget
+from .shm_transport import ShmRegistry
+from .worker_init import pool_context, run_task, settings_snapshot, warm_worker
 from .status import JobStatus    # ⭐ FIX：从 status.py 引入
 
+_LOST_GRACE_SEC = 2.0       # a task whose worker is gone is failed after this
+
 # ⭐ FIX：延迟 import，避免 circular import
 # from .worker_process import worker_entry
 def _load_worker_entry():
-    from .worker_process import worker_entry
-    return worker_entry
+    from .worker_process import archive_bytes, worker_entry
+    return worker_entry, archive_bytes
 
 
 @dataclass
@@ -27,54 +39,560 @@ class JobRecord:
     end_time: Optional[float] = None
 
 
+class WorkerLost(RuntimeError):
+    """
+    The worker process running a task died (signal, SIGBUS, OOM kill):
+    the pool never returns its result.
+    """
+
+
+@dataclass
+class TaskResult:
+    tag: Any                    # caller's label (job id, work unit, ...)
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _WorkItem:
+    fn: Optional[Callable] = None
+    args: tuple = ()
+    callback: Optional[Callable] = None         # continuation (job graph)
+    error_callback: Optional[Callable] = None
+    tag: Any = None
+    channel: Optional[queue.Queue] = None       # where a plain task's TaskResult goes
+    job: Optional[JobRecord] = None             # admitted job, launched by the feeder
+    input_bytes: int = 0                        # uncompressed member bytes the task reads
+    estimate: int = 0                           # memory reserved while it runs
+    retries: int = 0
+    exclusive: bool = False                     # runs alone (requeued after MemoryError)
+    token: int = 0                              # id of the current run, reported by the worker
+
+    @property
+    def kind(self) -> str:
+        return getattr(self.fn, "__name__", "task")
+
+
 class WorkerPool:
-    """Manages multiprocessing pool"""
+    """
+    Manages multiprocessing pool
+
+    Work flows producer → bounded backlog → feeder thread → mp pool:
+
+        submit() / submit_job()   block (or return False) while the
+                                  backlog holds WORKER_QUEUE_SIZE items
+        follow-up tasks           tasks of already admitted jobs (job
+                                  graph stages); never block, run first
+        feeder                    keeps at most WORKER_INFLIGHT_PER_WORKER
+                                  tasks per process inside the pool, so
+                                  pickled arguments never pile up there
+        results channel           TaskResults, drained with results() /
+                                  poll_results()
+
+    Shared-memory segments published by a job's tasks (shm_transport.py)
+    are tracked in ``self.shm`` and released when the job finishes or
+    fails, and on shutdown.
 
-    def __init__(self, max_workers: int = None):
+    Workers are warm and persistent (worker_init.py): forked from a
+    preloaded forkserver, reused across jobs, replaced after
+    WORKER_MAX_TASKS tasks; once a worker reports an RSS above
+    WORKER_RECYCLE_RSS_MB the feeder lets the running tasks finish and
+    swaps the whole pool for a fresh one.
+
+    Memory admission (memory_budget.py): a task is handed to the pool only
+    while its estimated footprint fits next to those already running;
+    otherwise it waits at the head of its queue. A running task that
+    outgrows its estimate (workers publish their RSS as it grows) has its
+    reservation raised at once. Tasks failing with MemoryError are
+    requeued once, to run alone.
+
+    Dead workers: multiprocessing.Pool replaces a worker that dies, but
+    the task it was running never returns. Workers announce each task
+    they start on an events queue; a monitor thread fails the task
+    (WorkerLost → its job's error path) of any worker that exits with a
+    non-zero code, so the job does not hang.
+    """
+
+    def __init__(self, max_workers: int = None, queue_size: int = None):
         self.log = get_task_logger()
         self.max_workers = max_workers or max(1, mp.cpu_count() - 1)
+        self.queue_size = queue_size or settings.WORKER_QUEUE_SIZE
+        self.max_in_flight = self.max_workers * max(1, settings.WORKER_INFLIGHT_PER_WORKER)
         self.pool: Optional[Pool] = None
-        self.jobs: Dict[str, JobRecord] = {}
+        self.jobs: Dict[str, JobRecord] = {}         # queued / running; dropped once finished
+        self.shm = ShmRegistry()
+
+        self._cv = threading.Condition()
+        self._backlog: Deque[_WorkItem] = deque()
+        self._followups: Deque[_WorkItem] = deque()
+        self._in_flight = 0
+        self._active_jobs = 0
+        self._results: queue.Queue = queue.Queue()
+        self._feeder: Optional[threading.Thread] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._events = None                          # SimpleQueue: workers announce their tasks
+        self._tokens = itertools.count(1)
+        self._running: Dict[int, _WorkItem] = {}     # token → task handed to the pool
+        self._task_pid: Dict[int, int] = {}          # token → worker pid, once started
+        self._procs: Dict[int, Any] = {}             # pid → worker Process, seen alive
+        self._exit_codes: Dict[int, int] = {}        # pid → exit code of workers seen exiting
+        self._gone: Dict[int, float] = {}            # token → when its worker was first missed
+        self._stopped = False
+        self._recycle = False
+        self.recycled = 0
+        self.budget = MemoryBudget()
+        self._exclusive = False
+
+    def _new_pool(self) -> Pool:
+        ctx = pool_context()
+        if self._events is None:
+            self._events = ctx.SimpleQueue()
+        pool = ctx.Pool(
+            self.max_workers,
+            initializer=warm_worker,
+            initargs=(settings_snapshot(), self._events),
+            maxtasksperchild=settings.WORKER_MAX_TASKS or None,
+        )
+        self.log.info(f"WorkerPool created with {self.max_workers} workers ({ctx.get_start_method()})")
+        return pool
+
+    def start(self):
+        """
+        Create the pool (and its warm workers) now instead of on the
+        first submit, e.g. at server startup.
+        """
+        self._ensure_pool()
 
     def _ensure_pool(self):
-        if self.pool is None:
-            self.pool = mp.Pool(self.max_workers)
-            self.log.info(f"WorkerPool created with {self.max_workers} workers")
+        with self._cv:
+            if self.pool is None:
+                self.pool = self._new_pool()
+        if self._feeder is None:
+            self._stopped = False
+            self._feeder = threading.Thread(target=self._feed, name="worker-pool-feeder", daemon=True)
+            self._feeder.start()
+            self._monitor = threading.Thread(target=self._watch, name="worker-pool-monitor", daemon=True)
+            self._monitor.start()
 
-    def submit_job(self, job: JobRecord):
+    # ------------------------------------------------------------
+    # Admission (bounded)
+    # ------------------------------------------------------------
+    def _admit(self, item: _WorkItem, block: bool, timeout: Optional[float]) -> bool:
         self._ensure_pool()
+        with self._cv:
+            if len(self._backlog) >= self.queue_size:
+                if not block:
+                    return False
+                if not self._cv.wait_for(lambda: len(self._backlog) < self.queue_size, timeout):
+                    return False
+            self._backlog.append(item)
+            self._cv.notify_all()
+        return True
+
+    def submit(
+        self,
+        fn: Callable,
+        args: tuple = (),
+        tag: Any = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        results: Optional[queue.Queue] = None,
+    ) -> bool:
+        """
+        Queue one task; its TaskResult goes to ``results`` (default: the
+        pool's channel). Returns False if the backlog stayed full
+        (block=False, or ``timeout`` expired) — the caller defers.
+        """
+        return self._admit(_WorkItem(fn=fn, args=args, tag=tag, channel=results or self._results), block, timeout)
+
+    def submit_job(
+        self,
+        job: JobRecord,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        results: Optional[queue.Queue] = None,
+    ) -> bool:
+        """
+        Queue a whole job; it is launched (fan-out graph or one
+        worker_entry) when the feeder reaches it, and reports one
+        TaskResult(tag=job_id) when it is finished.
+        """
+        job.status = JobStatus.QUEUED
         self.jobs[job.job_id] = job
+        item = _WorkItem(job=job, tag=job.job_id, channel=results or self._results)
+        if not self._admit(item, block, timeout):
+            return False
+        self.log.info(f"Job queued: {job.job_id}")
+        return True
+
+    def followup(
+        self,
+        fn: Callable,
+        args: tuple,
+        callback: Callable,
+        error_callback: Callable,
+        input_bytes: int = 0,
+    ):
+        """
+        Task of an already running job (called from pool callbacks):
+        queued ahead of new work and never blocks. ``input_bytes`` sizes
+        its memory estimate.
+        """
+        item = _WorkItem(fn=fn, args=args, callback=callback, error_callback=error_callback, input_bytes=input_bytes)
+        with self._cv:
+            self._followups.append(item)
+            self._cv.notify_all()
+
+    def open_channel(self) -> queue.Queue:
+        """
+        Private results channel, e.g. one per dispatcher task.
+        """
+        return queue.Queue()
+
+    # ------------------------------------------------------------
+    # Feeder: backlog → pool, at most max_in_flight tasks inside it
+    # ------------------------------------------------------------
+    def _next_queue(self) -> Optional[Deque[_WorkItem]]:
+        # under _cv: the queue whose head may start now, if any
+        if self._recycle or self._exclusive or self._in_flight >= self.max_in_flight:
+            return None
+        q = self._followups or self._backlog
+        if not q:
+            return None
+        item = q[0]
+        if item.job is not None:
+            return q
+        if item.exclusive and self._in_flight:
+            return None
+        if not item.estimate:
+            item.estimate = self.budget.estimate(item.kind, item.input_bytes)
+        return q if self.budget.fits(item.estimate, self._in_flight) else None
+
+    def _feed(self):
+        while True:
+            with self._cv:
+                # host memory is re-checked periodically, not only on events
+                while not (self._stopped or (self._recycle and not self._in_flight) or self._next_queue()):
+                    self._cv.wait(0.5)
+                if self._stopped:
+                    return
+                item = None
+                if not self._recycle:
+                    item = self._next_queue().popleft()
+                    if item.job is None:
+                        self._in_flight += 1
+                        self._exclusive = item.exclusive
+                        self.budget.reserve(item.estimate)
+                    else:
+                        self._active_jobs += 1
+                    self._cv.notify_all()   # wakes producers waiting for backlog room
+
+            if item is None:
+                self._recycle_pool()
+                continue
+
+            try:
+                if item.job is not None:
+                    self._launch(item)
+                else:
+                    item.token = next(self._tokens)
+                    with self._cv:
+                        self._running[item.token] = item
+                    self.pool.apply_async(
+                        run_task,
+                        args=(item.fn, item.args, item.token),
+                        callback=partial(self._task_done, item),
+                        error_callback=partial(self._task_error, item),
+                    )
+            except Exception as e:
+                self.log.error(f"WorkerPool: failed to start {item.tag or item.fn}: {e}")
+                if item.job is not None:
+                    self._job_error(item.job.job_id, e)
+                else:
+                    self._task_error(item, e)
+
+    # ------------------------------------------------------------
+    # Monitor: worker events (task started, RSS while it runs), tasks
+    # of workers that died
+    # ------------------------------------------------------------
+    def _watch(self):
+        while not self._stopped:
+            time.sleep(0.5)
+            try:
+                self._check_workers()
+            except Exception as e:
+                self.log.error(f"WorkerPool: worker check failed: {e}")
+
+    def _check_workers(self):
+        events, pool = self._events, self.pool
+        if events is None or pool is None:
+            return
+        limit = settings.WORKER_RECYCLE_RSS_MB * 1024**2
+        while not events.empty():
+            kind, token, pid, *sample = events.get()
+            with self._cv:
+                item = self._running.get(token)
+                if item is None:
+                    continue
+                if kind == "start":
+                    self._task_pid[token] = pid
+                elif kind == "rss":
+                    rss, footprint = sample
+                    item.estimate = self.budget.grow(item.estimate, footprint)
+                    if limit and rss > limit and not self._recycle:
+                        self.log.warning(f"WorkerPool: worker RSS {rss / 1e6:.0f} MB, recycling the pool")
+                        self._recycle = True
+        for proc in list(getattr(pool, "_pool", ())):
+            self._procs.setdefault(proc.pid, proc)
+        alive = {pid for pid, proc in self._procs.items() if proc.exitcode is None}
+        codes = {pid: proc.exitcode for pid, proc in self._procs.items() if proc.exitcode is not None}
+        for pid in codes:
+            del self._procs[pid]
+            self._exit_codes[pid] = codes[pid]
+
+        now = time.monotonic()
+        lost = []
+        with self._cv:
+            for token, pid in list(self._task_pid.items()):
+                if pid in alive:
+                    continue
+                code = self._exit_codes.get(pid)
+                # a worker reaped before it was seen, or one that exited
+                # cleanly: its result may still be on its way, give it a moment
+                if code in (None, 0) and now - self._gone.setdefault(token, now) < _LOST_GRACE_SEC:
+                    continue
+                item = self._running.pop(token, None)
+                self._task_pid.pop(token, None)
+                self._gone.pop(token, None)
+                if item is not None:
+                    lost.append((item, pid, code))
+            running_pids = set(self._task_pid.values())
+        for pid in [pid for pid in self._exit_codes if pid not in running_pids]:
+            del self._exit_codes[pid]
+        if self._stopped:
+            return
+        for item, pid, code in lost:
+            how = "died" if code is None else f"died (exit code {code})"
+            err = WorkerLost(f"worker {pid} {how} while running {item.kind}")
+            self.log.error(f"WorkerPool: {err}")
+            self._settle_error(item, err)
+
+    def _recycle_pool(self):
+        # feeder thread, nothing in flight. Not under _cv: join() waits for
+        # the pool's result thread, whose last callbacks may still need it
+        self.pool.close()
+        self.pool.join()
+        pool = self._new_pool()
+        with self._cv:
+            self.pool = pool
+            self._recycle = False
+            self.recycled += 1
+            self._cv.notify_all()
+
+    def _claim(self, item: _WorkItem) -> bool:
+        # under _cv: False if the task was settled already (failed as lost)
+        self._task_pid.pop(item.token, None)
+        self._gone.pop(item.token, None)
+        return self._running.pop(item.token, None) is not None
+
+    def _finish_task(self, item: _WorkItem):
+        # under _cv
+        self._in_flight -= 1
+        self._exclusive = False
+        self.budget.release(item.estimate)
+        self._cv.notify_all()
+
+    def _task_done(self, item: _WorkItem, result):
+        result, mem = result
+        limit = settings.WORKER_RECYCLE_RSS_MB * 1024**2
+        with self._cv:
+            if not self._claim(item):
+                return   # its worker was taken for dead: the job has failed already
+            self._finish_task(item)
+            if limit and mem.rss > limit and not self._recycle:
+                self.log.warning(f"WorkerPool: worker RSS {mem.rss / 1e6:.0f} MB, recycling the pool")
+                self._recycle = True
+        self.budget.model.observe(item.kind, item.input_bytes, mem)
+        if item.callback is not None:
+            item.callback(result)
+        else:
+            item.channel.put(TaskResult(item.tag, True, result))
+
+    def _task_error(self, item: _WorkItem, err: Exception):
+        with self._cv:
+            if not self._claim(item):
+                return
+        self._settle_error(item, err)
+
+    def _settle_error(self, item: _WorkItem, err: Exception):
+        with self._cv:
+            self._finish_task(item)
+            if isinstance(err, MemoryError) and item.retries < 1 and not self._stopped:
+                # over budget in the worker: once more, alone
+                self.log.warning(f"WorkerPool: {item.kind} ran out of memory, requeued to run alone")
+                item.retries += 1
+                item.exclusive = True
+                self._followups.appendleft(item)
+                return
+        if item.error_callback is not None:
+            item.error_callback(err)
+        else:
+            item.channel.put(TaskResult(item.tag, False, error=str(err)))
+
+    # ------------------------------------------------------------
+    # Results channel
+    # ------------------------------------------------------------
+    def results(self, expected: Optional[int] = None, timeout: Optional[float] = None,
+                channel: Optional[queue.Queue] = None) -> Iterator[TaskResult]:
+        """
+        Yield TaskResults as they arrive: ``expected`` of them, or (None)
+        until the pool has nothing queued or running. ``timeout`` bounds
+        the wait for each result.
+        """
+        channel = channel or self._results
+        received = 0
+        while expected is None or received < expected:
+            try:
+                res = channel.get(timeout=0.2 if expected is None else timeout)
+            except queue.Empty:
+                if expected is None and self.idle() and channel.empty():
+                    return
+                if expected is not None:
+                    raise TimeoutError(f"WorkerPool: no result within {timeout}s")
+                continue
+            received += 1
+            yield res
+
+    def poll_results(self, channel: Optional[queue.Queue] = None) -> Iterator[TaskResult]:
+        """
+        Results that are already there, without waiting.
+        """
+        channel = channel or self._results
+        while True:
+            try:
+                yield channel.get_nowait()
+            except queue.Empty:
+                return
+
+    def idle(self) -> bool:
+        with self._cv:
+            return not (self._backlog or self._followups or self._in_flight or self._active_jobs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cv:
+            return {
+                "backlog": len(self._backlog),
+                "followups": len(self._followups),
+                "in_flight": self._in_flight,
+                "active_jobs": self._active_jobs,
+                "shm_segments": self.shm.segments(),
+                "recycled": self.recycled,
+                **self.budget.stats(),
+            }
+
+    # ------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------
+    def _launch(self, item: _WorkItem):
+        job = item.job
         job.status = JobStatus.RUNNING
+        job.start_time = time.time()
+        on_done = partial(self._job_success, job.job_id, channel=item.channel)
+        on_error = partial(self._job_error, job.job_id, channel=item.channel)
 
-        worker_entry = _load_worker_entry()   # ⭐ FIX：避免循环 import
+        # fan-out: index / parse / per-rack align+analyze / bank merge over all workers
+        if self._fan_out(job):
+            run_alone = partial(self._run_entry, job, on_done, on_error, 0)
+            JobGraph(self, job.job_id, job.config, job.files,
+                     on_done=on_done, on_error=on_error, on_empty=run_alone).start()
+            self.log.info(f"Job started: {job.job_id} ({len(job.files)} archive(s), fan-out)")
+            return
 
-        self.pool.apply_async(
-            worker_entry,
-            args=(job.job_id, job.files, job.config),
-            callback=lambda res: self._job_success(job.job_id, res),
-            error_callback=lambda err: self._job_error(job.job_id, err),
-        )
-        self.log.info(f"Job submitted: {job.job_id}")
+        self._run_entry(job, on_done, on_error)
+        self.log.info(f"Job started: {job.job_id}")
 
-    def _job_success(self, job_id: str, result: dict):
+    def _run_entry(self, job: JobRecord, on_done, on_error, input_bytes: Optional[int] = None):
+        worker_entry, archive_bytes = _load_worker_entry()   # ⭐ FIX：避免循环 import
+
+        if input_bytes is None:
+            # sized by its members, whose index (on a cold archive: a full
+            # inflate) is read in the pool, not on the feeder thread
+            sized = partial(self._run_entry, job, on_done, on_error)
+            self.followup(archive_bytes, (job.files,), sized, on_error)
+            return
+        self.followup(worker_entry, (job.job_id, job.files, job.config), on_done, on_error, input_bytes=input_bytes)
+
+    @staticmethod
+    def _fan_out(job: JobRecord) -> bool:
+        config = job.config or {}
+        if config.get("ALIGN_WINDOW_SEC", settings.ALIGN_WINDOW_SEC) > 0:
+            return False   # streamed jobs keep one sequential worker
+        return config.get("JOB_FANOUT", settings.JOB_FANOUT)
+
+    def _job_success(self, job_id: str, result: dict, channel: Optional[queue.Queue] = None):
         job = self.jobs[job_id]
+        if isinstance(result, dict) and result.get("status") == JobStatus.ERROR:
+            # worker_entry reports its own failures instead of raising
+            return self._job_error(job_id, RuntimeError(result.get("message", "worker error")), channel)
+
         job.status = JobStatus.FINISHED
         job.end_time = time.time()
         job.progress = {"done": True}
         job.message = "Completed"
+        self._job_finished(job, TaskResult(job_id, True, result), channel)
 
-    def _job_error(self, job_id: str, err: Exception):
+    def _job_error(self, job_id: str, err: Exception, channel: Optional[queue.Queue] = None):
         job = self.jobs[job_id]
         job.status = JobStatus.ERROR
         job.end_time = time.time()
         job.message = str(err)
         job.errors.append(str(err))
+        self._job_finished(job, TaskResult(job_id, False, error=str(err)), channel)
+
+    def _job_finished(self, job: JobRecord, result: TaskResult, channel: Optional[queue.Queue]):
+        self.shm.release_job(job.job_id)
+        self.jobs.pop(job.job_id, None)   # the result carries what is left of it
+        with self._cv:
+            self._active_jobs -= 1
+            self._cv.notify_all()
+        (channel or self._results).put(result)
 
     def get_job(self, job_id: str):
         return self.jobs.get(job_id)
 
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Drop a job that is still waiting in the backlog. A job already
+        launched runs to completion; returns False for those.
+        """
+        with self._cv:
+            item = next((i for i in self._backlog if i.job is not None and i.job.job_id == job_id), None)
+            if item is None:
+                return False
+            self._backlog.remove(item)
+            self.jobs.pop(job_id, None)
+            self._cv.notify_all()
+        item.job.status = JobStatus.CANCELLED
+        item.job.end_time = time.time()
+        item.job.message = "Cancelled"
+        self.log.info(f"Job cancelled: {job_id}")
+        return True
+
     def shutdown(self):
+        with self._cv:
+            self._stopped = True
+            self._backlog.clear()
+            self._followups.clear()
+            self._cv.notify_all()
+        if self._feeder is not None:
+            self._feeder.join(timeout=1)
+            self._feeder = None
+        if self._monitor is not None:
+            self._monitor.join(timeout=1)
+            self._monitor = None
         if self.pool:
             self.pool.terminate()
             self.pool.join()
             self.pool = None
+        self.shm.release_all()
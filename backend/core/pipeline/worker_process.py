@@ -2,37 +2,80 @@
 Worker side process: runs inside multiprocessing worker
 """
 
-import tarfile
-import io
 from pathlib import Path
+import shutil
 import time
 import traceback
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
 
+import numpy as np
+
+from ..config import settings
 from ..logging_cfg import get_task_logger
+from .checkpoints import JobCheckpoints, StageCache, cache_enabled, rack_align_key
 from .resource_ctl import ResourceGuard
+from .shm_transport import BatchRef, SharedArrays, publish_batch, shm_has_room
+from ..ingest import gzip_index
+from ..ingest.member_index import (
+    ArchiveIndex, MemberEntry, get_member_index, split_member_groups, split_member_ranges,
+)
+from ..ingest.tar_stream import iter_indexed_members
 
 # Parsers
 from ..parsers.summary_parser import parse_summary_csv
 from ..parsers.batvol_parser import parse_batvol_csv
 from ..parsers.battemp_parser import parse_battemp_csv
 
+from ..parsers.common import RecordBatch
+from ..parsers.columnar import column_views
+from ..aligner.interpolation import values_matrix
+
 # Aligner
-from ..aligner.timeline_aligner import align_day_data
+from ..aligner.timeline_aligner import (
+    AlignPlan,
+    _CHANNEL_KEYS,
+    align_day_data,
+    align_planned,
+    cfg_value,
+    channel_matrix,
+    describe_source,
+)
+from ..aligner.streaming_aligner import StreamingAligner, StreamSource
 
 # Analysis
 from ..analysis.compute_features import compute_battery_features
 
 # Result storage
 from ..storage.result_store import ResultStore
+from ..storage.ingest_cache import IngestCache
+from ..storage.checkpoint_store import CacheStats
 
 # Job status enum
 from .status import JobStatus
+from ..tasks.job import JobStage
+
+
+_PARSERS = {
+    "summary": parse_summary_csv,
+    "batvol": parse_batvol_csv,
+    "battemp": parse_battemp_csv,
+}
 
 
-def worker_entry(job_id: str, files: List[str], config: Dict[str, Any]):
+def worker_entry(
+    job_id: str,
+    files: List[str],
+    config: Dict[str, Any],
+    day_raw: Optional[Dict[str, Any]] = None,
+):
     """
     Worker 子进程的实际执行入口
+
+    day_raw: already-ingested data; the ingest phase is skipped when given.
+
+    Every stage goes through the stage cache (checkpoints.py): a retried
+    job resumes after its last completed stage, and outputs another job
+    already made from the same inputs are reused.
     """
     log = get_task_logger(job_id)
     t0 = time.time()
@@ -41,65 +84,67 @@ def worker_entry(job_id: str, files: List[str], config: Dict[str, Any]):
     guard = ResourceGuard(job_id)
     log.info(f"[Worker] Start job {job_id}")
 
-    # 存储原始数据
-    day_raw = {"summary": {}, "rack": {}}
-
     try:
-        # =========================
-        # INGEST PHASE
-        # =========================
-        for tar_path in files:
-            tar_path = Path(tar_path)
-
-            if not tar_path.exists():
-                log.warning(f"Missing file {tar_path}")
-                continue
-
-            with tarfile.open(tar_path, "r:gz") as tf:
-                for member in tf.getmembers():
-                    if not member.isfile():
+        # long jobs: windowed alignment, blocks go to storage as they are made
+        if day_raw is None and cfg_value(config, "ALIGN_WINDOW_SEC", settings.ALIGN_WINDOW_SEC) > 0:
+            return _run_streaming(job_id, files, config, guard, t0)
+
+        ckpt = JobCheckpoints(job_id, files, config, enabled=day_raw is None)
+        if ckpt.exported():
+            return _finished(job_id, t0, ckpt)
+
+        aligned = ckpt.load_aligned()
+        if aligned is None:
+            # =========================
+            # INGEST PHASE
+            # =========================
+            if day_raw is None:
+                # 存储原始数据
+                day_raw = {"summary": {}, "rack": {}}
+                cache = ckpt.ingest_cache()
+
+                for tar_path in files:
+                    tar_path = Path(tar_path)
+
+                    if not tar_path.exists():
+                        log.warning(f"Missing file {tar_path}")
                         continue
 
-                    name = member.name.lower()
-                    raw_bytes = tf.extractfile(member).read()
-
-                    if "summary" in name:
-                        data = parse_summary_csv(io.BytesIO(raw_bytes))
-                        _merge_summary(day_raw, data, name)
-
-                    elif "batvol" in name:
-                        data = parse_batvol_csv(io.BytesIO(raw_bytes))
-                        _merge_batvol(day_raw, data, name)
-
-                    elif "battemp" in name:
-                        data = parse_battemp_csv(io.BytesIO(raw_bytes))
-                        _merge_battemp(day_raw, data, name)
-
-                    guard.check_rss()  # 内存监控
-
-        # =========================
-        # ALIGN PHASE
-        # =========================
-        aligned = align_day_data(day_raw, config)
-        guard.check_rss()
+                    # member list from the sidecar index: no getmembers() scan;
+                    # cached members are read from parquet, the rest streamed
+                    # into their parsers in bounded chunks
+                    index = get_member_index(tar_path)
+
+                    for entry, data in _ingest_archive(
+                        tar_path, index, on_chunk=guard.check_rss, cache=cache, stats=ckpt.stats,  # 内存监控
+                    ):
+                        merge_member(day_raw, entry, data)
+                ckpt.ingest_done()
+
+            # =========================
+            # ALIGN PHASE
+            # =========================
+            aligned = align_day_data(day_raw, config)
+            del day_raw   # raw columns are no longer needed; only the DayFrame is kept
+            guard.check_rss()
+            ckpt.save_aligned(aligned)   # the job's aligned tables
 
         # =========================
         # ANALYSIS PHASE
         # =========================
-        features = compute_battery_features(aligned, config)
+        features = ckpt.job_features(aligned)   # cached plugins are not rerun
 
         # =========================
         # SAVE PHASE
         # =========================
-        store = ResultStore()
-        store.save_job_result(job_id, aligned, features)
+        store = ResultStore(settings.RESULT_DIR)
+        store.save_analysis(job_id, features, aligned.rack_ids, aligned.n_modules, aligned.time)
+        ckpt.export_done()
 
-        return {
-            "job_id": job_id,
-            "status": JobStatus.FINISHED,
-            "duration": round(time.time() - t0, 2)
-        }
+        return _finished(job_id, t0, ckpt)
 
+    except MemoryError:
+        raise   # the pool requeues the job to run alone
     except Exception as e:
         log.error(f"Worker error: {e}\n{traceback.format_exc()}")
         return {
@@ -110,36 +155,455 @@ def worker_entry(job_id: str, files: List[str], config: Dict[str, Any]):
         }
 
 
+def _finished(job_id: str, t0: float, ckpt: JobCheckpoints) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": JobStatus.FINISHED,
+        "duration": round(time.time() - t0, 2),
+        "resumed": ckpt.resumed,
+        "cache": ckpt.stats.to_dict(),
+    }
+
+
+# =====================================
+# Streaming (windowed) job
+# =====================================
+
+def _run_streaming(job_id: str, files: List[str], config, guard: ResourceGuard, t0: float):
+    """
+    Ingest every member once into the ingest cache (one sequential pass
+    per archive), then feed the cached members day by day into the
+    StreamingAligner. Each aligned window is analyzed and saved before the
+    next one is built, so RAM is bounded by the window, not the job.
+    """
+    log = get_task_logger(job_id)
+
+    scratch = None
+    if settings.INGEST_CACHE_ENABLED:
+        cache = IngestCache()
+    else:
+        # the cache doubles as the spill area; drop it after the job
+        scratch = settings.OUTPUT_ROOT / "tmp" / job_id
+        cache = IngestCache(scratch)
+
+    try:
+        groups: Dict[Tuple[str, str], List[Tuple[ArchiveIndex, MemberEntry]]] = {}
+
+        for tar_path in files:
+            tar_path = Path(tar_path)
+            if not tar_path.exists():
+                log.warning(f"Missing file {tar_path}")
+                continue
+
+            index = get_member_index(tar_path)
+            _warm_cache(tar_path, index, cache, on_chunk=guard.check_rss)
+
+            for entry in index.parsable():
+                groups.setdefault((member_owner(entry), entry.type), []).append((index, entry))
+
+        sources = [
+            StreamSource(owner, kind, _cached_batches(cache, members))
+            for (owner, kind), members in sorted(groups.items())
+        ]
+
+        store = ResultStore(settings.RESULT_DIR)
+
+        def sink(part, block):
+            features = compute_battery_features(block, config)
+            store.save_window_result(job_id, part, block, features)
+            guard.check_rss()
+
+        run = StreamingAligner(sources, config, job_id).run(sink)
+        store.save_report(job_id, {
+            "task_id": job_id,
+            "streamed": True,
+            "windows": run["parts"],
+            "time_start": run["time_start"],
+            "time_end": run["time_end"],
+        })
+
+        log.info(f"[Worker] streamed {run['parts']} windows")
+        return {
+            "job_id": job_id,
+            "status": JobStatus.FINISHED,
+            "duration": round(time.time() - t0, 2)
+        }
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _warm_cache(tar_path, index: ArchiveIndex, cache: IngestCache, on_chunk=None):
+    missing = [e for e in index.parsable() if not cache.has(index, e)]
+    if not missing:
+        return
+    for entry, fileobj in iter_indexed_members(tar_path, index, missing):
+        cache.put(index, entry, _PARSERS[entry.type](fileobj, on_chunk=on_chunk))
+
+
+def _cached_batches(cache: IngestCache, members) -> Iterator[RecordBatch]:
+    """
+    One source (owner, kind) as record batches in time order: one cached
+    member (≈ one day) is in memory at a time.
+    """
+    for index, entry in sorted(members, key=lambda m: (m[1].date or "", m[1].name)):
+        yield _record_batch(entry.type, _cached_member(cache, index, entry))
+
+
+def _cached_member(cache: IngestCache, index: ArchiveIndex, entry: MemberEntry) -> Dict:
+    """
+    A parsed member from the cache; one evicted since it was parsed is
+    parsed again (and cached again).
+    """
+    data = cache.get(index, entry)
+    if data is not None:
+        return data
+    for _, data in _ingest_archive(index.source, index, [entry], cache=cache):
+        return data
+    raise FileNotFoundError(f"member {entry.name} not found in {index.source}")
+
+
+def _record_batch(kind: str, data: Dict) -> RecordBatch:
+    if kind == "summary":
+        names = [k for k in data if k != "time"]
+        values = values_matrix({k: data[k] for k in names}, len(data["time"]))
+    else:
+        channels = data["voltage" if kind == "batvol" else "temp"]
+        names = list(channels.keys())
+        values = channel_matrix(channels, len(data["time"]))
+    return RecordBatch(time=data["time"], values=values, columns=names)
+
+
+# =====================================
+# Fanned-out job tasks (see job_graph.py)
+# =====================================
+
+def archive_bytes(files: List[str]) -> int:
+    """
+    Pool task: uncompressed size of the parsable members of ``files``
+    (building their member indexes), what worker_entry is sized by in the
+    memory budget.
+    """
+    return sum(
+        sum(e.size for e in get_member_index(path).parsable())
+        for path in files
+        if Path(path).exists()
+    )
+
+
+def index_archive(job_id: str, tar_path: str, n_groups: int) -> Dict[str, Any]:
+    """
+    Pool task, stage 0: load (on a cold archive: build, one full inflate)
+    the member index and split the parsable members into up to
+    ``n_groups`` parse groups:
+    {"groups": [[name, ...]], "sizes": {name: uncompressed size}}.
+
+    With gzip restart points (or all members in the ingest cache) groups
+    are balanced by size. Without, a group is a consecutive run of
+    members: its task inflates the archive from the start up to the
+    run's last member, and skips over the members before its own.
+    """
+    if not Path(tar_path).exists():
+        get_task_logger(job_id).warning(f"Missing file {tar_path}")
+        return {"groups": [], "sizes": {}}
+
+    index = get_member_index(tar_path)
+    entries = index.parsable()
+    cache = IngestCache() if settings.INGEST_CACHE_ENABLED else None
+    seekable = gzip_index.is_enabled() and gzip_index.usable_checkpoints(index.checkpoints)
+    if seekable or (cache is not None and all(cache.has(index, e) for e in entries)):
+        groups = split_member_groups(entries, n_groups)
+    else:
+        groups = split_member_ranges(entries, n_groups)
+    return {
+        "groups": [[e.name for e in g] for g in groups],
+        "sizes": {e.name: e.size for e in entries},
+    }
+
+
+def parse_members(
+    tar_path: str,
+    member_names: List[str],
+    config: Dict[str, Any],
+    cache_root: Optional[str] = None,
+    shm_job: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pool task, stage 1: inflate and parse a subset of one archive's
+    members into the ingest cache. Only a SourceSpan (covered intervals +
+    channel names) per member goes back to the planner, not the data:
+    {"members": [(entry, span, shm ref)], "cache": hit counts}.
+
+    With ``shm_job`` the parsed arrays are published to shared memory
+    under that job instead and a BatchRef per member comes back; the rack
+    tasks then map them instead of reading the cache. A member /dev/shm
+    has no room for is spilled to the cache (ref None).
+
+    With gzip checkpoints each worker seeks straight to its own members;
+    without, it streams the archive up to its group's last member. Either
+    way several groups of the same archive are parsed concurrently.
+    """
+    index = get_member_index(tar_path)
+    wanted = set(member_names)
+    entries = [e for e in index.parsable() if e.name in wanted]
+    gap_sec = cfg_value(config, "ALIGN_GAP_SEC", settings.ALIGN_GAP_SEC) or None
+    cache = IngestCache(cache_root) if cache_root else None
+    stats = CacheStats()
+
+    out = []
+    # with shared memory a per-job cache only takes the spilled members
+    source_cache = None if shm_job else cache
+    for entry, data in _ingest_archive(tar_path, index, entries, cache=source_cache, stats=stats):
+        span = describe_source(member_owner(entry), entry.type, data, gap_sec)
+        ref = _publish_or_spill(shm_job, index, entry, data, cache) if shm_job else None
+        out.append((entry, span, ref))
+    return {"members": out, "cache": stats.to_dict()}
+
+
+def _publish_or_spill(
+    job_id: str,
+    index: ArchiveIndex,
+    entry: MemberEntry,
+    data: Dict,
+    spill: Optional[IngestCache],
+) -> Optional[BatchRef]:
+    """
+    BatchRef of the member in shared memory, or None once it went to
+    ``spill`` (without one it is in the shared ingest cache already).
+    """
+    batch = _record_batch(entry.type, data)
+    if shm_has_room(batch.time.nbytes + batch.values.nbytes):
+        return publish_batch(job_id, batch)
+    get_task_logger(job_id).warning(f"[shm] no room for {entry.name}, spilled to the ingest cache")
+    if spill is not None:
+        spill.put(index, entry, data)
+    return None
+
+
+def align_rack(
+    job_id: str,
+    rack_id: str,
+    members: Dict[str, List[Tuple[str, str, Optional[BatchRef]]]],
+    plan: AlignPlan,
+    config: Dict[str, Any],
+    cache_root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pool task, stage 2: load one rack's members ({kind: [(tar, member,
+    shm ref)]}) from shared memory or the ingest cache, align them onto
+    the job plan, run the plugins and write the rack's tables. Returns the
+    rack's flags and features.
+
+    The aligned rack and each plugin's output go through the stage cache
+    (rack_align_key): a rack another job already aligned on the same plan
+    is linked into this job instead.
+    """
+    log = get_task_logger(job_id)
+    guard = ResourceGuard(job_id)
+    cache = IngestCache(cache_root)
+    stages = StageCache(enabled=cache_enabled(config))
+    target = ResultStore(settings.RESULT_DIR).aligned_store(job_id)
+    key = rack_align_key(members, plan, config) if stages.enabled else None
+
+    # the rack's dayframe.json stays in the cache: merge_bank writes the job's
+    frame = stages.cached_frame(key, target, skip=("dayframe.json",))
+    if frame is None:
+        with SharedArrays() as shared:
+            day_raw = {"summary": {}, "rack": {rack_id: {}}}
+            for kind, refs in members.items():
+                day_raw["rack"][rack_id][kind] = _load_source(cache, refs, shared)
+
+            frame = align_planned(day_raw, plan, config, log)
+            del day_raw
+        guard.check_rss()
+        stages.store_frame(key, frame, target, skip=("dayframe.json",), job_id=job_id, rack_id=rack_id)
+
+    features = stages.features(key, frame, config, job_id=job_id, rack_id=rack_id)
+
+    return {
+        "rack_id": rack_id,
+        "has_voltage": bool(frame.has_voltage[0]),
+        "has_temp": bool(frame.has_temp[0]),
+        "summary": rack_id in frame.summary,
+        "features": features,
+        "cache": stages.stats.to_dict(),
+    }
+
+
+def merge_bank(
+    job_id: str,
+    members: List[Tuple[str, str, Optional[BatchRef]]],
+    plan: AlignPlan,
+    racks: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    cache_root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pool task, stage 3: align the bank summary, write the job topology and
+    merge the per-rack plugin outputs into the job's result files.
+    """
+    log = get_task_logger(job_id)
+    cache = IngestCache(cache_root)
+
+    with SharedArrays() as shared:
+        day_raw = {"summary": {}, "rack": {}}
+        if members:
+            day_raw["summary"]["bank"] = _load_source(cache, members, shared)
+        frame = align_planned(day_raw, plan.for_racks([]), config, log)
+        del day_raw
+
+    by_rack = {r["rack_id"]: r for r in racks}
+    flags = [by_rack.get(rack_id, {}) for rack_id in plan.rack_ids]
+    coverage = plan.coverage
+    if coverage is None:
+        coverage = np.ones((len(plan.rack_ids), frame.n_segments), dtype=bool)
+
+    store = ResultStore(settings.RESULT_DIR)
+    aligned = store.aligned_store(job_id)
+    aligned.write_dayframe_tables(frame)
+    aligned.write_dayframe_meta(
+        frame,
+        rack_ids=plan.rack_ids,
+        has_voltage=[bool(f.get("has_voltage")) for f in flags],
+        has_temp=[bool(f.get("has_temp")) for f in flags],
+        summary=[*frame.summary.keys(), *(r for r, f in zip(plan.rack_ids, flags) if f.get("summary"))],
+        coverage=coverage,
+    )
+
+    # plugin → rack → result, racks in plan order
+    features: Dict[str, Dict[str, Any]] = {}
+    for f in flags:
+        for plugin, per_rack in (f.get("features") or {}).items():
+            features.setdefault(plugin, {}).update(per_rack)
+    store.save_analysis(job_id, features, plan.rack_ids, frame.n_modules, plan.time)
+
+    return {"job_id": job_id, "status": JobStatus.FINISHED, "racks": len(racks)}
+
+
+def _load_source(
+    cache: IngestCache,
+    refs: List[Tuple[str, str, Optional[BatchRef]]],
+    shared: SharedArrays,
+) -> Dict:
+    """
+    One source (owner, kind), member by member from shared memory (when
+    the parse task published it) or the ingest cache; several members (one
+    per day / archive) are concatenated in time order. A single member
+    stays a view of its shared segment. A member that is in neither
+    (evicted from the cache since it was parsed) is parsed again.
+    """
+    members = []
+    for tar_path, name, ref in refs:
+        index = get_member_index(tar_path)
+        entry = next(e for e in index.members if e.name == name)
+        members.append((index, entry, ref))
+    members.sort(key=lambda m: (m[1].date or "", m[1].name))
+
+    kind = members[0][1].type
+    batches = []
+    for index, entry, ref in members:
+        if ref is not None:
+            batches.append(shared.batch(ref))
+        else:
+            batches.append(_record_batch(kind, _cached_member(cache, index, entry)))
+
+    columns = batches[0].columns
+    if len(batches) == 1:
+        time, values = batches[0].time, batches[0].values
+    else:
+        time = np.concatenate([b.time for b in batches])
+        values = np.concatenate([_reindex(b, columns) for b in batches])
+    if kind == "summary":
+        return {"time": time, **column_views(columns, values)}
+    return {"time": time, _CHANNEL_KEYS[kind]: column_views(columns, values)}
+
+
+def _reindex(batch: RecordBatch, columns: List[str]) -> np.ndarray:
+    # a later file with another header: map onto the first one
+    if list(batch.columns) == list(columns):
+        return batch.values
+    pos = {c: j for j, c in enumerate(batch.columns)}
+    values = np.full((len(batch), len(columns)), np.nan, dtype=batch.values.dtype)
+    for j, c in enumerate(columns):
+        if c in pos:
+            values[:, j] = batch.values[:, pos[c]]
+    return values
+
+
+def merge_member(day_raw, entry: MemberEntry, data):
+    if entry.type == "summary":
+        _merge_summary(day_raw, data, entry)
+    elif entry.type == "batvol":
+        _merge_batvol(day_raw, data, entry)
+    elif entry.type == "battemp":
+        _merge_battemp(day_raw, data, entry)
+
+
 # =====================================
 # Internal helpers
 # =====================================
 
-def _merge_summary(day_raw, data, fname):
-    if "bank" in fname:
+def _ingest_archive(
+    tar_path,
+    index: ArchiveIndex,
+    entries: Optional[List[MemberEntry]] = None,
+    on_chunk: Optional[Callable[[], None]] = None,
+    cache: Optional[IngestCache] = None,
+    stats: Optional[CacheStats] = None,
+) -> Iterator[Tuple[MemberEntry, Dict]]:
+    """
+    Yield (entry, parsed) for the archive's members. Ingest-cache hits
+    skip decompression entirely; only the misses are streamed + parsed,
+    and then written to the cache for the next job. ``cache`` overrides
+    the shared cache (e.g. a per-job scratch area); hits and misses are
+    counted as INGEST in ``stats``.
+    """
+    entries = index.parsable() if entries is None else entries
+    if cache is None and settings.INGEST_CACHE_ENABLED:
+        cache = IngestCache()
+
+    missing = []
+    for entry in entries:
+        data = cache.get(index, entry) if cache else None
+        if data is None:
+            missing.append(entry)
+        else:
+            yield entry, data
+
+    if stats is not None and cache:
+        stats.count(JobStage.INGEST, True, len(entries) - len(missing))
+        stats.count(JobStage.INGEST, False, len(missing))
+    if not missing:
+        return
+
+    for entry, fileobj in iter_indexed_members(tar_path, index, missing):
+        data = _PARSERS[entry.type](fileobj, on_chunk=on_chunk)
+        if cache:
+            cache.put(index, entry, data)
+        yield entry, data
+
+
+def member_owner(entry: MemberEntry) -> str:
+    """
+    "bank" for the bank-level summary, otherwise the member's rack id.
+    """
+    if entry.type == "summary" and "bank" in entry.name.lower():
+        return "bank"
+    return entry.rack_id or "unknown"
+
+
+def _merge_summary(day_raw, data, entry: MemberEntry):
+    if member_owner(entry) == "bank":
         day_raw["summary"]["bank"] = data
-    elif "rack" in fname:
-        rack_id = _extract_rack_id(fname)
-        day_raw["rack"].setdefault(rack_id, {})["summary"] = data
+    elif entry.rack_id is not None:
+        day_raw["rack"].setdefault(entry.rack_id, {})["summary"] = data
 
 
-def _merge_batvol(day_raw, data, fname):
-    rack_id = _extract_rack_id(fname)
+def _merge_batvol(day_raw, data, entry: MemberEntry):
+    rack_id = entry.rack_id or "unknown"
     day_raw["rack"].setdefault(rack_id, {})["batvol"] = data
 
 
-def _merge_battemp(day_raw, data, fname):
-    rack_id = _extract_rack_id(fname)
+def _merge_battemp(day_raw, data, entry: MemberEntry):
+    rack_id = entry.rack_id or "unknown"
     day_raw["rack"].setdefault(rack_id, {})["battemp"] = data
-
-
-def _extract_rack_id(fname: str):
-    fname = fname.lower()
-    if "rack" not in fname:
-        return "unknown"
-    digits = ""
-    for c in fname[fname.index("rack") + 4:]:
-        if c.isdigit():
-            digits += c
-        else:
-            break
-    return f"rack{digits}"
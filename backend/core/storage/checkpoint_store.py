@@ -0,0 +1,267 @@
+"""
+Checkpoint store: content-addressed stage outputs, shared by all jobs.
+
+    {CHECKPOINT_DIR}/{stage}/{key[:2]}/{key}/
+        _SUCCESS.json       written last: {"stage", "key", "created", "bytes", ...info}
+        payload.json        JSON payload, if the stage has one
+        ...                 anything else the stage keeps (aligned tables,
+                            an ingest cache)
+
+``key`` is a hash of everything the stage output depends on (see
+pipeline/checkpoints.py), so a retried job resumes and another job over
+the same inputs reuses the output.
+
+Writers never touch a published entry: begin() hands out a private
+staging directory next to it ({key}.{pid}.{uuid}.tmp) and commit() moves
+the finished directory into place with os.replace. Two jobs with the
+same key (or a queue task re-run after a lost lease) write side by side;
+the first commit wins and the later one is dropped. Staging directories
+of writers that died are removed by evict() after STALE_STAGING_SEC.
+
+The store is an LRU cache on disk: every hit touches the marker, and
+once the committed entries exceed CHECKPOINT_MAX_MB the least recently
+used ones are removed. Eviction scans the whole store, so it runs after
+every EVICT_EVERY of the budget committed by this process, not per
+commit. Table payloads are handed to jobs as hard links (tables are only
+ever replaced, never rewritten in place), so a job's results and the
+cache share the bytes.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+
+
+_DONE = "_SUCCESS.json"
+_STAGING = ".tmp"
+STALE_STAGING_SEC = 24 * 3600
+EVICT_EVERY = 0.05      # of CHECKPOINT_MAX_MB committed between two scans
+
+# bytes committed by this process since the last eviction, per store root
+_since_evict: Dict[str, int] = {}
+_since_evict_lock = threading.Lock()
+
+
+def link_tree(src: Path, dst: Path, skip: Iterable[str] = ()):
+    """
+    Mirror the files under ``src`` into ``dst`` as hard links (copies
+    across file systems); files named in ``skip`` are left out.
+    """
+    skip = set(skip)
+    for path in src.rglob("*"):
+        if path.is_dir() or path.name in skip or path.name.endswith(".tmp"):
+            continue
+        target = dst / path.relative_to(src)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copy2(path, tmp)
+        os.replace(tmp, target)
+
+
+def tree_bytes(root: Path) -> int:
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+
+
+def eviction_due(root: Path, size: int, max_bytes: int) -> bool:
+    """
+    Count ``size`` bytes written to the LRU store at ``root``; True once
+    EVICT_EVERY of ``max_bytes`` was written since the last eviction.
+    """
+    if not max_bytes:
+        return False
+    root = str(root)
+    with _since_evict_lock:
+        _since_evict[root] = _since_evict.get(root, 0) + size
+        if _since_evict[root] < max_bytes * EVICT_EVERY:
+            return False
+        _since_evict[root] = 0
+    return True
+
+
+class CheckpointStore:
+
+    def __init__(self, root: str | None = None, max_mb: Optional[int] = None):
+        self.root = Path(root or settings.CHECKPOINT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = (settings.CHECKPOINT_MAX_MB if max_mb is None else max_mb) * 1024**2
+
+    # ------------------------------------------------------------
+    # Layout
+    # ------------------------------------------------------------
+    def path(self, stage: str, key: str) -> Path:
+        return self.root / str(stage) / key[:2] / key
+
+    def has(self, stage: str, key: str) -> bool:
+        return (self.path(stage, key) / _DONE).exists()
+
+    def info(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self.path(stage, key) / _DONE
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def touch(self, stage: str, key: str):
+        """
+        Mark a hit (LRU order).
+        """
+        try:
+            os.utime(self.path(stage, key) / _DONE)
+        except FileNotFoundError:
+            pass
+
+    def begin(self, stage: str, key: str) -> Path:
+        """
+        Fresh, private staging directory for the stage output; published
+        by commit().
+        """
+        path = self.path(stage, key)
+        staging = path.with_name(f"{key}.{os.getpid()}.{uuid.uuid4().hex[:8]}{_STAGING}")
+        staging.mkdir(parents=True)
+        return staging
+
+    def commit(self, stage: str, key: str, staging: Optional[Path] = None, **info) -> Path:
+        """
+        Publish ``staging`` (from begin(); marker-only stages pass none)
+        as the entry. If another writer committed it first, theirs is
+        kept and ``staging`` dropped.
+        """
+        path = self.path(stage, key)
+        staging = Path(staging) if staging is not None else self.begin(stage, key)
+        size = tree_bytes(staging)
+        done = {"stage": str(stage), "key": key, "created": time.time(), "bytes": size, **info}
+        (staging / _DONE).write_text(json.dumps(done), encoding="utf-8")
+
+        if path.exists() and not self.has(stage, key):
+            shutil.rmtree(path, ignore_errors=True)   # left by an older, in-place writer
+        try:
+            os.replace(staging, path)
+        except OSError:
+            # the entry exists (ENOTEMPTY / EEXIST): committed by someone else
+            shutil.rmtree(staging, ignore_errors=True)
+            return path
+        self._committed(size)
+        return path
+
+    def link(self, stage: str, key: str, dst: Path, skip: Iterable[str] = ()):
+        """
+        Hard-link the entry's files (not its marker) into ``dst``.
+        """
+        link_tree(self.path(stage, key), Path(dst), skip=(_DONE, *skip))
+
+    def discard(self, stage: str, key: str):
+        shutil.rmtree(self.path(stage, key), ignore_errors=True)
+
+    # ------------------------------------------------------------
+    # LRU eviction
+    # ------------------------------------------------------------
+    def _committed(self, size: int):
+        """
+        Count a commit; evict once EVICT_EVERY of the budget was added.
+        """
+        if eviction_due(self.root, size, self.max_bytes):
+            self.evict()
+
+    def entries(self) -> List[Tuple[float, int, Path]]:
+        """
+        (last used, bytes, directory) of every committed entry.
+        """
+        out = []
+        for marker in self.root.glob(f"*/*/*/{_DONE}"):
+            if marker.parent.name.endswith(_STAGING):
+                continue   # being committed
+            try:
+                used = marker.stat().st_mtime
+                size = json.loads(marker.read_text(encoding="utf-8")).get("bytes", 0)
+            except (FileNotFoundError, ValueError):
+                continue
+            out.append((used, size, marker.parent))
+        return out
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used entries until the store fits
+        ``max_bytes`` (default CHECKPOINT_MAX_MB; 0 = unbounded).
+        """
+        self._drop_stale_staging()
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if not max_bytes:
+            return 0
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def _drop_stale_staging(self):
+        cutoff = time.time() - STALE_STAGING_SEC
+        for staging in self.root.glob(f"*/*/*{_STAGING}"):
+            try:
+                if staging.stat().st_mtime < cutoff:
+                    shutil.rmtree(staging, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------
+    # Payloads
+    # ------------------------------------------------------------
+    def save_json(self, stage: str, key: str, data: Dict[str, Any], **info):
+        staging = self.begin(stage, key)
+        (staging / "payload.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        self.commit(stage, key, staging, **info)
+
+    def load_json(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        if not self.has(stage, key):
+            return None
+        try:
+            data = json.loads((self.path(stage, key) / "payload.json").read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        self.touch(stage, key)
+        return data
+
+
+# ------------------------------------------------------------
+# Hit counting (per stage, reported with job results)
+# ------------------------------------------------------------
+class CacheStats:
+    """
+    Hits / misses per stage, as {stage: {"hits": n, "misses": n}}.
+    """
+
+    def __init__(self, counts: Optional[Dict[str, Dict[str, int]]] = None):
+        self.counts: Dict[str, Dict[str, int]] = {}
+        if counts:
+            self.merge(counts)
+
+    def count(self, stage: str, hit: bool, n: int = 1):
+        stage = getattr(stage, "value", stage)   # JobStage or its name
+        entry = self.counts.setdefault(stage, {"hits": 0, "misses": 0})
+        entry["hits" if hit else "misses"] += n
+
+    def merge(self, counts: Optional[Dict[str, Dict[str, int]]]):
+        for stage, entry in (counts or {}).items():
+            mine = self.counts.setdefault(stage, {"hits": 0, "misses": 0})
+            mine["hits"] += entry.get("hits", 0)
+            mine["misses"] += entry.get("misses", 0)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return {stage: dict(entry) for stage, entry in self.counts.items()}
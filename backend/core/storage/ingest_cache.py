@@ -0,0 +1,183 @@
+"""
+Ingest cache: parsed tar.gz members transcoded to Parquet, once.
+
+The first job that reads an archive writes every parsed member
+(summary / batVol / batTemp) as a typed Parquet table. Later jobs over the
+same archive skip gunzip and CSV parsing and go straight to alignment.
+
+Cache key = sha1(format, archive path, size, mtime, member name, data
+timezone), so a replaced or touched archive never serves stale data.
+``time`` is stored as Int64 epoch seconds.
+
+Layout:
+    INGEST_CACHE_DIR/
+        ab/abcdef....parquet
+
+The shared cache is an LRU cache on disk like the stage cache: a hit
+touches the table, and once the tables exceed INGEST_CACHE_MAX_MB the
+least recently used ones are removed (checked after every EVICT_EVERY of
+the cap written by this process). Readers treat an evicted member as a
+miss and parse it again. Per-job caches (a root passed in) live inside
+the stage cache or a job's scratch area and are not capped here.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from ..config import settings
+from ..ingest.member_index import ArchiveIndex, MemberEntry
+from ..parsers.columnar import column_views
+from ..utils.timeutil import timezone_key
+from .checkpoint_store import STALE_STAGING_SEC, eviction_due
+from .parquet_store import ParquetStore
+
+
+CACHE_FORMAT = 2   # bump when the stored table layout changes
+
+# member type → name of the nested channel table in the parser output
+_CHANNEL_KEY = {
+    "batvol": "voltage",
+    "battemp": "temp",
+}
+
+
+class IngestCache:
+
+    def __init__(self, root: str | None = None, max_mb: Optional[int] = None):
+        self.store = ParquetStore(root or settings.INGEST_CACHE_DIR)
+        if max_mb is None:
+            max_mb = settings.INGEST_CACHE_MAX_MB if root is None else 0
+        self.max_bytes = max_mb * 1024**2
+
+    # ------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------
+    @staticmethod
+    def key(index: ArchiveIndex, entry: MemberEntry) -> str:
+        raw = f"{CACHE_FORMAT}|{index.source}|{index.size}|{index.mtime}|{entry.name}|{timezone_key()}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _parts(self, index: ArchiveIndex, entry: MemberEntry):
+        k = self.key(index, entry)
+        return [k[:2], f"{k}.parquet"]
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def has(self, index: ArchiveIndex, entry: MemberEntry) -> bool:
+        return self.store.has_table(self._parts(index, entry))
+
+    def get(self, index: ArchiveIndex, entry: MemberEntry) -> Optional[Dict]:
+        """
+        Parsed member in the same shape the parser returns, or None on miss.
+        """
+        try:
+            df = self.store.read_table(self._parts(index, entry))
+        except Exception:
+            return None   # unreadable / truncated: treat as a miss
+        if df is None:
+            return None
+        self._touch(index, entry)
+        return _from_frame(entry.type, df)
+
+    def put(self, index: ArchiveIndex, entry: MemberEntry, data: Dict):
+        parts = self._parts(index, entry)
+        self.store.write_table(parts, _to_frame(entry.type, data))
+        if self.max_bytes:
+            size = self.store.root.joinpath(*parts).stat().st_size
+            if eviction_due(self.store.root, size, self.max_bytes):
+                self.evict()
+
+    # ------------------------------------------------------------
+    # LRU eviction
+    # ------------------------------------------------------------
+    def _touch(self, index: ArchiveIndex, entry: MemberEntry):
+        try:
+            os.utime(self.store.root.joinpath(*self._parts(index, entry)))
+        except FileNotFoundError:
+            pass   # evicted meanwhile: the data is read already
+
+    def tables(self) -> List[Tuple[float, int, Path]]:
+        """
+        (last used, bytes, path) of every cached member.
+        """
+        out = []
+        for path in self.store.root.glob("*/*.parquet"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self.tables())
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used members until the cache fits
+        ``max_bytes`` (default: the cap; 0 = unbounded).
+        """
+        self._drop_stale_tmp()
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if not max_bytes:
+            return 0
+        tables = sorted(self.tables())
+        total = sum(size for _, size, _ in tables)
+        removed = 0
+        for _, size, path in tables:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def _drop_stale_tmp(self):
+        # half-written tables of writers that died
+        cutoff = time.time() - STALE_STAGING_SEC
+        for tmp in self.store.root.glob("*/*.tmp"):
+            try:
+                if tmp.stat().st_mtime < cutoff:
+                    tmp.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------
+# parser output ⇄ DataFrame
+# ---------------------------------------------------------
+def _to_frame(kind: str, data: Dict) -> pl.DataFrame:
+    cols = {"time": pl.Series("time", data["time"], dtype=pl.Int64)}
+
+    channel_key = _CHANNEL_KEY.get(kind)
+    if channel_key is None:
+        # summary: flat dict of lists
+        for name, values in data.items():
+            if name != "time":
+                cols[name] = pl.Series(name, values, dtype=pl.Float64)
+    else:
+        for name, values in data[channel_key].items():
+            cols[name] = pl.Series(name, values, dtype=pl.Float32)
+
+    return pl.DataFrame(cols)
+
+
+def _from_frame(kind: str, df: pl.DataFrame) -> Dict:
+    time = df.get_column("time").to_numpy()
+    names = [name for name in df.columns if name != "time"]
+
+    channel_key = _CHANNEL_KEY.get(kind)
+    if channel_key is None:
+        values = {name: df.get_column(name).to_numpy() for name in names}
+        return {"time": time, **values}
+
+    # one contiguous float32 (T × N) block, exposed as per-column views
+    matrix = np.ascontiguousarray(df.select(names).to_numpy(), dtype=np.float32)
+    return {"time": time, channel_key: column_views(names, matrix)}
@@ -3,12 +3,18 @@ Parquet Store: columnar storage for battery data
 Uses Polars for fast IO.
 """
 
+import json
 import os
 from pathlib import Path
+import numpy as np
 import polars as pl
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import threading
 
+from ..config import settings
+from ..model.dayframe import DayFrame
+from ..model.rollup import ROLLUP_STATS, RollupLevel
+
 _WRITE_LOCK = threading.Lock()
 
 
@@ -28,6 +34,18 @@ class ParquetStore:
                 summary.parquet
                 batvol.parquet
                 battemp.parquet
+
+    Aligned DayFrames (write_dayframe) use:
+        storage_root/
+            dayframe.json           topology: racks, columns, module sizes
+            bank/summary.parquet
+            {rack_id}/summary.parquet, batvol.parquet, battemp.parquet
+    or, for a streamed job, one file per time block:
+            {rack_id}/batvol/part-00000.parquet, ...
+    and the rollup pyramid next to them, same owner / kind tables with
+    "{channel}.{min|max|mean|last}" columns per bucket:
+            rollup/1m/{rack_id}/batvol.parquet   (or batvol/part-NNNNN.parquet)
+            rollup/15m/..., rollup/1h/...
     """
 
     def __init__(self, root: str = "./storage_data"):
@@ -109,6 +127,245 @@ class ParquetStore:
             return pl.DataFrame()
         return pl.read_parquet(path)
 
+    # ------------------------------------------------------------
+    # Whole-table write / read (no append), used by the ingest cache
+    # ------------------------------------------------------------
+
+    def write_table(self, parts: List[str], df: pl.DataFrame):
+        """
+        Write one immutable table; readers never see a partial file.
+        """
+        path = self._path(parts)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        df.write_parquet(
+            tmp,
+            compression=settings.PARQUET_COMPRESSION,
+            row_group_size=settings.PARQUET_ROW_GROUP_SIZE,
+        )
+        os.replace(tmp, path)
+
+    def read_table(self, parts: List[str]) -> Optional[pl.DataFrame]:
+        path = self.root.joinpath(*parts)
+        if not path.exists():
+            return None
+        return pl.read_parquet(path)
+
+    def has_table(self, parts: List[str]) -> bool:
+        return self.root.joinpath(*parts).exists()
+
+    # ------------------------------------------------------------
+    # Aligned DayFrame
+    # ------------------------------------------------------------
+
+    @staticmethod
+    def _frame_table(owner: str, kind: str, part: Optional[int]) -> List[str]:
+        if part is None:
+            return [owner, f"{kind}.parquet"]
+        return [owner, kind, f"part-{part:05d}.parquet"]
+
+    def write_dayframe(self, frame: DayFrame, part: Optional[int] = None):
+        """
+        One table per rack tensor: each (T, C) rack slice is handed to
+        Polars as a 2-D block, no per-cell Python objects.
+
+        ``part`` stores the frame as one time block of a longer, streamed
+        job ({owner}/{kind}/part-NNNNN.parquet); blocks are written as the
+        aligner emits them and read back one at a time.
+        """
+        self.write_dayframe_tables(frame, part)
+        self.write_dayframe_meta(frame, part)
+
+    def write_dayframe_tables(self, frame: DayFrame, part: Optional[int] = None):
+        """
+        Tables (and rollups) only, no dayframe.json: per-rack tasks of a
+        fanned-out job each write their own racks, the bank merge writes
+        the topology once at the end.
+        """
+        time = pl.Series("time", frame.time, dtype=pl.Int64)
+
+        for owner, channels in frame.summary.items():
+            df = pl.DataFrame({name: values for name, values in channels.items()})
+            self.write_table(self._frame_table(owner, "summary", part), df.insert_column(0, time))
+
+        for r, rack_id in enumerate(frame.rack_ids):
+            if frame.has_voltage[r]:
+                df = pl.from_numpy(frame.voltage[r], schema=frame.cell_columns, orient="row")
+                self.write_table(self._frame_table(rack_id, "batvol", part), df.insert_column(0, time))
+            if frame.has_temp[r]:
+                df = pl.from_numpy(frame.temp[r], schema=frame.temp_columns, orient="row")
+                self.write_table(self._frame_table(rack_id, "battemp", part), df.insert_column(0, time))
+
+        for level in frame.rollups.values():
+            self.write_rollup(level, part)
+
+    def write_dayframe_meta(self, frame: DayFrame, part: Optional[int] = None, **topology):
+        """
+        dayframe.json for ``frame``; ``topology`` overrides fields (rack_ids,
+        has_voltage, has_temp, summary, coverage) when the frame only holds
+        part of the job.
+        """
+        meta = self.read_dayframe_meta() if part else None
+        has_voltage = list(topology.get("has_voltage", frame.has_voltage.tolist()))
+        has_temp = list(topology.get("has_temp", frame.has_temp.tolist()))
+        summary = set(topology.get("summary", frame.summary.keys()))
+        rollups = {level.label: sec for sec, level in frame.rollups.items()}
+        coverage = topology.get("coverage", frame.coverage)
+        segments = {"segments": frame.segments.tolist(), "coverage": np.asarray(coverage).tolist()}
+        part_segments = {}
+        if meta is not None:
+            # blocks of one job share the topology; flags / owners accumulate
+            has_voltage = [a or b for a, b in zip(has_voltage, meta["has_voltage"])]
+            has_temp = [a or b for a, b in zip(has_temp, meta["has_temp"])]
+            summary |= set(meta["summary"])
+            rollups = {**(meta.get("rollups") or {}), **rollups}
+            part_segments = meta.get("part_segments") or {}
+        if part is not None:
+            part_segments[str(part)] = segments
+
+        meta = {
+            "rack_ids": list(topology.get("rack_ids", frame.rack_ids)),
+            "cell_columns": frame.cell_columns,
+            "temp_columns": frame.temp_columns,
+            "cells_per_module": frame.cells_per_module,
+            "temps_per_module": frame.temps_per_module,
+            "has_voltage": has_voltage,
+            "has_temp": has_temp,
+            "summary": sorted(summary),
+            "parts": None if part is None else part + 1,
+            "segments": segments if part is None else None,
+            "part_segments": part_segments or None,
+            "rollups": rollups,
+        }
+        path = self._path(["dayframe.json"])
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def read_dayframe_meta(self) -> Optional[Dict[str, Any]]:
+        path = self.root / "dayframe.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def read_dayframe(self, part: Optional[int] = None) -> Optional[DayFrame]:
+        meta = self.read_dayframe_meta()
+        if meta is None:
+            return None
+        if meta.get("parts") and part is None:
+            part = 0
+
+        def table(owner, kind, flag=True):
+            return self.read_table(self._frame_table(owner, kind, part)) if flag else None
+
+        summaries = {owner: table(owner, "summary") for owner in meta["summary"]}
+        volts = {r: table(rid, "batvol", meta["has_voltage"][r]) for r, rid in enumerate(meta["rack_ids"])}
+        temps = {r: table(rid, "battemp", meta["has_temp"][r]) for r, rid in enumerate(meta["rack_ids"])}
+        summaries = {k: df for k, df in summaries.items() if df is not None}
+        volts = {k: df for k, df in volts.items() if df is not None}
+        temps = {k: df for k, df in temps.items() if df is not None}
+
+        first = next(iter([*summaries.values(), *volts.values(), *temps.values()]), None)
+        time = first.get_column("time").to_numpy() if first is not None else np.empty(0, dtype=np.int64)
+
+        seg = meta.get("segments") if part is None else (meta.get("part_segments") or {}).get(str(part))
+        frame = DayFrame.allocate(
+            time,
+            meta["rack_ids"],
+            meta["cell_columns"],
+            meta["temp_columns"],
+            meta["cells_per_module"],
+            meta["temps_per_module"],
+            segments=np.array(seg["segments"], dtype=np.int64).reshape(-1, 2) if seg else None,
+            coverage=np.array(seg["coverage"], dtype=bool).reshape(len(meta["rack_ids"]), -1) if seg else None,
+        )
+        for r, df in volts.items():
+            frame.voltage[r] = df.select(frame.cell_columns).to_numpy()
+            frame.has_voltage[r] = True
+        for r, df in temps.items():
+            frame.temp[r] = df.select(frame.temp_columns).to_numpy()
+            frame.has_temp[r] = True
+
+        frame.summary = {
+            owner: {c: df.get_column(c).to_numpy() for c in df.columns if c != "time"}
+            for owner, df in summaries.items()
+        }
+        return frame
+
+    def iter_dayframe_parts(self):
+        """
+        Blocks of a streamed job, in time order, one in memory at a time.
+        """
+        meta = self.read_dayframe_meta()
+        if meta is None:
+            return
+        for part in range(meta.get("parts") or 1):
+            yield self.read_dayframe(part if meta.get("parts") else None)
+
+    # ------------------------------------------------------------
+    # Rollups
+    # ------------------------------------------------------------
+
+    def write_rollup(self, level: RollupLevel, part: Optional[int] = None):
+        """
+        One table per owner / kind with every channel's bucket statistics.
+        """
+        time = pl.Series("time", level.time, dtype=pl.Int64)
+        for owner, kind, columns, stats in level.tables():
+            df = pl.concat(
+                [
+                    pl.from_numpy(
+                        np.asarray(stats.stat(name), dtype=np.float32),
+                        schema=[f"{c}.{name}" for c in columns],
+                        orient="row",
+                    )
+                    for name in ROLLUP_STATS
+                ],
+                how="horizontal",
+            )
+            self.write_table(["rollup", level.label, *self._frame_table(owner, kind, part)], df.insert_column(0, time))
+
+    def _rollup_files(self, label: str, owner: str, kind: str) -> List[Path]:
+        base = self.root / "rollup" / label / owner
+        single = base / f"{kind}.parquet"
+        if single.exists():
+            return [single]
+        return sorted((base / kind).glob("part-*.parquet"))
+
+    def read_rollup(
+        self,
+        label: str,
+        owner: str,
+        kind: str,
+        channels: Optional[List[str]] = None,
+        stats: Optional[List[str]] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Rollup table of one owner / kind, optionally cut to some channels,
+        statistics and a [start, end] time range. Streamed parts are read
+        as one table; only the selected columns are loaded.
+        """
+        files = self._rollup_files(label, owner, kind)
+        if not files:
+            return None
+
+        lf = pl.scan_parquet(files)
+        if channels or stats:
+            names = lf.collect_schema().names()
+            want = set(stats or ROLLUP_STATS)
+            chans = set(channels) if channels else None
+            keep = [
+                n for n in names[1:]
+                if n.rpartition(".")[2] in want and (chans is None or n.rpartition(".")[0] in chans)
+            ]
+            lf = lf.select(["time", *keep])
+        if start is not None:
+            lf = lf.filter(pl.col("time") >= start)
+        if end is not None:
+            lf = lf.filter(pl.col("time") <= end)
+        return lf.collect()
+
     # ------------------------------------------------------------
     # Delete / Cleanup
     # ------------------------------------------------------------
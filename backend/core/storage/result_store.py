@@ -16,6 +16,9 @@ Directory layout:
             anomalies.json
             soh.json
             report.json
+            aligned/            DayFrame tables (ParquetStore.write_dayframe)
+            aligned/rollup/     1m / 15m / 1h min-max-mean-last pyramid
+            windows/            streamed jobs: plugin output per time block
 """
 
 import json
@@ -23,6 +26,9 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 import threading
 
+from ..model.dayframe import DayFrame
+from .parquet_store import ParquetStore
+
 
 _WRITE_LOCK = threading.Lock()
 
@@ -80,6 +86,85 @@ class ResultStore:
         path = self._path(task_id, "report.json")
         self._write_json(path, report)
 
+    def save_job_result(self, task_id: str, aligned: DayFrame, features: Dict[str, Any]):
+        """
+        Persist one finished job: plugin outputs as JSON, the aligned
+        DayFrame as Parquet under {task_id}/aligned/.
+        """
+        self.aligned_store(task_id).write_dayframe(aligned)
+        self.save_analysis(task_id, features, aligned.rack_ids, aligned.n_modules, aligned.time)
+
+    def save_analysis(self, task_id: str, features: Dict[str, Any], rack_ids, n_modules: int, time):
+        """
+        Plugin outputs + report; the aligned tables are written separately
+        (by save_job_result, or rack by rack in a fanned-out job).
+        """
+        self.save_features(task_id, features)
+        if "anomaly_detector" in features:
+            self.save_anomalies(task_id, features["anomaly_detector"])
+        if "soh_proxy" in features:
+            self.save_soh(task_id, features["soh_proxy"])
+
+        self.save_report(task_id, {
+            "task_id": task_id,
+            "racks": list(rack_ids),
+            "modules_per_rack": n_modules,
+            "time_start": int(time[0]) if len(time) else None,
+            "time_end": int(time[-1]) if len(time) else None,
+            "n_time": len(time),
+            "plugins": sorted(features.keys()),
+        })
+
+    def save_window_result(self, task_id: str, part: int, block: DayFrame, features: Dict[str, Any]):
+        """
+        One time block of a streamed job (ALIGN_WINDOW_SEC > 0): the aligned
+        block as a Parquet part, plugin output as windows/part-NNNNN.json.
+        """
+        self.aligned_store(task_id).write_dayframe(block, part=part)
+
+        t = block.time
+        path = self._path(task_id, f"windows/part-{part:05d}.json")
+        self._write_json(path, {
+            "part": part,
+            "time_start": int(t[0]) if len(t) else None,
+            "time_end": int(t[-1]) if len(t) else None,
+            "features": features,
+        })
+
+    def load_window(self, task_id: str, part: int):
+        return self.load(task_id, f"windows/part-{part:05d}.json")
+
+    def aligned_store(self, task_id: str) -> ParquetStore:
+        return ParquetStore(self.root / task_id / "aligned")
+
+    def load_aligned(self, task_id: str) -> Optional[DayFrame]:
+        return self.aligned_store(task_id).read_dayframe()
+
+    def rollup_levels(self, task_id: str) -> Dict[str, int]:
+        meta = self.aligned_store(task_id).read_dayframe_meta() or {}
+        return meta.get("rollups") or {}
+
+    def load_rollup(self, task_id: str, level: str, owner: str, kind: str, **query):
+        """
+        Coarse view of one owner / kind (see ParquetStore.read_rollup) as
+        {"time": [...], "channels": {name: {stat: [...]}}}; NaN → None.
+        """
+        df = self.aligned_store(task_id).read_rollup(level, owner, kind, **query)
+        if df is None:
+            return None
+
+        channels: Dict[str, Dict[str, Any]] = {}
+        for name in df.columns[1:]:
+            channel, _, stat = name.rpartition(".")
+            channels.setdefault(channel, {})[stat] = df.get_column(name).fill_nan(None).to_list()
+        return {
+            "level": level,
+            "owner": owner,
+            "kind": kind,
+            "time": df.get_column("time").to_list(),
+            "channels": channels,
+        }
+
     # ------------------------
     # readers for API (results.py)
     # ------------------------
@@ -1,8 +1,9 @@
 """
 Job Model (in-memory representation)
 """
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -54,3 +55,32 @@ class Job:
             "ended_at": self.ended_at.isoformat() if self.ended_at else None,
             "error": self.error,
         }
+
+
+@dataclass
+class QueuedTask:
+    """
+    One unit of work in the durable task queue (TaskManager): one
+    worker_entry run of a job, claimed by a worker under a lease.
+    """
+    task_id: str
+    job_id: str
+    files: List[str]
+    config: Dict[str, Any] = field(default_factory=dict)
+    state: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    lease_until: Optional[float] = None     # epoch seconds
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "job_id": self.job_id,
+            "files": self.files,
+            "state": self.state.value,
+            "attempts": self.attempts,
+            "worker_id": self.worker_id,
+            "lease_until": self.lease_until,
+            "error": self.error,
+        }
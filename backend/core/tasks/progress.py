@@ -3,7 +3,7 @@ Progress model + WebSocket progress manager
 """
 
 from dataclasses import dataclass
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Set
 from fastapi import WebSocket
 import asyncio
 
@@ -41,6 +41,7 @@ class ProgressManager:
         # task_id -> list of WebSocket
         self._subs: Dict[str, List[WebSocket]] = {}
         self._lock = asyncio.Lock()
+        self._sending: Set[asyncio.Task] = set()
 
     # subscribe
     async def connect(self, task_id: str, ws: WebSocket):
@@ -74,6 +75,18 @@ class ProgressManager:
         for ws in dead:
             await self.disconnect(task_id, ws)
 
+    # push from synchronous code running on the event loop (never blocks)
+    def publish(self, task_id: str, update: ProgressUpdate):
+        if task_id not in self._subs:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return   # not on the loop (scripts, worker threads): nobody to push to
+        task = loop.create_task(self.push(task_id, update))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
 
 # ---------------------------------------------------------
 # Global instance (this is what main.py expects)
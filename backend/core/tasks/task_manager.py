@@ -3,28 +3,60 @@ Task Manager:
 - store job metadata in sqlite
 - update status/stage/progress
 - used by Jobs API, dispatcher, workers
+- durable task queue (task_queue table): work survives restarts and is
+  pulled by any number of worker processes (pipeline/queue_worker.py)
+
+Queue protocol
+    enqueue_job   a job and its tasks (one worker_entry run each), PENDING
+    claim_task    atomically take the oldest PENDING task: RUNNING under
+                  a lease of TASK_QUEUE_LEASE_SEC held by one worker_id
+    heartbeat     the owner renews its lease while the task runs
+    complete_task / fail_task   only the current lease owner may settle
+                  it; failures go back to PENDING until max_attempts
+    expired leases (a worker died or hung) are put back to PENDING by the
+    next claim (or requeue_expired), FAILED once attempts are used up
+
+A claim runs in a BEGIN IMMEDIATE transaction: SQLite's write lock is
+taken before the task is picked, so two workers (threads or processes)
+never get the same task. WAL mode lets readers (API status) go on while
+workers write.
 """
 
 import sqlite3
 import json
 import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from .job import Job, JobStatus, JobStage
+from ..config import settings
+from .job import Job, JobStatus, JobStage, QueuedTask
 
 
-DB_FILE = "./task_meta.sqlite"
 _LOCK = threading.Lock()
+_BUSY_TIMEOUT_SEC = 30      # other processes may hold the write lock
+_READY: set = set()         # TASK_DB paths whose schema exists
+
+
+def _connect(path: Path):
+    return sqlite3.connect(str(path), timeout=_BUSY_TIMEOUT_SEC, check_same_thread=False)
 
 
 def _conn():
-    return sqlite3.connect(DB_FILE, check_same_thread=False)
+    # settings.TASK_DB (not the cwd): the API and every queue worker
+    # must open the same file
+    path = Path(settings.TASK_DB)
+    if path not in _READY:
+        init_db()
+    return _connect(path)
 
 
 def init_db():
-    conn = _conn()
+    path = Path(settings.TASK_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = _connect(path)
     c = conn.cursor()
     c.execute(
         """
@@ -40,12 +72,121 @@ def init_db():
         );
         """
     )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS task_queue (
+            task_id TEXT PRIMARY KEY,
+            job_id TEXT,
+            files_json TEXT,
+            config_json TEXT,
+            state TEXT,
+            priority INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER,
+            worker_id TEXT,
+            lease_until REAL,
+            enqueued_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            result_json TEXT,
+            error TEXT
+        );
+        """
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS task_queue_claim ON task_queue (state, priority, enqueued_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS task_queue_job ON task_queue (job_id)")
+    c.execute("PRAGMA journal_mode=WAL")
     conn.commit()
     conn.close()
+    _READY.add(path)
 
 
-# ensure DB exists
-init_db()
+@contextmanager
+def _transaction():
+    """
+    Write transaction that holds SQLite's write lock from the start
+    (BEGIN IMMEDIATE): what it reads cannot change before it writes.
+    """
+    conn = _conn()
+    conn.isolation_level = None   # explicit BEGIN / COMMIT
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+_TASK_COLUMNS = "task_id, job_id, files_json, config_json, state, attempts, worker_id, lease_until, error"
+
+
+def _task_from_row(row) -> QueuedTask:
+    task_id, job_id, files_json, config_json, state, attempts, worker_id, lease_until, error = row
+    return QueuedTask(
+        task_id=task_id,
+        job_id=job_id,
+        files=json.loads(files_json),
+        config=json.loads(config_json or "{}"),
+        state=JobStatus(state),
+        attempts=attempts,
+        worker_id=worker_id,
+        lease_until=lease_until,
+        error=error,
+    )
+
+
+def _expire_leases(conn, now: float) -> int:
+    """
+    RUNNING tasks whose lease ran out: back to PENDING, or FAILED once
+    they used up their attempts.
+    """
+    rows = conn.execute(
+        "SELECT task_id, job_id, attempts, max_attempts FROM task_queue WHERE state=? AND lease_until < ?",
+        (JobStatus.RUNNING.value, now),
+    ).fetchall()
+    for task_id, job_id, attempts, max_attempts in rows:
+        if attempts >= max_attempts:
+            conn.execute(
+                """
+                UPDATE task_queue SET state=?, worker_id=NULL, lease_until=NULL, finished_at=?, error=?
+                WHERE task_id=?
+                """,
+                (JobStatus.FAILED.value, now, f"lease expired ({attempts} attempt(s))", task_id),
+            )
+        else:
+            conn.execute(
+                "UPDATE task_queue SET state=?, worker_id=NULL, lease_until=NULL WHERE task_id=?",
+                (JobStatus.PENDING.value, task_id),
+            )
+    for job_id in {row[1] for row in rows}:
+        _settle_job(conn, job_id)
+    return len(rows)
+
+
+def _settle_job(conn, job_id: str):
+    """
+    Once none of its tasks is pending or running, the job gets its final
+    status: CANCELLED, else FAILED if any task failed, else SUCCESS.
+    """
+    counts = dict(conn.execute(
+        "SELECT state, COUNT(*) FROM task_queue WHERE job_id=? GROUP BY state", (job_id,)
+    ).fetchall())
+    if counts.get(JobStatus.PENDING.value) or counts.get(JobStatus.RUNNING.value):
+        return
+    if counts.get(JobStatus.CANCELLED.value):
+        status = JobStatus.CANCELLED
+    elif counts.get(JobStatus.FAILED.value):
+        status = JobStatus.FAILED
+    else:
+        status = JobStatus.SUCCESS
+    conn.execute(
+        "UPDATE jobs SET status=?, ended_at=? WHERE job_id=?",
+        (status.value, datetime.utcnow().isoformat(), job_id),
+    )
 
 
 class TaskManager:
@@ -172,3 +313,195 @@ class TaskManager:
         conn.close()
 
         return [TaskManager.get_job(j) for j in ids]
+
+    # ------------------------------------------------------------
+    # Durable task queue
+    # ------------------------------------------------------------
+    @staticmethod
+    def enqueue_job(
+        job_id: str,
+        tasks: List[Tuple[str, List[str]]],
+        config: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+    ) -> Job:
+        """
+        Create the job and queue its tasks ([(task_id, files)]) in one
+        transaction.
+        """
+        max_attempts = max_attempts or settings.TASK_QUEUE_MAX_ATTEMPTS
+        files = [f for _, task_files in tasks for f in task_files]
+        now = time.time()
+        with _transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, files_json, status, stage, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (job_id, json.dumps(files), JobStatus.PENDING.value, JobStage.INGEST.value,
+                 datetime.utcnow().isoformat()),
+            )
+            conn.executemany(
+                """
+                INSERT INTO task_queue
+                    (task_id, job_id, files_json, config_json, state, priority, max_attempts, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (task_id, job_id, json.dumps(task_files), json.dumps(config or {}, default=str),
+                     JobStatus.PENDING.value, priority, max_attempts, now)
+                    for task_id, task_files in tasks
+                ],
+            )
+        return Job(job_id, files)
+
+    @staticmethod
+    def claim_task(worker_id: str, lease_sec: Optional[float] = None) -> Optional[QueuedTask]:
+        """
+        Take the next task (highest priority, oldest first) for
+        ``worker_id`` under a lease; None if the queue is empty.
+        """
+        lease_sec = lease_sec or settings.TASK_QUEUE_LEASE_SEC
+        now = time.time()
+        with _transaction() as conn:
+            _expire_leases(conn, now)
+            row = conn.execute(
+                """
+                SELECT task_id, job_id FROM task_queue WHERE state=?
+                ORDER BY priority DESC, enqueued_at, task_id LIMIT 1
+                """,
+                (JobStatus.PENDING.value,),
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, job_id = row
+            conn.execute(
+                """
+                UPDATE task_queue
+                SET state=?, worker_id=?, lease_until=?, attempts=attempts+1, started_at=?, error=NULL
+                WHERE task_id=?
+                """,
+                (JobStatus.RUNNING.value, worker_id, now + lease_sec, now, task_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET status=?, started_at=? WHERE job_id=? AND status=?",
+                (JobStatus.RUNNING.value, datetime.utcnow().isoformat(), job_id, JobStatus.PENDING.value),
+            )
+            task = conn.execute(f"SELECT {_TASK_COLUMNS} FROM task_queue WHERE task_id=?", (task_id,)).fetchone()
+        return _task_from_row(task)
+
+    @staticmethod
+    def heartbeat(task_id: str, worker_id: str, lease_sec: Optional[float] = None) -> bool:
+        """
+        Renew the lease; False if the worker no longer holds it (expired
+        and requeued, or cancelled).
+        """
+        lease_sec = lease_sec or settings.TASK_QUEUE_LEASE_SEC
+        with _transaction() as conn:
+            cur = conn.execute(
+                "UPDATE task_queue SET lease_until=? WHERE task_id=? AND worker_id=? AND state=?",
+                (time.time() + lease_sec, task_id, worker_id, JobStatus.RUNNING.value),
+            )
+            return cur.rowcount == 1
+
+    @staticmethod
+    def complete_task(task_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        with _transaction() as conn:
+            cur = conn.execute(
+                """
+                UPDATE task_queue SET state=?, lease_until=NULL, finished_at=?, result_json=?
+                WHERE task_id=? AND worker_id=? AND state=?
+                """,
+                (JobStatus.SUCCESS.value, time.time(), json.dumps(result or {}, default=str),
+                 task_id, worker_id, JobStatus.RUNNING.value),
+            )
+            if cur.rowcount != 1:
+                return False   # lease lost: whoever holds it now settles the task
+            job_id = conn.execute("SELECT job_id FROM task_queue WHERE task_id=?", (task_id,)).fetchone()[0]
+            _settle_job(conn, job_id)
+        return True
+
+    @staticmethod
+    def fail_task(task_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Back to PENDING while attempts remain (and ``retry``), else FAILED.
+        """
+        with _transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, attempts, max_attempts FROM task_queue WHERE task_id=? AND worker_id=? AND state=?",
+                (task_id, worker_id, JobStatus.RUNNING.value),
+            ).fetchone()
+            if row is None:
+                return False
+            job_id, attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                conn.execute(
+                    "UPDATE task_queue SET state=?, worker_id=NULL, lease_until=NULL, error=? WHERE task_id=?",
+                    (JobStatus.PENDING.value, error, task_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE task_queue SET state=?, lease_until=NULL, finished_at=?, error=? WHERE task_id=?",
+                    (JobStatus.FAILED.value, time.time(), error, task_id),
+                )
+                conn.execute("UPDATE jobs SET error=? WHERE job_id=?", (error, job_id))
+                _settle_job(conn, job_id)
+        return True
+
+    @staticmethod
+    def requeue_expired() -> int:
+        with _transaction() as conn:
+            return _expire_leases(conn, time.time())
+
+    @staticmethod
+    def cancel_queued(job_id: str) -> int:
+        """
+        Cancel the job's tasks that are still PENDING; running ones finish.
+        """
+        with _transaction() as conn:
+            cur = conn.execute(
+                "UPDATE task_queue SET state=?, finished_at=? WHERE job_id=? AND state=?",
+                (JobStatus.CANCELLED.value, time.time(), job_id, JobStatus.PENDING.value),
+            )
+            _settle_job(conn, job_id)
+            return cur.rowcount
+
+    @staticmethod
+    def get_task(task_id: str) -> Optional[QueuedTask]:
+        conn = _conn()
+        row = conn.execute(f"SELECT {_TASK_COLUMNS} FROM task_queue WHERE task_id=?", (task_id,)).fetchone()
+        conn.close()
+        return _task_from_row(row) if row else None
+
+    @staticmethod
+    def queue_progress(job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Task counts per state and the job status; None for an unknown job.
+        """
+        conn = _conn()
+        job = conn.execute("SELECT status, error FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        counts = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM task_queue WHERE job_id=? GROUP BY state", (job_id,)
+        ).fetchall())
+        conn.close()
+        if job is None:
+            return None
+        return {
+            "status": job[0],
+            "error": job[1],
+            "total": sum(counts.values()),
+            **{state.value.lower(): counts.get(state.value, 0) for state in JobStatus},
+        }
+
+    @staticmethod
+    def task_results(job_id: str) -> List[Dict[str, Any]]:
+        """
+        worker_entry results of the job's finished tasks.
+        """
+        conn = _conn()
+        rows = conn.execute(
+            "SELECT result_json FROM task_queue WHERE job_id=? AND state=? ORDER BY task_id",
+            (job_id, JobStatus.SUCCESS.value),
+        ).fetchall()
+        conn.close()
+        return [json.loads(row[0]) for row in rows if row[0]]
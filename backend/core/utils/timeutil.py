@@ -1,13 +1,25 @@
 """
 Time parsing utilities optimized for large CSV streaming.
+
+CSV timestamps are naive wall-clock times in ``settings.DATA_TIMEZONE``
+(the host's local time when unset); epochs are true UTC seconds.
 """
 
+import calendar
 import re
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from ..config import settings
 
-# yyyy/m/d hh:mm:ss or yyyy-mm-dd hh:mm:ss
+# yyyy/m/d hh:mm:ss or yyyy-mm-dd hh:mm:ss (fractional seconds are dropped)
 DATE_PAT = re.compile(
-    r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T](\d{1,2}):(\d{1,2}):(\d{1,2})"
+    r"\A(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T](\d{1,2}):(\d{1,2}):(\d{1,2})(?:\.\d*)?\Z"
 )
 
 def fast_parse_time(s: str) -> datetime:
@@ -22,12 +34,41 @@ def fast_parse_time(s: str) -> datetime:
     return datetime(y, mo, d, h, mi, se)
 
 
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def data_timezone() -> Optional[tzinfo]:
+    """
+    Zone of naive data timestamps; None = the host's local time.
+    """
+    return _zone(settings.DATA_TIMEZONE) if settings.DATA_TIMEZONE else None
+
+
+def timezone_key() -> str:
+    """
+    How naive times are decoded, for cache keys of decoded data.
+    """
+    if settings.DATA_TIMEZONE:
+        return settings.DATA_TIMEZONE
+    return f"local:{time.tzname}:{time.timezone}:{time.altzone}"
+
+
 def normalize_to_epoch(ts: datetime) -> float:
+    if ts.tzinfo is None and data_timezone() is not None:
+        ts = ts.replace(tzinfo=data_timezone())
     return ts.timestamp()
 
 
 def epoch_to_dt(sec: float) -> datetime:
-    return datetime.utcfromtimestamp(sec)
+    """
+    Naive wall-clock time in the data timezone (inverse of normalize_to_epoch).
+    """
+    tz = data_timezone()
+    if tz is None:
+        return datetime.fromtimestamp(sec)
+    return datetime.fromtimestamp(sec, tz).replace(tzinfo=None)
 
 
 def infer_uniform_time_grid(
@@ -42,3 +83,110 @@ def infer_uniform_time_grid(
     while cur <= t1:
         yield cur
         cur += timedelta(seconds=step_sec)
+
+
+# ---------------------------------------------------------
+# Vectorized column decoding → int64 epoch seconds
+# ---------------------------------------------------------
+INVALID_EPOCH = np.iinfo(np.int64).min      # marker for unparsable rows
+
+_DATE_ONLY_PAT = re.compile(r"\A(\d{4})[-/](\d{1,2})[-/](\d{1,2})\Z")
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _date_epoch(s: str) -> int:
+    m = _DATE_ONLY_PAT.match(s)
+    if not m:
+        return INVALID_EPOCH
+    try:
+        y, mo, d = map(int, m.groups())
+        return calendar.timegm((y, mo, d, 0, 0, 0))
+    except ValueError:
+        return INVALID_EPOCH
+
+
+def _slow_epoch(s: str) -> int:
+    # wall-clock seconds, like the vectorized path (localized afterwards)
+    try:
+        return calendar.timegm(fast_parse_time(s.strip()).timetuple())
+    except (ValueError, AttributeError):
+        return INVALID_EPOCH
+
+
+def _wall_epoch(wall: int) -> int:
+    return int(normalize_to_epoch(_EPOCH + timedelta(seconds=wall)))
+
+
+def _localize(wall: np.ndarray) -> np.ndarray:
+    """
+    Wall-clock seconds (counted as if UTC) → epoch seconds in the data
+    timezone: one UTC offset per day, row by row only on a day whose
+    offset changes (DST).
+    """
+    ok = wall != INVALID_EPOCH
+    day = wall // 86400
+    days = np.unique(day[ok])
+    out = wall.copy()
+    for d in days:
+        start = int(d) * 86400
+        offset = start - _wall_epoch(start)
+        rows = ok & (day == d) if len(days) > 1 else ok
+        if offset == start + 86399 - _wall_epoch(start + 86399):
+            out[rows] -= offset
+        else:
+            out[rows] = [_wall_epoch(int(w)) for w in wall[rows]]
+    return out
+
+
+def decode_epoch_seconds(values: Sequence[str]) -> np.ndarray:
+    """
+    Decode a whole time column ("yyyy/m/d hh:mm:ss" or "yyyy-mm-dd hh:mm:ss")
+    into int64 epoch seconds; the naive wall-clock times are in the data
+    timezone (``DATA_TIMEZONE``, else the host's local time).
+
+    - date part: one parse per *distinct* date (a daily file has exactly one)
+    - "hh:mm:ss" part: digit arithmetic on the code-point matrix
+    - anything else (h:m:s, odd separators) falls back to a per-row regex
+    Unparsable rows are INVALID_EPOCH.
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    arr = np.char.strip(np.asarray(values, dtype=str))
+    if np.char.find(arr, "T").max() >= 0:
+        arr = np.char.replace(arr, "T", " ")
+
+    parts = np.char.partition(arr, " ")
+    dates, clock = parts[:, 0], parts[:, 2]
+
+    # date → epoch of midnight
+    if (dates == dates[0]).all():
+        day = np.full(n, _date_epoch(str(dates[0])), dtype=np.int64)
+    else:
+        uniq, inv = np.unique(dates, return_inverse=True)
+        day = np.array([_date_epoch(str(u)) for u in uniq], dtype=np.int64)[inv]
+
+    # "hh:mm:ss" → seconds of day
+    cp = clock.astype("U8").view(np.uint32).reshape(n, 8).astype(np.int64) - ord("0")
+    digits = cp[:, [0, 1, 3, 4, 6, 7]]
+    hh = digits[:, 0] * 10 + digits[:, 1]
+    mm = digits[:, 2] * 10 + digits[:, 3]
+    ss = digits[:, 4] * 10 + digits[:, 5]
+
+    colon = ord(":") - ord("0")
+    ok = (
+        (np.char.str_len(clock) == 8)
+        & (cp[:, 2] == colon) & (cp[:, 5] == colon)
+        & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        & (hh < 24) & (mm < 60) & (ss < 60)
+        & (day != INVALID_EPOCH)
+    )
+
+    out = np.where(ok, day + hh * 3600 + mm * 60 + ss, INVALID_EPOCH)
+
+    # rare irregular rows: per-row fallback
+    for i in np.flatnonzero(~ok):
+        out[i] = _slow_epoch(str(arr[i]))
+
+    return _localize(out)
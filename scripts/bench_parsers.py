@@ -0,0 +1,111 @@
+"""
+Parser throughput benchmark: legacy csv.DictReader path vs the columnar
+(NumPy block) backend used by parse_batvol_csv / parse_battemp_csv.
+
+Usage (from repo root):
+    python scripts/bench_parsers.py --rows 17280 --cells 224 --repeat 3
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.core.parsers.common import iter_csv, fast_float, parse_time   # noqa: E402
+from backend.core.parsers.batvol_parser import parse_batvol_csv            # noqa: E402
+from backend.core.utils.timeutil import normalize_to_epoch                 # noqa: E402
+
+
+# ---------------------------------------------------------
+# Legacy implementation (per-row dict + per-cell fast_float)
+# ---------------------------------------------------------
+def legacy_parse_batvol_csv(fileobj):
+    time_list = []
+    cell_table = {}
+
+    for row in iter_csv(fileobj):
+        ts = parse_time(row.get("time"))
+        if ts is None:
+            continue
+
+        time_list.append(ts)
+
+        for key, val in row.items():
+            if key.lower().startswith("v"):
+                if key not in cell_table:
+                    cell_table[key] = []
+                cell_table[key].append(fast_float(val) / 1000.0 if val else None)
+
+    return {"time": time_list, "voltage": cell_table}
+
+
+# ---------------------------------------------------------
+# Synthetic rack-day
+# ---------------------------------------------------------
+def make_batvol_csv(rows: int, cells: int, missing_every: int = 997) -> bytes:
+    rng = np.random.default_rng(0)
+    values = rng.integers(3100, 3400, size=(rows, cells))
+    header = ",".join(["time"] + [f"V{i}" for i in range(1, cells + 1)])
+
+    lines = [header]
+    for r in range(rows):
+        sec = r * 5
+        ts = f"2024/10/1 {sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+        cells_txt = [
+            "" if (r * cells + c) % missing_every == 0 else str(values[r, c])
+            for c in range(cells)
+        ]
+        lines.append(ts + "," + ",".join(cells_txt))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def bench(fn, payload: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(io.BytesIO(payload))
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def check_equal(payload: bytes):
+    old = legacy_parse_batvol_csv(io.BytesIO(payload))
+    new = parse_batvol_csv(io.BytesIO(payload))
+
+    # naive times in DATA_TIMEZONE / local time, as the parsers decode them
+    old_epoch = [int(normalize_to_epoch(t)) for t in old["time"]]
+    assert old_epoch == new["time"].tolist(), "time column differs"
+    assert list(old["voltage"]) == list(new["voltage"]), "column set differs"
+    for key, col in old["voltage"].items():
+        ref = np.array([np.nan if v is None else v for v in col], dtype=np.float32)
+        np.testing.assert_allclose(new["voltage"][key], ref, rtol=1e-6, equal_nan=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=17280)      # one day at 5 s
+    ap.add_argument("--cells", type=int, default=224)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    payload = make_batvol_csv(args.rows, args.cells)
+    print(f"batVol: {args.rows} rows × {args.cells} cells, {len(payload) / 1e6:.1f} MB")
+
+    check_equal(payload)
+    print("output check: legacy == columnar")
+
+    t_old = bench(legacy_parse_batvol_csv, payload, args.repeat)
+    t_new = bench(parse_batvol_csv, payload, args.repeat)
+
+    print(f"legacy   : {t_old:8.3f} s  {args.rows / t_old:12,.0f} rows/s")
+    print(f"columnar : {t_new:8.3f} s  {args.rows / t_new:12,.0f} rows/s")
+    print(f"speedup  : {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
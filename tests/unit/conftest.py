@@ -0,0 +1,82 @@
+import io
+import tarfile
+
+import pytest
+
+from backend.core.config import settings
+from backend.core.storage import sqlite_meta
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    """
+    Every test gets its own output tree (indexes, caches, results, queue
+    and metadata DBs).
+    """
+    for name, sub in (
+        ("OUTPUT_ROOT", ""),
+        ("INDEX_DIR", "index"),
+        ("INGEST_CACHE_DIR", "ingest_cache"),
+        ("CHECKPOINT_DIR", "checkpoints"),
+        ("RESULT_DIR", "results"),
+        ("TASK_DB", "task_meta.sqlite"),
+    ):
+        path = tmp_path / "out" / sub
+        monkeypatch.setattr(settings, name, path)
+    (tmp_path / "out" / "index").mkdir(parents=True)
+    monkeypatch.setattr(settings, "DATA_TIMEZONE", "UTC")
+    monkeypatch.setattr(sqlite_meta, "DB_PATH", str(tmp_path / "out" / "storage_meta.sqlite"))
+    sqlite_meta.init_db()
+    return tmp_path / "out"
+
+
+def csv_bytes(header, rows) -> bytes:
+    return ("\n".join([",".join(header)] + [",".join(map(str, r)) for r in rows]) + "\n").encode()
+
+
+def day_members(day="2024-10-01", n=60, cells=8, temps=4, racks=(1,)):
+    """
+    Members of a small daily archive: bank summary, per rack summary /
+    batVol / batTemp, at 5 s.
+    """
+    ymd = day.replace("-", "/")
+    times = [f"{ymd} {i * 5 // 3600:02d}:{i * 5 // 60 % 60:02d}:{i * 5 % 60:02d}" for i in range(n)]
+    summary = ["time", "totalVol", "totalCur", "soc", "soh"]
+    members = [(f"bank0summary_{day}.csv", csv_bytes(summary, [[t, 800 + i % 5, 10, 50, 99] for i, t in enumerate(times)]))]
+    for r in racks:
+        members.append((f"rack{r}summary_{day}.csv", csv_bytes(summary, [[t, 800, 10, 50, 99] for t in times])))
+        members.append((f"rack{r}batVol_{day}.csv", csv_bytes(
+            ["time"] + [f"V{j}" for j in range(1, cells + 1)],
+            [[t] + [3200 + (i + j) % 40 for j in range(cells)] for i, t in enumerate(times)],
+        )))
+        members.append((f"rack{r}batTemp_{day}.csv", csv_bytes(
+            ["time"] + [f"T{j}" for j in range(1, temps + 1)],
+            [[t] + [250 + (i + j) % 10 for j in range(temps)] for i, t in enumerate(times)],
+        )))
+    return members
+
+
+def write_archive(path, members):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture
+def make_archive(tmp_path):
+    """
+    make_archive("dir/name.tar.gz", day=..., n=..., racks=...) → path of a
+    new archive under the test's data directory.
+    """
+    def make(name="day1.tar.gz", **kwargs):
+        return write_archive(tmp_path / "data" / name, day_members(**kwargs))
+    return make
+
+
+@pytest.fixture
+def archive(make_archive):
+    return make_archive()
@@ -0,0 +1,52 @@
+import warnings
+
+import numpy as np
+
+from backend.core.analysis.anomaly_adapters import AnomalyDetectorPlugin
+from backend.core.model.dayframe import DayFrame
+
+
+def _frame():
+    # rack1 covers both segments, rack2 only the second one (starts at row 10)
+    frame = DayFrame.allocate(
+        np.arange(30, dtype=np.int64) * 5,
+        ["rack1", "rack2"],
+        [f"v{i}" for i in range(32)],
+        [f"t{i}" for i in range(20)],
+        segments=np.array([[0, 10], [10, 30]]),
+        coverage=np.array([[True, True], [False, True]]),
+    )
+    frame.has_voltage[:] = True
+    frame.has_temp[:] = True
+    frame.voltage[0] = 3300.0
+    frame.temp[0] = 25.0
+    frame.voltage[1, 10:] = 3300.0
+    frame.temp[1, 10:] = 25.0
+    return frame
+
+
+def _run(frame):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN rows
+        return AnomalyDetectorPlugin().run(frame, {})
+
+
+def test_indices_are_grid_rows_for_a_rack_that_starts_late():
+    frame = _frame()
+    frame.voltage[1, 15, 3] = 2500.0
+    frame.voltage[1, 20, 0] = 3900.0
+    frame.temp[1, 25, 7] = 40.0
+
+    (module,) = _run(frame)["rack2"]
+    assert module["volt_low_idx"] == [15]
+    assert module["volt_high_idx"] == [20]
+    assert module["high_temp_spread_idx"] == [25]
+
+
+def test_indices_of_a_rack_covering_the_whole_grid():
+    frame = _frame()
+    frame.voltage[0, 3, 1] = 2500.0
+
+    out = _run(frame)
+    assert out["rack1"][0]["volt_low_idx"] == [3]
+    assert out["rack2"][0]["volt_low_idx"] == []
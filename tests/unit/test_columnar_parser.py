@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pytest
+
+from backend.core.config import settings
+from backend.core.parsers.batvol_parser import parse_batvol_csv
+from backend.core.parsers.battemp_parser import parse_battemp_csv
+from backend.core.parsers.columnar import _parse_block
+from backend.core.parsers.common import fast_float, iter_csv, parse_time
+from backend.core.utils.timeutil import normalize_to_epoch
+
+
+def _reference(payload: bytes, prefix: str, scale: float):
+    # the legacy csv.DictReader parser: one dict per row, one float() per cell
+    times, table = [], {}
+    for row in iter_csv(io.BytesIO(payload)):
+        ts = parse_time(row.get("time") or "")
+        if ts is None:
+            continue
+        times.append(int(normalize_to_epoch(ts)))
+        for key, val in row.items():
+            if key and key.lower().startswith(prefix) and key != "time":
+                v = fast_float(val) if val else None
+                table.setdefault(key, []).append(np.nan if v is None else v * scale)
+    return times, table
+
+
+def _csv(header, rows) -> bytes:
+    return ("\n".join([header] + rows) + "\n").encode()
+
+
+def _times(n):
+    return [f"2024/10/1 {i * 5 // 3600:02d}:{i * 5 // 60 % 60:02d}:{i * 5 % 60:02d}" for i in range(n)]
+
+
+def _wide(n=50, cols=6, prefix="V", edit=None):
+    rng = np.random.default_rng(1)
+    header = ",".join(["time"] + [f"{prefix}{j}" for j in range(1, cols + 1)])
+    rows = []
+    for i, t in enumerate(_times(n)):
+        cells = [str(v) for v in rng.integers(3100, 3400, size=cols)]
+        if edit:
+            cells = edit(i, cells)
+        rows.append(",".join([t] + cells))
+    return _csv(header, rows)
+
+
+def _empties(i, cells):
+    # first / last / consecutive empty cells
+    if i % 3 == 0:
+        cells[0] = ""
+    if i % 4 == 0:
+        cells[-1] = ""
+    if i % 5 == 0:
+        cells[2] = cells[3] = ""
+    return cells
+
+
+def _junk(i, cells):
+    if i == 17:
+        cells[1] = "3.2V"
+    return cells
+
+
+def _quoted(i, cells):
+    if i == 3:
+        cells[4] = '"3300"'
+    return cells
+
+
+def _assert_same(payload, parse, key, prefix, scale):
+    times, table = _reference(payload, prefix, scale)
+    got = parse(io.BytesIO(payload))
+    assert got["time"].dtype == np.int64
+    assert got["time"].tolist() == times
+    assert list(got[key]) == list(table)
+    for name, ref in table.items():
+        np.testing.assert_allclose(got[key][name], np.array(ref, dtype=np.float32), rtol=1e-6, equal_nan=True)
+
+
+@pytest.mark.parametrize("edit", [None, _empties, _junk, _quoted], ids=["clean", "empties", "junk", "quoted"])
+@pytest.mark.parametrize("chunk_rows", [7, 5000])
+def test_batvol_matches_reference(monkeypatch, edit, chunk_rows):
+    monkeypatch.setattr(settings, "CHUNK_ROWS", chunk_rows)
+    _assert_same(_wide(edit=edit), parse_batvol_csv, "voltage", "v", settings.VOLTAGE_SCALE_CELL)
+
+
+def test_battemp_matches_reference():
+    _assert_same(_wide(prefix="T", edit=_empties), parse_battemp_csv, "temp", "t", settings.TEMP_SCALE_CELL)
+
+
+def test_rows_with_bad_times_and_ragged_rows(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_ROWS", 4)
+    payload = _wide(n=12)
+    lines = payload.decode().splitlines()
+    lines[3] = "bad" + lines[3][lines[3].index(","):]
+    lines[6] = lines[6].rsplit(",", 2)[0]         # two cells short
+    lines[9] = lines[9] + ",3333"                  # one cell too many
+    _assert_same(("\n".join(lines) + "\n").encode(), parse_batvol_csv, "voltage", "v", settings.VOLTAGE_SCALE_CELL)
+
+
+def test_parse_block():
+    np.testing.assert_array_equal(
+        _parse_block([",1,,2", "3,,,", " 4,5e1,nan,6"], (3, 4)),
+        np.array([[np.nan, 1, np.nan, 2], [3, np.nan, np.nan, np.nan], [4, 50, np.nan, 6]]),
+    )
+    assert _parse_block(["1,x", "2,3"], (2, 2)) is None
+    assert _parse_block(["1,2", "3,4"], (2, 3)) is None
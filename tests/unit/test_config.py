@@ -0,0 +1,12 @@
+from backend.core.config import Settings, settings
+
+
+def test_time_grid_follows_the_step(monkeypatch):
+    assert settings.TIME_GRID == f"{settings.TIME_STEP_SEC}s"
+    monkeypatch.setattr(settings, "TIME_STEP_SEC", 10)
+    assert settings.TIME_GRID == "10s"
+
+
+def test_step_from_the_environment(monkeypatch):
+    monkeypatch.setenv("TIME_STEP_SEC", "30")
+    assert Settings().TIME_GRID == "30s"
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from backend.core.config import settings
+from backend.core.pipeline.dispatcher import AsyncDispatcher
+from backend.core.pipeline.status import JobStatus
+from backend.core.pipeline.worker_pool import TaskResult
+
+
+class _Pool:
+    """
+    Accepts every job and reports it done at once.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+
+    def submit_job(self, job, block=True, timeout=None, results=None):
+        results.put(TaskResult(job.job_id, True, {"cache": {}}))
+        return True
+
+    def cancel_job(self, job_id):
+        return False
+
+
+def _dispatcher(tmp_path, n=3):
+    for i in range(n):
+        (tmp_path / f"day{i}.tar.gz").write_bytes(b"")
+    d = AsyncDispatcher()
+    d.worker_pool = _Pool()
+    return d, [str(tmp_path / f"day{i}.tar.gz") for i in range(n)]
+
+
+async def _finish(d, task_id):
+    while task_id in d._tasks:
+        await asyncio.sleep(0.01)
+    return d.progress.get(task_id)
+
+
+def test_jobs_are_planned_off_the_loop(monkeypatch, tmp_path):
+    d, files = _dispatcher(tmp_path)
+    planned_on = []
+    plan = d.plan_jobs
+
+    def plan_jobs(*args):
+        for job in plan(*args):
+            planned_on.append(threading.current_thread())
+            yield job
+
+    monkeypatch.setattr(d, "plan_jobs", plan_jobs)
+
+    async def run():
+        loop_thread = threading.current_thread()
+        state = await _finish(d, await d.start(files + ["missing.tar.gz"], task_id="t1"))
+        return loop_thread, state
+
+    loop_thread, state = asyncio.run(run())
+    assert state["status"] == JobStatus.FINISHED.value
+    assert state["finished"] == state["total"] == 3
+    assert len(planned_on) == 3
+    assert loop_thread not in planned_on
+
+
+def test_finished_tasks_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "TASK_PROGRESS_KEEP_SEC", 0)
+    d, files = _dispatcher(tmp_path)
+
+    async def run():
+        await _finish(d, await d.start(files, task_id="t1"))
+        assert "t1" in d.progress          # still queryable until the next start
+        await asyncio.sleep(0.01)
+        await _finish(d, await d.start(files, task_id="t2"))
+
+    asyncio.run(run())
+    assert "t1" not in d.progress
+    assert d.progress["t2"]["status"] == JobStatus.FINISHED.value
+
+
+def test_recent_tasks_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TASK_PROGRESS_KEEP_SEC", 3600)
+    d, files = _dispatcher(tmp_path)
+
+    async def run():
+        await _finish(d, await d.start(files, task_id="t1"))
+        await _finish(d, await d.start(files, task_id="t2"))
+
+    asyncio.run(run())
+    assert set(d.progress) == {"t1", "t2"}
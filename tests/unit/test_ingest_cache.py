@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+
+from backend.core.ingest.member_index import get_member_index
+from backend.core.pipeline.worker_process import _cached_member, _ingest_archive
+from backend.core.storage.ingest_cache import IngestCache
+
+
+def _warm(archive, cache):
+    index = get_member_index(str(archive))
+    parsed = dict((entry.name, data) for entry, data in _ingest_archive(str(archive), index, cache=cache))
+    return index, parsed
+
+
+def _age(cache, index, entry, mtime):
+    path = cache.store.root.joinpath(*cache._parts(index, entry))
+    os.utime(path, (mtime, mtime))
+
+
+def test_round_trip(archive):
+    cache = IngestCache()
+    index, parsed = _warm(archive, cache)
+    for entry in index.parsable():
+        got = cache.get(index, entry)
+        assert got is not None
+        np.testing.assert_array_equal(got["time"], parsed[entry.name]["time"])
+
+
+def test_evicts_least_recently_used_first(archive):
+    cache = IngestCache()
+    index, _ = _warm(archive, cache)
+    entries = index.parsable()
+    for i, entry in enumerate(entries):
+        _age(cache, index, entry, 1_000_000 + i)
+    cache.get(index, entries[0])          # a hit makes the oldest the newest
+
+    sizes = {path.name: size for _, size, path in cache.tables()}
+    keep = sizes[cache._parts(index, entries[0])[1]] + sizes[cache._parts(index, entries[-1])[1]]
+    removed = cache.evict(max_bytes=keep)
+
+    assert removed == len(entries) - 2
+    assert cache.usage() <= keep
+    assert cache.has(index, entries[0])
+    assert cache.has(index, entries[-1])
+    assert not any(cache.has(index, e) for e in entries[1:-1])
+
+
+def test_unbounded_cache_keeps_everything(archive):
+    cache = IngestCache(max_mb=0)
+    index, _ = _warm(archive, cache)
+    assert cache.evict() == 0
+    assert all(cache.has(index, e) for e in index.parsable())
+
+
+def test_evicted_member_is_parsed_again(archive):
+    cache = IngestCache()
+    index, parsed = _warm(archive, cache)
+    entry = next(e for e in index.parsable() if e.type == "batvol")
+    cache.evict(max_bytes=1)
+    assert not cache.has(index, entry)
+
+    data = _cached_member(cache, index, entry)
+    assert cache.has(index, entry)
+    np.testing.assert_array_equal(data["time"], parsed[entry.name]["time"])
+    for name, values in parsed[entry.name]["voltage"].items():
+        np.testing.assert_array_equal(data["voltage"][name], values)
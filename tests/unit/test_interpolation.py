@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from backend.core.aligner.interpolation import interp_matrix
+
+
+def _reference(x, y, xi, max_gap=None):
+    """
+    np.interp over each channel's own valid samples (the legacy per-column path).
+    """
+    out = np.full((len(xi), y.shape[1]), np.nan)
+    for j in range(y.shape[1]):
+        ok = ~np.isnan(y[:, j])
+        if ok.sum() < 2:
+            continue
+        xv, yv = x[ok], y[ok, j].astype(np.float64)
+        out[:, j] = np.interp(xi, xv, yv, left=np.nan, right=np.nan)
+        if max_gap is not None:
+            lo = np.clip(np.searchsorted(xv, xi, side="right") - 1, 0, len(xv) - 1)
+            hi = np.minimum(lo + 1, len(xv) - 1)
+            out[((xv[hi] - xv[lo]) > max_gap) & (xi != xv[lo]), j] = np.nan
+    return out
+
+
+def _gappy_data(dtype):
+    rng = np.random.default_rng(7)
+    n, n_ch = 2000, 24
+    x = np.sort(rng.choice(np.arange(0, 20000.0), n, replace=False))
+    y = rng.normal(size=(n, n_ch)).astype(dtype)
+    y[rng.random((n, n_ch)) < 0.01] = np.nan   # sporadic NaNs
+    y[300:420, 1] = np.nan                     # a long hole
+    y[:50, 2] = np.nan                         # leading / trailing gaps
+    y[-50:, 3] = np.nan
+    y[:, 4] = np.nan                           # dead channel
+    y[:-1, 5] = np.nan                         # one valid sample
+    y[:, 6] = np.arange(n)                     # no gaps at all
+    xi = np.arange(-10.0, 20010.0, 5.0)
+    xi = np.union1d(xi, x[::97])               # some grid points exactly on samples
+    return x, y, xi
+
+
+@pytest.mark.parametrize("max_gap", [None, 60.0])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_gappy_channels_match_np_interp(max_gap, dtype):
+    x, y, xi = _gappy_data(dtype)
+    res = interp_matrix(x, y, xi, max_gap=max_gap)
+    ref = _reference(x, y, xi, max_gap)
+    tol = 1e-9 if dtype == np.float64 else 1e-5
+    np.testing.assert_allclose(res, ref, rtol=tol, atol=tol, equal_nan=True)
+    assert res.dtype == dtype
+
+
+def test_gappy_channels_written_into_out_view():
+    x, y, xi = _gappy_data(np.float64)
+    tensor = np.zeros((len(xi), y.shape[1] + 2))
+    interp_matrix(x, y, xi, out=tensor[:, 1:-1])
+    np.testing.assert_allclose(tensor[:, 1:-1], _reference(x, y, xi), equal_nan=True)
+    assert (tensor[:, 0] == 0).all() and (tensor[:, -1] == 0).all()
+
+
+def test_source_not_modified():
+    x, y, xi = _gappy_data(np.float64)
+    before = y.copy()
+    interp_matrix(x, y, xi)
+    np.testing.assert_array_equal(y, before)
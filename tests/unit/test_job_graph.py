@@ -0,0 +1,29 @@
+from backend.core.pipeline.job_graph import JobGraph
+
+
+class _Pool:
+    max_workers = 2
+
+    def __init__(self):
+        self.tasks = []
+
+    def followup(self, fn, args, callback, error_callback, input_bytes=0):
+        self.tasks.append((fn.__name__, args, callback))
+
+
+def test_repeated_archive_is_indexed_and_parsed_once():
+    pool, errors = _Pool(), []
+    graph = JobGraph(pool, "job", {}, ["a.tar.gz", "b.tar.gz", "a.tar.gz"],
+                     on_done=lambda r: None, on_error=errors.append, on_empty=lambda: None)
+    graph.start()
+
+    indexed = [(args[1], cb) for name, args, cb in pool.tasks if name == "index_archive"]
+    assert [path for path, _ in indexed] == ["a.tar.gz", "b.tar.gz"]
+
+    for path, callback in indexed:
+        callback({"groups": [["m1"], ["m2"]], "sizes": {"m1": 10, "m2": 20}})
+
+    parsed = [args[0] for name, args, _ in pool.tasks if name == "parse_members"]
+    assert sorted(parsed) == ["a.tar.gz", "a.tar.gz", "b.tar.gz", "b.tar.gz"]
+    assert graph._pending == 4
+    assert errors == []
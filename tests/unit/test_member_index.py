@@ -0,0 +1,77 @@
+import os
+import tarfile
+
+from backend.core.ingest.member_index import (
+    build_member_index,
+    get_member_index,
+    index_path_for,
+    load_member_index,
+)
+from backend.core.ingest.tar_stream import iter_indexed_members
+
+
+def test_sidecar_is_reused_while_the_archive_is_unchanged(archive):
+    built = get_member_index(str(archive))
+    assert index_path_for(archive).exists()
+    loaded = load_member_index(str(archive))
+    assert loaded is not None
+    assert loaded.to_dict() == built.to_dict()
+    assert [m.type for m in loaded.parsable()] == ["summary", "summary", "batvol", "battemp"]
+
+
+def test_members_are_read_at_their_offsets(archive):
+    index = build_member_index(str(archive))
+    with tarfile.open(archive, "r:gz") as tf:
+        expected = {m.name: tf.extractfile(m).read() for m in tf.getmembers()}
+    got = {entry.name: fileobj.read() for entry, fileobj in iter_indexed_members(str(archive), index, index.parsable())}
+    assert got == expected
+
+
+def test_mtime_change_invalidates(archive):
+    get_member_index(str(archive))
+    st = archive.stat()
+    os.utime(archive, (st.st_atime, st.st_mtime + 10))
+    assert load_member_index(str(archive)) is None
+
+
+def test_size_change_invalidates(archive, make_archive):
+    get_member_index(str(archive))
+    st = archive.stat()
+    make_archive(archive.name, n=90)
+    os.utime(archive, (st.st_atime, st.st_mtime))    # same mtime, other size
+    assert archive.stat().st_size != st.st_size
+    assert load_member_index(str(archive)) is None
+
+
+def test_same_name_in_another_directory(archive, make_archive):
+    get_member_index(str(archive))
+    other = make_archive(f"other/{archive.name}", day="2024-10-02")
+    assert index_path_for(other) != index_path_for(archive)
+    assert load_member_index(str(other)) is None
+    assert get_member_index(str(other)).source == str(other.resolve())
+    assert load_member_index(str(archive)) is not None
+
+
+def test_symlink_resolves_to_the_archive(tmp_path, archive):
+    link = tmp_path / "link.tar.gz"
+    link.symlink_to(archive)
+    index = get_member_index(str(link))
+    assert index_path_for(link) == index_path_for(archive)
+    assert index.source == str(archive.resolve())
+    assert load_member_index(str(link)) is not None
+
+    # the link now points at another archive: the sidecar no longer matches
+    index.source = str(link.resolve())
+    other = tmp_path / "data" / "other.tar.gz"
+    other.write_bytes(archive.read_bytes())
+    link.unlink()
+    link.symlink_to(other)
+    assert not index.is_valid_for(link)
+
+
+def test_moved_archive_is_invalid(archive):
+    index = get_member_index(str(archive))
+    moved = archive.with_name("moved.tar.gz")
+    os.rename(archive, moved)
+    assert not index.is_valid_for(moved)
+    assert load_member_index(str(moved)) is None
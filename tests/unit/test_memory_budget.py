@@ -0,0 +1,70 @@
+import pytest
+
+from backend.core.config import settings
+from backend.core.pipeline.memory_budget import MB, MemoryBudget, MemoryModel, TaskMemory
+
+
+class _Model:
+    def __init__(self, ratio=2.0):
+        self._ratio = ratio
+        self.seen = []
+
+    def ratio(self, kind):
+        return self._ratio
+
+    def observe(self, kind, input_bytes, mem):
+        self.seen.append((kind, input_bytes, mem))
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(settings, "MEMORY_TASK_MIN_MB", 10)
+    return MemoryBudget(budget_mb=100, model=_Model())
+
+
+def test_estimate_has_a_floor(budget):
+    assert budget.estimate("parse_members", 1 * MB) == 10 * MB
+    assert budget.estimate("parse_members", 20 * MB) == 40 * MB
+
+
+def test_admission_against_the_budget(budget):
+    budget.reserve(70 * MB)
+    assert budget.fits(30 * MB, running=1)
+    assert not budget.fits(31 * MB, running=1)
+    # a task that is alone always runs, however large
+    assert budget.fits(500 * MB, running=0)
+
+    budget.release(70 * MB)
+    assert budget.reserved == 0
+    assert budget.stats()["peak_reserved_mb"] == 70
+
+
+def test_running_task_grows_its_reservation(budget):
+    budget.reserve(20 * MB)
+    assert budget.grow(20 * MB, 15 * MB) == 20 * MB
+    assert budget.reserved == 20 * MB
+
+    estimate = budget.grow(20 * MB, 50 * MB)
+    assert estimate == 50 * MB
+    assert budget.reserved == 50 * MB
+    assert not budget.fits(60 * MB, running=1)
+    budget.release(estimate)
+    assert budget.reserved == 0
+
+
+def test_footprint_counts_from_the_warm_baseline():
+    assert TaskMemory(rss_before=300, peak=400, baseline=100).delta == 300
+    assert TaskMemory(rss_before=300, peak=400).delta == 100
+
+
+def test_model_learns_and_persists():
+    model = MemoryModel()
+    start = model.ratio("align_rack")
+    model.observe("align_rack", 10 * MB, TaskMemory(peak=110 * MB, baseline=10 * MB))
+    learned = model.ratio("align_rack")
+    assert start < learned < 10.0
+    assert MemoryModel().ratio("align_rack") == pytest.approx(learned)
+
+    # inputs under 1 MB say nothing about the ratio
+    model.observe("align_rack", MB // 2, TaskMemory(peak=500 * MB))
+    assert model.ratio("align_rack") == learned
@@ -0,0 +1,131 @@
+import os
+import time
+
+import pytest
+
+from backend.core.analysis.registry import load_plugins
+from backend.core.config import settings
+from backend.core.pipeline.checkpoints import stage_keys
+from backend.core.storage import checkpoint_store
+from backend.core.storage.checkpoint_store import STALE_STAGING_SEC, CheckpointStore
+from backend.core.tasks.job import JobStage
+
+
+@pytest.fixture(scope="module", autouse=True)
+def plugins():
+    load_plugins()
+
+
+# ------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------
+def _changed(a, b):
+    return {
+        stage for stage in a
+        if (a[stage] != b[stage] if stage != JobStage.ANALYZE
+            else any(a[stage][p] != b[stage][p] for p in a[stage]))
+    }
+
+
+def test_same_inputs_same_keys(archive):
+    assert stage_keys("job-1", [str(archive)], {}) == stage_keys("job-1", [str(archive)], {})
+
+
+def test_job_id_only_changes_the_export(archive):
+    a = stage_keys("job-1", [str(archive)], {})
+    b = stage_keys("job-2", [str(archive)], {})
+    assert _changed(a, b) == {JobStage.EXPORT}
+
+
+def test_touched_archive_changes_every_stage(archive):
+    a = stage_keys("job", [str(archive)], {})
+    st = archive.stat()
+    os.utime(archive, (st.st_atime, st.st_mtime + 1))
+    b = stage_keys("job", [str(archive)], {})
+    assert _changed(a, b) == set(JobStage) & set(a)
+
+
+def test_align_setting_keeps_the_ingest(archive):
+    a = stage_keys("job", [str(archive)], {})
+    b = stage_keys("job", [str(archive)], {"ALIGN_GAP_SEC": 123})
+    assert _changed(a, b) == {JobStage.ALIGN, JobStage.ANALYZE, JobStage.EXPORT}
+
+
+def test_plugin_config_only_changes_that_plugin(archive):
+    a = stage_keys("job", [str(archive)], {})
+    b = stage_keys("job", [str(archive)], {"TEMP_DIFF_THRESHOLD": 99})
+    changed = [p for p in a[JobStage.ANALYZE] if a[JobStage.ANALYZE][p] != b[JobStage.ANALYZE][p]]
+    assert changed == ["anomaly_detector"]
+    assert a[JobStage.ALIGN] == b[JobStage.ALIGN]
+
+    # config no plugin reads changes nothing
+    c = stage_keys("job", [str(archive)], {"SOMETHING_ELSE": 1})
+    assert c[JobStage.ANALYZE]["cell_features"] == a[JobStage.ANALYZE]["cell_features"]
+
+
+def test_data_timezone_changes_the_ingest(archive, monkeypatch):
+    a = stage_keys("job", [str(archive)], {})
+    monkeypatch.setattr(settings, "DATA_TIMEZONE", "Asia/Shanghai")
+    b = stage_keys("job", [str(archive)], {})
+    assert JobStage.INGEST in _changed(a, b)
+
+
+# ------------------------------------------------------------
+# Store
+# ------------------------------------------------------------
+def _entry(store, key, size=1000, used=None):
+    store.save_json("align", key, {"blob": "x" * size})
+    if used is not None:
+        marker = store.path("align", key) / "_SUCCESS.json"
+        os.utime(marker, (used, used))
+
+
+def test_payload_round_trip():
+    store = CheckpointStore()
+    store.save_json("align", "ab12", {"a": 1}, rows=3)
+    assert store.has("align", "ab12")
+    assert store.load_json("align", "ab12") == {"a": 1}
+    assert store.info("align", "ab12")["rows"] == 3
+    assert store.load_json("align", "cd34") is None
+
+
+def test_first_commit_wins():
+    store = CheckpointStore()
+    first, second = store.begin("align", "ab12"), store.begin("align", "ab12")
+    (first / "payload.json").write_text('{"writer": 1}')
+    (second / "payload.json").write_text('{"writer": 2}')
+    store.commit("align", "ab12", first)
+    store.commit("align", "ab12", second)
+    assert store.load_json("align", "ab12") == {"writer": 1}
+    assert not second.exists()
+
+
+def test_evicts_least_recently_used():
+    store = CheckpointStore(max_mb=0)
+    now = time.time()
+    for i, key in enumerate(["aa01", "bb02", "cc03", "dd04"]):
+        _entry(store, key, used=now - 100 + i)
+    store.load_json("align", "aa01")                 # a hit: most recently used
+
+    keep = sum(size for _, size, path in store.entries() if path.name in ("aa01", "dd04"))
+    assert store.evict(max_bytes=keep) == 2
+    assert [store.has("align", k) for k in ["aa01", "bb02", "cc03", "dd04"]] == [True, False, False, True]
+
+
+def test_commits_trigger_eviction_past_the_cap(monkeypatch):
+    monkeypatch.setattr(checkpoint_store, "_since_evict", {})
+    store = CheckpointStore(max_mb=1)
+    for i in range(40):
+        _entry(store, f"{i:04x}", size=50_000)
+    assert store.usage() <= store.max_bytes + 60_000
+    assert store.has("align", f"{39:04x}")
+
+
+def test_stale_staging_is_removed():
+    store = CheckpointStore(max_mb=0)
+    stale, fresh = store.begin("align", "ab12"), store.begin("align", "cd34")
+    old = time.time() - STALE_STAGING_SEC - 10
+    os.utime(stale, (old, old))
+    store.evict()
+    assert not stale.exists()
+    assert fresh.exists()
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from backend.core.tasks.job import JobStatus
+from backend.core.tasks.task_manager import TaskManager
+
+LEASE = 0.05
+
+
+def _expire():
+    time.sleep(LEASE * 2)
+
+
+def test_claims_by_priority_then_age():
+    TaskManager.enqueue_job("low", [("low-1", ["a"]), ("low-2", ["b"])])
+    TaskManager.enqueue_job("high", [("high-1", ["c"])], priority=5)
+
+    claimed = [TaskManager.claim_task("w").task_id for _ in range(3)]
+    assert claimed == ["high-1", "low-1", "low-2"]
+    assert TaskManager.claim_task("w") is None
+
+
+def test_concurrent_claims_never_share_a_task():
+    TaskManager.enqueue_job("job", [(f"t{i:02d}", [f"f{i}"]) for i in range(20)])
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        while (task := TaskManager.claim_task(name)) is not None:
+            with lock:
+                claimed.append(task.task_id)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == [f"t{i:02d}" for i in range(20)]
+
+
+def test_only_the_lease_owner_settles():
+    TaskManager.enqueue_job("job", [("t1", ["a"])])
+    task = TaskManager.claim_task("w1")
+    assert task.state == JobStatus.RUNNING and task.attempts == 1
+    assert TaskManager.get_job("job").status == JobStatus.RUNNING
+
+    assert not TaskManager.complete_task("t1", "w2")
+    assert not TaskManager.heartbeat("t1", "w2")
+    assert TaskManager.heartbeat("t1", "w1")
+    assert TaskManager.complete_task("t1", "w1", {"rows": 3})
+    assert TaskManager.task_results("job") == [{"rows": 3}]
+    assert TaskManager.get_job("job").status == JobStatus.SUCCESS
+
+
+def test_expired_lease_is_claimed_again():
+    TaskManager.enqueue_job("job", [("t1", ["a"])], max_attempts=3)
+    TaskManager.claim_task("w1", lease_sec=LEASE)
+    _expire()
+
+    task = TaskManager.claim_task("w2", lease_sec=60)
+    assert task.task_id == "t1"
+    assert task.worker_id == "w2"
+    assert task.attempts == 2
+    # the first worker lost its lease: it can no longer renew or settle
+    assert not TaskManager.heartbeat("t1", "w1")
+    assert not TaskManager.complete_task("t1", "w1")
+    assert TaskManager.complete_task("t1", "w2")
+
+
+def test_heartbeat_keeps_the_lease():
+    TaskManager.enqueue_job("job", [("t1", ["a"])])
+    TaskManager.claim_task("w1", lease_sec=1)
+    for _ in range(3):
+        time.sleep(0.5)
+        assert TaskManager.heartbeat("t1", "w1", lease_sec=1)
+    assert TaskManager.requeue_expired() == 0
+    assert TaskManager.get_task("t1").worker_id == "w1"
+
+
+def test_expired_leases_fail_after_max_attempts():
+    TaskManager.enqueue_job("job", [("t1", ["a"])], max_attempts=2)
+    for worker in ("w1", "w2"):
+        assert TaskManager.claim_task(worker, lease_sec=LEASE).task_id == "t1"
+        _expire()
+
+    assert TaskManager.requeue_expired() == 1
+    task = TaskManager.get_task("t1")
+    assert task.state == JobStatus.FAILED
+    assert "lease expired" in task.error
+    assert TaskManager.get_job("job").status == JobStatus.FAILED
+    assert TaskManager.claim_task("w3") is None
+
+
+def test_failures_retry_until_max_attempts():
+    TaskManager.enqueue_job("job", [("t1", ["a"])], max_attempts=2)
+    TaskManager.claim_task("w1")
+    assert TaskManager.fail_task("t1", "w1", "boom")
+    assert TaskManager.get_task("t1").state == JobStatus.PENDING
+
+    TaskManager.claim_task("w1")
+    assert TaskManager.fail_task("t1", "w1", "boom again")
+    assert TaskManager.get_task("t1").state == JobStatus.FAILED
+    progress = TaskManager.queue_progress("job")
+    assert progress["status"] == JobStatus.FAILED.value
+    assert progress["failed"] == 1
+    assert progress["error"] == "boom again"
+
+
+def test_no_retry_fails_at_once():
+    TaskManager.enqueue_job("job", [("t1", ["a"])], max_attempts=5)
+    TaskManager.claim_task("w1")
+    TaskManager.fail_task("t1", "w1", "bad input", retry=False)
+    assert TaskManager.get_task("t1").state == JobStatus.FAILED
+
+
+def test_cancel_leaves_running_tasks():
+    TaskManager.enqueue_job("job", [("t1", ["a"]), ("t2", ["b"])])
+    TaskManager.claim_task("w1")
+    assert TaskManager.cancel_queued("job") == 1
+    assert TaskManager.get_task("t2").state == JobStatus.CANCELLED
+    assert TaskManager.complete_task("t1", "w1")
+    assert TaskManager.get_job("job").status == JobStatus.CANCELLED
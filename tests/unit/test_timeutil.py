@@ -0,0 +1,104 @@
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from backend.core.config import settings
+from backend.core.utils.timeutil import (
+    INVALID_EPOCH,
+    decode_epoch_seconds,
+    epoch_to_dt,
+    fast_parse_time,
+    normalize_to_epoch,
+    timezone_key,
+)
+
+
+def _expected(s, zone):
+    try:
+        dt = fast_parse_time(s.strip().replace("T", " "))
+    except ValueError:
+        return INVALID_EPOCH
+    return int((dt.replace(tzinfo=zone) if zone else dt).timestamp())
+
+
+def _day(date):
+    # one daily file at 5 s: the vectorized path with one date
+    return [f"{date} {s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(0, 86400, 5)]
+
+
+MIXED = [
+    "2024/1/5 7:08:09",           # h:m:s → per-row fallback
+    "2024-01-05 07:08:09.250",    # fractional seconds are dropped
+    "2024-06-01T10:00:00",
+    "2024-01-05 07:08:09xx",      # trailing junk
+    "2024-13-01 00:00:00",        # no such month
+    "bad",
+]
+
+
+@pytest.fixture
+def data_timezone(monkeypatch):
+    def use(name):
+        monkeypatch.setattr(settings, "DATA_TIMEZONE", name)
+    return use
+
+
+@pytest.fixture
+def host_timezone(monkeypatch):
+    def use(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.parametrize("name", ["UTC", "Asia/Shanghai", "Asia/Kolkata", "America/New_York", "Europe/Berlin"])
+@pytest.mark.parametrize("date", ["2024-03-10", "2024-03-31", "2024-11-03", "2024-10-27", "2024-07-01"])
+def test_days_in_named_zones(data_timezone, name, date):
+    # the dates include the US and EU DST changes, both directions
+    data_timezone(name)
+    values = _day(date)
+    got = decode_epoch_seconds(values)
+    zone = ZoneInfo(name)
+    assert got.dtype == np.int64
+    assert got.tolist() == [_expected(s, zone) for s in values]
+
+
+@pytest.mark.parametrize("name", ["UTC", "Asia/Kolkata", "America/New_York"])
+def test_irregular_rows_and_several_dates(data_timezone, name):
+    data_timezone(name)
+    values = MIXED + ["2024-03-09 23:59:55", "2024-03-10 03:00:00", "2024-11-03 01:30:00"]
+    got = decode_epoch_seconds(values)
+    assert got.tolist() == [_expected(s, ZoneInfo(name)) for s in values]
+    assert (got[3:6] == INVALID_EPOCH).all()
+
+
+def test_host_local_time_by_default(data_timezone, host_timezone):
+    data_timezone("")
+    host_timezone("America/New_York")
+    values = _day("2024-03-10") + MIXED
+    assert decode_epoch_seconds(values).tolist() == [_expected(s, None) for s in values]
+    assert timezone_key().startswith("local:")
+
+
+def test_zone_changes_the_cache_key(data_timezone):
+    data_timezone("UTC")
+    utc = timezone_key()
+    data_timezone("Asia/Shanghai")
+    assert timezone_key() != utc
+
+
+def test_epoch_round_trip(data_timezone):
+    data_timezone("Asia/Shanghai")
+    dt = datetime(2024, 10, 1, 8, 0, 0)
+    sec = normalize_to_epoch(dt)
+    assert sec == datetime(2024, 10, 1, 0, 0, 0, tzinfo=ZoneInfo("UTC")).timestamp()
+    assert epoch_to_dt(sec) == dt
+
+
+def test_empty_column():
+    assert decode_epoch_seconds([]).shape == (0,)
@@ -0,0 +1,169 @@
+import os
+import signal
+import time
+
+import pytest
+
+from backend.core.config import settings
+from backend.core.pipeline.memory_budget import MB, MemoryBudget
+from backend.core.pipeline.worker_pool import JobRecord, WorkerPool, _WorkItem
+
+
+def _square(x):
+    return x * x
+
+
+def _sleep(sec):
+    time.sleep(sec)
+    return sec
+
+
+def _die():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _oom_once(marker):
+    # MemoryError on the first run, fine on the retry
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise MemoryError("over the hard limit")
+    return "retried"
+
+
+def _always_oom():
+    raise MemoryError("over the hard limit")
+
+
+class _Model:
+    def ratio(self, kind):
+        return 1.0
+
+    def observe(self, kind, input_bytes, mem):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_START_METHOD", "fork")
+    monkeypatch.setattr(settings, "WORKER_INFLIGHT_PER_WORKER", 1)
+    pool = WorkerPool(max_workers=1, queue_size=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def idle_pool(monkeypatch):
+    # no mp pool and no feeder: the queues are only filled
+    pool = WorkerPool(max_workers=2, queue_size=2)
+    monkeypatch.setattr(pool, "_ensure_pool", lambda: None)
+    pool.budget = MemoryBudget(budget_mb=100, model=_Model())
+    return pool
+
+
+def _results(pool, n, timeout=30):
+    return sorted(pool.results(expected=n, timeout=timeout), key=lambda r: r.tag)
+
+
+# ------------------------------------------------------------
+# Backpressure
+# ------------------------------------------------------------
+def test_full_backlog_refuses_or_times_out(idle_pool):
+    assert idle_pool.submit(_square, (1,), block=False)
+    assert idle_pool.submit(_square, (2,), block=False)
+    assert not idle_pool.submit(_square, (3,), block=False)
+
+    t0 = time.monotonic()
+    assert not idle_pool.submit(_square, (3,), timeout=0.2)
+    assert time.monotonic() - t0 >= 0.2
+    assert idle_pool.stats()["backlog"] == 2
+
+
+def test_followups_never_block_and_run_first(idle_pool):
+    idle_pool.submit(_square, (1,), block=False)
+    idle_pool.submit(_square, (2,), block=False)
+    for i in range(5):
+        idle_pool.followup(_square, (i,), callback=None, error_callback=None)
+    assert idle_pool.stats()["followups"] == 5
+    assert idle_pool._next_queue() is idle_pool._followups
+
+
+def test_finished_and_cancelled_jobs_are_dropped(idle_pool):
+    for job_id in ("a", "b"):
+        idle_pool.submit_job(JobRecord(job_id, ["x.tar.gz"], {}), block=False)
+    assert idle_pool.cancel_job("a")
+    assert set(idle_pool.jobs) == {"b"}
+
+    idle_pool._backlog.clear()
+    idle_pool._active_jobs = 1
+    idle_pool._job_error("b", RuntimeError("boom"))
+    assert idle_pool.jobs == {}
+    (res,) = idle_pool.poll_results()
+    assert res.tag == "b" and not res.ok
+
+
+def test_in_flight_is_bounded(pool):
+    for i in range(6):
+        assert pool.submit(_sleep, (0.05,), tag=i)
+        assert pool.stats()["in_flight"] <= pool.max_in_flight
+    assert all(r.ok for r in _results(pool, 6))
+    assert pool.idle()
+
+
+# ------------------------------------------------------------
+# Memory admission
+# ------------------------------------------------------------
+def test_task_waits_until_its_estimate_fits(idle_pool):
+    idle_pool.followup(_square, (1,), None, None, input_bytes=80 * MB)
+    with idle_pool._cv:
+        assert idle_pool._next_queue() is not None      # alone: always admitted
+
+        idle_pool._in_flight = 1
+        idle_pool.budget.reserve(30 * MB)
+        assert idle_pool._next_queue() is None          # 30 + 80 > 100
+        assert idle_pool._followups[0].estimate == 80 * MB
+
+        idle_pool.budget.release(30 * MB)
+        assert idle_pool._next_queue() is idle_pool._followups
+
+
+def test_exclusive_task_waits_for_an_empty_pool(idle_pool):
+    idle_pool._followups.append(_WorkItem(fn=_square, args=(1,), exclusive=True))
+    with idle_pool._cv:
+        idle_pool._in_flight = 1
+        assert idle_pool._next_queue() is None
+        idle_pool._in_flight = 0
+        assert idle_pool._next_queue() is idle_pool._followups
+
+
+def test_results_and_reservations_balance(pool):
+    for i in range(4):
+        pool.submit(_square, (i,), tag=i)
+    assert [r.value for r in _results(pool, 4)] == [0, 1, 4, 9]
+    assert pool.budget.reserved == 0
+
+
+# ------------------------------------------------------------
+# Failures
+# ------------------------------------------------------------
+def test_memory_error_is_requeued_once_to_run_alone(pool, tmp_path):
+    pool.submit(_oom_once, (str(tmp_path / "ran"),), tag="once")
+    (res,) = _results(pool, 1)
+    assert res.ok and res.value == "retried"
+
+    pool.submit(_always_oom, tag="twice")
+    (res,) = _results(pool, 1)
+    assert not res.ok
+    assert "hard limit" in res.error
+
+
+def test_dead_worker_fails_its_task(pool):
+    pool.submit(_die, tag="dead")
+    (res,) = _results(pool, 1)
+    assert not res.ok
+    assert "died" in res.error
+    assert pool.budget.reserved == 0
+
+    # the pool replaced the worker and keeps going
+    pool.submit(_square, (3,), tag="next")
+    (res,) = _results(pool, 1)
+    assert res.ok and res.value == 9